@@ -0,0 +1,252 @@
+"""
+大量の行やファイルを処理するバッチで、一時的なエラーを再試行するためのモジュールです。
+
+ネットワークドライブの一時的な切断や、Excel で開かれていてロックされた
+ファイルなどのエラーは、少し待ってからやり直せば成功することがほとんどです。
+ここではエラーを「一時的 (transient)」と「恒久的 (permanent)」に分類し、
+一時的なエラーだけを間隔を空けながら（指数バックオフ）再試行します。
+
+    call_with_retry  1回の処理（ファイルの読み込み・書き込みなど）を再試行します
+    RetryQueue       行ごとの処理で失敗した行を後回しにし、待ち時間が
+                     過ぎたものから順に取り出します（その間も他の行の処理は
+                     止まりません）
+    write_failures   再試行しても失敗した行を Excel ファイルに出力します
+
+使用例:
+    df = batch_runner.call_with_retry(read_columns, path, columns)
+"""
+
+import errno
+import heapq
+import itertools
+import os
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+import utils  # ログ出力用
+from excel_writer import StreamingExcelWriter
+
+# 1件あたりの最大試行回数（最初の1回を含みます）
+DEFAULT_RETRY_ATTEMPTS = 3
+
+# 1回目の再試行までの待ち時間（秒）。以降は2倍ずつ長くします
+DEFAULT_RETRY_BASE_DELAY = 0.5
+
+# 再試行までの待ち時間の上限（秒）
+DEFAULT_RETRY_MAX_DELAY = 30.0
+
+# 一時的なエラーとみなす OSError のエラー番号
+# （OS によって定義されていない番号は除きます）
+TRANSIENT_ERRNOS = {
+    getattr(errno, name)
+    for name in (
+        "EAGAIN",
+        "EBUSY",
+        "EINTR",
+        "ETIMEDOUT",
+        "ECONNRESET",
+        "ECONNABORTED",
+        "ENETDOWN",
+        "ENETUNREACH",
+        "EHOSTUNREACH",
+        "ESTALE",
+    )
+    if hasattr(errno, name)
+}
+
+# 再試行しても失敗した行の一覧の列
+FAILURE_COLUMNS = ["行番号", "名前", "段階", "分類", "試行回数", "エラー"]
+
+# 再試行しても失敗した1件分の記録
+FailedItem = namedtuple(
+    "FailedItem", ["row", "name", "stage", "transient", "attempts", "error"]
+)
+
+
+def is_transient(error):
+    """
+    エラーが一時的なもの（時間をおけば成功する見込みがあるもの）かを返します。
+
+    Windows では Excel で開いているファイルへの書き込みが PermissionError に
+    なるため、PermissionError も一時的なエラーとして扱います。
+    ファイルが見つからない・データが不正などのエラーは恒久的なエラーです。
+    """
+    if isinstance(
+        error,
+        (
+            TimeoutError,
+            ConnectionError,
+            InterruptedError,
+            BlockingIOError,
+            PermissionError,
+        ),
+    ):
+        return True
+    return isinstance(error, OSError) and error.errno in TRANSIENT_ERRNOS
+
+
+def retry_delay(
+    attempt,
+    base_delay=DEFAULT_RETRY_BASE_DELAY,
+    max_delay=DEFAULT_RETRY_MAX_DELAY,
+):
+    """
+    attempt 回目の失敗のあと、次に試すまでの待ち時間（秒）を返します。
+    """
+    return min(max_delay, base_delay * 2 ** (attempt - 1))
+
+
+def call_with_retry(
+    func,
+    *args,
+    attempts=DEFAULT_RETRY_ATTEMPTS,
+    base_delay=DEFAULT_RETRY_BASE_DELAY,
+    sleep=time.sleep,
+    **kwargs,
+):
+    """
+    func(*args, **kwargs) を実行し、一時的なエラーの場合は待ってから再試行します。
+
+    Args:
+        func: 実行する関数
+        attempts (int): 最大試行回数（最初の1回を含みます）
+        base_delay (float): 1回目の再試行までの待ち時間（秒）
+        sleep: 待つための関数（テストで差し替えます）
+
+    Returns:
+        func の戻り値
+
+    Raises:
+        Exception: 恒久的なエラーの場合と、最大試行回数まで失敗した場合は
+            最後に発生した例外をそのまま送出します
+    """
+    for attempt in itertools.count(1):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt >= attempts or not is_transient(e):
+                raise
+            delay = retry_delay(attempt, base_delay)
+            utils.log_warning(
+                f"一時的なエラーのため {delay:.1f} 秒後に再試行します "
+                f"({attempt}/{attempts}): {type(e).__name__}: {e}"
+            )
+            sleep(delay)
+
+
+class RetryQueue:
+    """
+    一時的なエラーで失敗した処理を、待ち時間が過ぎるまで保持するキューです。
+
+    失敗した行をその場で待たずにキューへ入れておき、他の行の処理の合間に
+    pop_due で待ち時間が過ぎたものだけを取り出して再試行します。
+    最後に drain で残りを（必要なら待ってから）すべて取り出します。
+    """
+
+    def __init__(
+        self,
+        attempts=DEFAULT_RETRY_ATTEMPTS,
+        base_delay=DEFAULT_RETRY_BASE_DELAY,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        """
+        Args:
+            attempts (int): 1件あたりの最大試行回数（最初の1回を含みます）
+            base_delay (float): 1回目の再試行までの待ち時間（秒）
+            clock: 現在時刻（秒）を返す関数（テストで差し替えます）
+            sleep: 待つための関数（テストで差し替えます）
+        """
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.clock = clock
+        self.sleep = sleep
+        # (再試行する時刻, 追加した順番, 失敗した回数, 処理対象)
+        self._heap = []
+        self._order = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def can_retry(self, error, attempt):
+        """
+        attempt 回目の失敗のあと、再試行すべきかどうかを返します。
+        """
+        return attempt < self.attempts and is_transient(error)
+
+    def add(self, item, attempt):
+        """
+        attempt 回目に失敗した処理を、待ち時間のあとで再試行するよう登録します。
+        """
+        due = self.clock() + retry_delay(attempt, self.base_delay)
+        heapq.heappush(self._heap, (due, next(self._order), attempt, item))
+
+    def pop_due(self):
+        """
+        待ち時間が過ぎた処理を取り出します（待ちません）。
+
+        Returns:
+            list[tuple]: (処理対象, これまでに失敗した回数) のリスト
+        """
+        now = self.clock()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, attempt, item = heapq.heappop(self._heap)
+            due.append((item, attempt))
+        return due
+
+    def drain(self):
+        """
+        残っている処理を、待ち時間が過ぎるのを待ちながらすべて取り出します。
+
+        取り出した処理が再び add された場合も、それを含めて取り出します。
+
+        Yields:
+            tuple: (処理対象, これまでに失敗した回数)
+        """
+        while self._heap:
+            wait = self._heap[0][0] - self.clock()
+            if wait > 0:
+                self.sleep(wait)
+            yield from self.pop_due()
+
+
+def write_failures(failures, path):
+    """
+    再試行しても失敗した行の一覧を Excel ファイルに保存します。
+
+    失敗した行がない場合は、前回のファイルが残っていれば削除します。
+
+    Args:
+        failures (list[FailedItem]): 失敗した行
+        path (str): 保存先のパス
+
+    Returns:
+        str | None: 保存したファイルのパス（失敗した行がない場合は None）
+    """
+    if not failures:
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+
+    df = pd.DataFrame(
+        [
+            [
+                item.row,
+                item.name,
+                item.stage,
+                "一時的" if item.transient else "恒久的",
+                item.attempts,
+                item.error,
+            ]
+            for item in failures
+        ],
+        columns=FAILURE_COLUMNS,
+    )
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    writer = StreamingExcelWriter(path)
+    writer.write_frame("失敗一覧", df)
+    writer.save()
+    return path
@@ -0,0 +1,132 @@
+"""
+契約書生成のベンチマークです。
+
+従来の「1件ごとに Document(template_path) で読み込み直す」方式と、
+CompiledTemplate による「一度だけ解析して差し込む」方式の処理時間を比較します。
+
+実行例:
+    python benchmarks/bench_template.py
+    python benchmarks/bench_template.py --rows 1000 10000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from docx import Document
+
+# リポジトリ直下のモジュールを import できるようにします
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from contract_template import CompiledTemplate  # noqa: E402
+
+DEFAULT_TEMPLATE = "templates/contract_template.docx"
+
+
+def make_row(i):
+    """
+    ベンチマーク用の1行分のデータを作成します。
+    """
+    return {
+        "property_name": f"ベンチマーク物件{i}",
+        "address": f"東京都千代田区{i}-1-1",
+        "amount": 100000 + i,
+    }
+
+
+def render_legacy(row, template_path, output_path):
+    """
+    従来方式: 行ごとにテンプレートを読み込み、全段落を置換して保存します。
+    """
+    doc = Document(template_path)
+    replacements = {
+        "{{property_name}}": str(row["property_name"]),
+        "{{address}}": str(row["address"]),
+        "{{amount}}": f"{row['amount']:,}",
+    }
+    for paragraph in doc.paragraphs:
+        for key, value in replacements.items():
+            if key in paragraph.text:
+                paragraph.text = paragraph.text.replace(key, value)
+    doc.save(output_path)
+
+
+def render_compiled(row, template, output_path):
+    """
+    新方式: 解析済みテンプレートに値を差し込んで保存します。
+    """
+    template.save(
+        {
+            "property_name": str(row["property_name"]),
+            "address": str(row["address"]),
+            "amount": f"{row['amount']:,}",
+        },
+        output_path,
+    )
+
+
+def run(rows, template_path, output_dir, legacy=True):
+    """
+    指定件数の契約書を生成し、方式ごとの所要時間（秒）を返します。
+    """
+    results = {}
+
+    if legacy:
+        start = time.perf_counter()
+        for i in range(rows):
+            path = os.path.join(output_dir, f"legacy_{i % 100}.docx")
+            render_legacy(make_row(i), template_path, path)
+        results["legacy"] = time.perf_counter() - start
+
+    # テンプレートの解析時間も計測に含めます
+    start = time.perf_counter()
+    template = CompiledTemplate(template_path)
+    for i in range(rows):
+        path = os.path.join(output_dir, f"compiled_{i % 100}.docx")
+        render_compiled(make_row(i), template, path)
+    results["compiled"] = time.perf_counter() - start
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="生成する件数（複数指定可）",
+    )
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE)
+    parser.add_argument(
+        "--skip-legacy-above",
+        type=int,
+        default=None,
+        help="この件数を超える場合は従来方式の計測を省略します",
+    )
+    args = parser.parse_args()
+
+    print(f"{'件数':>8} {'従来方式(秒)':>14} {'新方式(秒)':>12} {'速度比':>8}")
+    with tempfile.TemporaryDirectory() as output_dir:
+        for rows in args.rows:
+            legacy = (
+                args.skip_legacy_above is None
+                or rows <= args.skip_legacy_above
+            )
+            results = run(rows, args.template, output_dir, legacy=legacy)
+            compiled = results["compiled"]
+            if "legacy" in results:
+                ratio = results["legacy"] / compiled
+                print(
+                    f"{rows:>8} {results['legacy']:>14.2f} "
+                    f"{compiled:>12.2f} {ratio:>7.1f}x"
+                )
+            else:
+                print(f"{rows:>8} {'-':>14} {compiled:>12.2f} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
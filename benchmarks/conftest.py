@@ -0,0 +1,184 @@
+"""
+ベンチマーク用の pytest 設定です。
+
+実行例:
+    python -m pytest benchmarks
+    python -m pytest benchmarks --bench-rows 10,1000,100000
+    python -m pytest benchmarks --bench-save-baseline
+
+計測結果は benchmarks/results/latest.json に保存されます。
+基準値（リポジトリに含めた benchmarks/baseline.json）と今回の結果を比較し、
+閾値を超えて悪化した場合はそのベンチマークを失敗にします。
+--bench-save-baseline を指定した場合は、今回の結果を基準値として保存します。
+
+基準値のないベンチマークは、CI（環境変数 CI が設定されている場合）では
+失敗にします。手元の実行では警告を表示し、今回の結果を基準値に追加します
+（最初の実行が基準値になってしまい、回帰を見逃すのを防ぐためです）。
+基準値はマシンの性能に依存するため、計測するマシンを変えた場合は
+--bench-save-baseline で作り直してコミットしてください。
+"""
+
+import os
+import shutil
+import warnings
+
+import pytest
+
+import harness
+import synthetic
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_PATH = os.path.join(REPO_DIR, "templates", "contract_template.docx")
+
+# 合成データの種類と作成関数
+GENERATORS = {
+    "tasks": synthetic.write_task_workbook,
+    "contracts": synthetic.write_contract_workbook,
+}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmark", "ベンチマーク")
+    group.addoption(
+        "--bench-rows",
+        default="10,1000",
+        help="計測する行数（カンマ区切り。例: 10,1000,100000,1000000）",
+    )
+    group.addoption(
+        "--bench-repeats",
+        type=int,
+        default=3,
+        help="時間を計測する実行回数",
+    )
+    group.addoption(
+        "--bench-threshold",
+        type=float,
+        default=harness.DEFAULT_THRESHOLD,
+        help="回帰と判定する悪化の割合（0.25 = 25%%）",
+    )
+    group.addoption(
+        "--bench-baseline",
+        default=BASELINE_PATH,
+        help="基準値の JSON ファイル",
+    )
+    group.addoption(
+        "--bench-save-baseline",
+        action="store_true",
+        help="比較せずに今回の結果を基準値として保存する",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    """
+    rows 引数を持つベンチマークを、--bench-rows の行数ごとに実行します。
+    """
+    if "rows" in metafunc.fixturenames:
+        option = metafunc.config.getoption("--bench-rows")
+        rows = [int(value) for value in option.split(",") if value.strip()]
+        metafunc.parametrize("rows", rows)
+
+
+@pytest.fixture(scope="session")
+def bench_results(request):
+    """
+    セッション中の計測結果を集め、終了時に JSON ファイルへ保存します。
+    """
+    config = request.config
+    baseline_path = config.getoption("--bench-baseline")
+    baseline = harness.load_results(baseline_path)
+    results = {}
+    yield results, baseline
+
+    if not results:
+        return
+    harness.save_results(os.path.join(RESULTS_DIR, "latest.json"), results)
+    if config.getoption("--bench-save-baseline"):
+        baseline.update(results)
+        harness.save_results(baseline_path, baseline)
+    elif not os.environ.get("CI"):
+        # 基準値のないベンチマークは、今回の結果を基準値として追加します
+        # （CI では失敗にするだけで、基準値は変更しません）
+        new_entries = {k: v for k, v in results.items() if k not in baseline}
+        if new_entries:
+            baseline.update(new_entries)
+            harness.save_results(baseline_path, baseline)
+
+
+@pytest.fixture
+def bench(request, bench_results):
+    """
+    処理を計測し、基準値と比較する関数を返します。
+
+    使用例:
+        metrics = bench(lambda: main(), rows, setup=clear_cache)
+    """
+    results, baseline = bench_results
+    config = request.config
+    key = request.node.name
+
+    def run(func, rows, setup=None):
+        metrics = harness.measure(
+            func,
+            rows,
+            repeats=config.getoption("--bench-repeats"),
+            setup=setup,
+        )
+        results[key] = metrics
+        if config.getoption("--bench-save-baseline"):
+            return metrics
+        if key not in baseline:
+            message = (
+                f"{key}: 基準値がありません"
+                f"（{config.getoption('--bench-baseline')}）。"
+                "--bench-save-baseline で作成してコミットしてください。"
+            )
+            if os.environ.get("CI"):
+                pytest.fail(message)
+            warnings.warn(message + " 今回の結果を基準値に追加します。")
+            return metrics
+        regressions = harness.find_regressions(
+            metrics,
+            baseline[key],
+            config.getoption("--bench-threshold"),
+        )
+        if regressions:
+            pytest.fail(f"{key}: " + " / ".join(regressions))
+        return metrics
+
+    return run
+
+
+@pytest.fixture(scope="session")
+def synthetic_file(tmp_path_factory):
+    """
+    合成データの Excel ファイルを作成する関数を返します。
+
+    同じ種類・行数のファイルはセッション中に1回だけ作成します
+    （100万行のファイルの作成には時間がかかるためです）。
+    """
+    directory = tmp_path_factory.mktemp("synthetic")
+    created = {}
+
+    def make(kind, rows):
+        if (kind, rows) not in created:
+            path = directory / f"{kind}_{rows}.xlsx"
+            GENERATORS[kind](str(path), rows)
+            created[kind, rows] = path
+        return created[kind, rows]
+
+    return make
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """
+    一時ディレクトリをカレントディレクトリにし、
+    プログラムが参照する templates/ と data/ を用意します。
+    """
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "data").mkdir()
+    shutil.copy(TEMPLATE_PATH, tmp_path / "templates")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
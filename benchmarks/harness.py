@@ -0,0 +1,141 @@
+"""
+ベンチマークの計測と、基準値（ベースライン）との比較を行うモジュールです。
+
+1つのベンチマークは次の順で計測します。
+    1. 1回目は準備運転として実行し、tracemalloc でメモリ使用量の最大値を測る
+       （tracemalloc は処理を遅くするため、時間の計測には使いません）
+    2. 2回目以降を repeats 回実行し、所要時間とスループット（行/秒）を測る
+    3. perf モジュールに記録された1件ごとの処理時間からパーセンタイルを求める
+"""
+
+import json
+import os
+import statistics
+import time
+import tracemalloc
+
+import perf
+
+# 回帰と判定する悪化の割合（0.25 = 25% 以上の悪化で失敗）
+DEFAULT_THRESHOLD = 0.25
+
+# これより短い処理はばらつきが大きいため、スループットを比較しません（秒）
+NOISE_FLOOR_SECONDS = 0.05
+
+# これより小さいメモリ使用量の増加は無視します（MB）
+NOISE_FLOOR_MB = 5.0
+
+
+def measure(func, rows, repeats=3, setup=None):
+    """
+    func を実行して所要時間・スループット・メモリ使用量を計測します。
+
+    Args:
+        func: 計測する処理（引数なし）
+        rows (int): 処理する行数（スループットの計算に使います）
+        repeats (int): 時間を計測する実行回数
+        setup: 毎回の実行前に呼び出す準備処理（引数なし。省略可）
+
+    Returns:
+        dict: 計測結果
+    """
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    durations = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        perf.recorder.reset()
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    median = statistics.median(durations)
+    return {
+        "rows": rows,
+        "repeats": repeats,
+        "seconds_min": round(min(durations), 6),
+        "seconds_median": round(median, 6),
+        "seconds_max": round(max(durations), 6),
+        "rows_per_second": round(rows / median, 1) if median > 0 else None,
+        "peak_mb": round(peak / (1024 * 1024), 2),
+        "latencies": {
+            name: {
+                key: value
+                for key, value in histogram.to_dict().items()
+                if key in ("count", "p50_ms", "p90_ms", "p99_ms", "max_ms")
+            }
+            for name, histogram in perf.recorder.latencies.items()
+        },
+    }
+
+
+def find_regressions(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    計測結果を基準値と比べ、閾値を超えて悪化した項目を返します。
+
+    Args:
+        current (dict): 今回の計測結果（measure の戻り値）
+        baseline (dict | None): 基準値（同じ形式。None の場合は比較しません）
+        threshold (float): 悪化と判定する割合
+
+    Returns:
+        list[str]: 悪化した項目の説明（悪化がなければ空リスト）
+    """
+    if not baseline:
+        return []
+
+    messages = []
+    base_speed = baseline.get("rows_per_second")
+    speed = current.get("rows_per_second")
+    if (
+        base_speed
+        and speed
+        and baseline.get("seconds_median", 0) >= NOISE_FLOOR_SECONDS
+        and speed < base_speed * (1 - threshold)
+    ):
+        messages.append(
+            f"スループットが低下しました: {base_speed:,.1f} → "
+            f"{speed:,.1f} 行/秒"
+        )
+
+    base_peak = baseline.get("peak_mb")
+    peak = current.get("peak_mb")
+    if (
+        base_peak is not None
+        and peak is not None
+        and peak - base_peak >= NOISE_FLOOR_MB
+        and peak > base_peak * (1 + threshold)
+    ):
+        messages.append(
+            f"メモリ使用量が増加しました: {base_peak:.1f} → {peak:.1f} MB"
+        )
+    return messages
+
+
+def load_results(path):
+    """
+    JSON ファイルから計測結果を読み込みます（ファイルがなければ空の辞書）。
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_results(path, results):
+    """
+    計測結果を JSON ファイルに保存します。
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
@@ -0,0 +1,171 @@
+"""
+ベンチマーク用の合成データ（タスク一覧・契約データ）を作成するモジュールです。
+
+create_sample_data.py / create_sample_assets.py と同じ列構成で、
+任意の件数（10件〜100万件）のデータを乱数から作成します。
+同じ seed を指定すれば、毎回同じデータが作成されます。
+"""
+
+import numpy as np
+import pandas as pd
+
+from excel_writer import StreamingExcelWriter
+
+# ステータスの出現比率（実際のタスク一覧に近い分布にしています）
+STATUS_WEIGHTS = {"完了": 0.45, "対応中": 0.25, "未着手": 0.27, "保留": 0.03}
+
+# タスク名・物件名・住所に使う語句
+TASK_WORDS = [
+    "要件定義",
+    "基本設計",
+    "詳細設計",
+    "実装",
+    "単体テスト",
+    "結合テスト",
+    "総合テスト",
+    "受入テスト",
+    "移行準備",
+    "本番リリース",
+    "ドキュメント作成",
+    "レビュー対応",
+]
+FAMILY_NAMES = [
+    "田中",
+    "佐藤",
+    "鈴木",
+    "高橋",
+    "伊藤",
+    "渡辺",
+    "山本",
+    "中村",
+    "小林",
+    "加藤",
+]
+PROPERTY_WORDS = [
+    "グランド",
+    "サニー",
+    "リバー",
+    "パーク",
+    "ヒルズ",
+    "ガーデン",
+    "レジデンス",
+    "ハイツ",
+    "コート",
+    "メゾン",
+]
+PREFECTURES = [
+    "東京都千代田区",
+    "神奈川県横浜市西区",
+    "大阪府大阪市北区",
+    "愛知県名古屋市中区",
+    "福岡県福岡市博多区",
+    "北海道札幌市中央区",
+]
+
+
+def _choice(rng, words, size):
+    """
+    語句の一覧から size 個をランダムに選び、NumPy の文字列配列で返します。
+    """
+    return np.array(words, dtype=object)[rng.integers(0, len(words), size)]
+
+
+def make_task_frame(rows, seed=0):
+    """
+    A.xlsx と同じ列構成のタスク一覧を作成します。
+
+    Args:
+        rows (int): 行数
+        seed (int): 乱数のシード
+
+    Returns:
+        pd.DataFrame: ID, Task Name, Assignee, Start Date, End Date, Status
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, rows + 1)
+    task_names = (
+        _choice(rng, TASK_WORDS, rows)
+        + "（"
+        + _choice(rng, TASK_WORDS, rows)
+        + "・第"
+        + (ids % 50 + 1).astype(str).astype(object)
+        + "工程）"
+    )
+    start = pd.Timestamp("2025-01-01") + pd.to_timedelta(
+        rng.integers(0, 365, rows), unit="D"
+    )
+    end = start + pd.to_timedelta(rng.integers(1, 60, rows), unit="D")
+    statuses = rng.choice(
+        list(STATUS_WEIGHTS), size=rows, p=list(STATUS_WEIGHTS.values())
+    )
+    return pd.DataFrame(
+        {
+            "ID": ids,
+            "Task Name": task_names,
+            "Assignee": _choice(rng, FAMILY_NAMES, rows),
+            "Start Date": start.strftime("%Y-%m-%d"),
+            "End Date": end.strftime("%Y-%m-%d"),
+            "Status": statuses,
+        }
+    )
+
+
+def make_contract_frame(rows, seed=0):
+    """
+    contract_data.xlsx と同じ列構成の契約データを作成します。
+
+    物件名は重複しないように通し番号を付けます。
+
+    Args:
+        rows (int): 行数
+        seed (int): 乱数のシード
+
+    Returns:
+        pd.DataFrame: property_name, address, amount
+    """
+    rng = np.random.default_rng(seed)
+    numbers = np.arange(1, rows + 1).astype(str).astype(object)
+    property_names = (
+        _choice(rng, PROPERTY_WORDS, rows)
+        + _choice(rng, PROPERTY_WORDS, rows)
+        + numbers
+    )
+    addresses = (
+        _choice(rng, PREFECTURES, rows)
+        + rng.integers(1, 10, rows).astype(str).astype(object)
+        + "-"
+        + rng.integers(1, 30, rows).astype(str).astype(object)
+        + "-"
+        + numbers
+    )
+    amounts = rng.integers(40, 400, rows) * 1000
+    return pd.DataFrame(
+        {
+            "property_name": property_names,
+            "address": addresses,
+            "amount": amounts,
+        }
+    )
+
+
+def write_frame(path, df):
+    """
+    DataFrame を1シートのExcelファイルとして書き出します。
+    """
+    writer = StreamingExcelWriter(path)
+    writer.write_frame("Sheet1", df)
+    writer.save()
+
+
+def write_task_workbook(path, rows, seed=0):
+    """
+    タスク一覧のExcelファイル（A.xlsx 相当）を作成します。
+    """
+    write_frame(path, make_task_frame(rows, seed))
+
+
+def write_contract_workbook(path, rows, seed=0):
+    """
+    契約データのExcelファイル（contract_data.xlsx 相当）を作成します。
+    """
+    write_frame(path, make_contract_frame(rows, seed))
@@ -0,0 +1,47 @@
+"""
+常駐プロセス (worker_daemon.py) に登録した小さなジョブの処理時間のベンチマークです。
+
+test_startup.py の test_startup_small_progress_job（毎回プロセスを起動する場合）と
+比べると、ライブラリの import と入力ファイルの読み込みが省略される分だけ速くなります。
+"""
+
+import shutil
+import threading
+
+import pytest
+
+import worker_daemon
+
+# ベンチマーク用のトークン
+TOKEN = "bench-token"
+
+
+@pytest.fixture
+def daemon_port(workdir):
+    """
+    ベンチマーク用の常駐プロセスを起動し、ポート番号を返します。
+    """
+    service = worker_daemon.WorkerService(root=workdir)
+    service.start()
+    server = worker_daemon.WorkerServer(("127.0.0.1", 0), service, TOKEN)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_port
+    server.shutdown()
+    server.server_close()
+    service.stop()
+
+
+def test_daemon_small_progress_job(
+    bench, workdir, synthetic_file, daemon_port
+):
+    """10行の A.xlsx を集計するジョブを常駐プロセスで実行する時間"""
+    shutil.copy(synthetic_file("tasks", 10), workdir / "A.xlsx")
+
+    def submit():
+        result = worker_daemon.submit_job(
+            "progress", cwd=workdir, port=daemon_port, token=TOKEN
+        )
+        assert result["status"] == "succeeded", result
+
+    bench(submit, 10)
@@ -0,0 +1,52 @@
+"""
+履歴データベース (task_history.py) のベンチマークです。
+
+1年分（365回）の毎日の実行を記録した履歴から、推移のシートを作成する
+時間を計測します。過去の B.xlsx を365個読み直す場合と違い、
+データベースへの問い合わせだけで求めます。
+"""
+
+import numpy as np
+import pytest
+
+import synthetic
+import task_history
+
+# 記録する実行の回数（1年分の毎日の実行）
+DAYS = 365
+
+# 1回の実行で状態が変わるタスクの割合
+CHANGE_RATE = 0.02
+
+
+@pytest.fixture
+def yearly_history(tmp_path, rows):
+    """
+    rows 件のタスクの1年分の履歴を記録したデータベースを作成します。
+    """
+    rng = np.random.default_rng(0)
+    tasks = synthetic.make_task_frame(rows)
+    tasks["Task Name"] = tasks["ID"].astype(str) + ":" + tasks["Task Name"]
+    statuses = list(synthetic.STATUS_WEIGHTS)
+    days = np.datetime64("2025-01-01") + np.arange(DAYS)
+
+    path = tmp_path / "history.db"
+    with task_history.open_history(path) as conn:
+        for day in days:
+            changed = rng.random(rows) < CHANGE_RATE
+            tasks.loc[changed, "Status"] = rng.choice(
+                statuses, size=changed.sum()
+            )
+            task_history.record_run(conn, tasks, str(day))
+    return path
+
+
+def test_trend_sheets_over_a_year(bench, yearly_history, rows):
+    """1年分の履歴から推移のシートを作成する時間"""
+
+    def query():
+        with task_history.open_history(yearly_history) as conn:
+            sheets = task_history.trend_sheets(conn)
+        assert len(sheets["推移(バーンダウン)"]) == DAYS
+
+    bench(query, rows)
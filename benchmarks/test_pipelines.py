@@ -0,0 +1,72 @@
+"""
+各処理のベンチマークです（python -m pytest benchmarks で実行します）。
+
+ファイルを読み込む処理は、毎回キャッシュを消してから実行します
+（キャッシュからの読み込みは test_excel_read_cached で別に計測します）。
+"""
+
+import shutil
+
+import generate_contracts
+import progress_tracker
+import synthetic
+import utils
+from excel_reader import read_columns, read_columns_cached
+from excel_writer import StreamingExcelWriter
+
+TASK_COLUMNS = ["Task Name", "Assignee", "End Date", "Status"]
+
+
+def clear_cache():
+    """
+    解析済みの入力ファイルのキャッシュを削除します。
+    """
+    shutil.rmtree(utils.CACHE_DIR, ignore_errors=True)
+
+
+def test_progress_tracker_main(bench, workdir, synthetic_file, rows):
+    """A.xlsx の読み込みから B.xlsx の出力まで"""
+    shutil.copy(synthetic_file("tasks", rows), workdir / "A.xlsx")
+    bench(progress_tracker.main, rows, setup=clear_cache)
+
+
+def test_generate_contracts(bench, workdir, synthetic_file, rows):
+    """契約データの読み込みから全件の契約書の保存まで"""
+    shutil.copy(
+        synthetic_file("contracts", rows), workdir / "data/contract_data.xlsx"
+    )
+
+    def setup():
+        clear_cache()
+        shutil.rmtree(workdir / "output", ignore_errors=True)
+
+    metrics = bench(
+        lambda: generate_contracts.generate_contracts(full=True),
+        rows,
+        setup=setup,
+    )
+    assert metrics["latencies"]["render"]["count"] == rows
+
+
+def test_excel_read(bench, synthetic_file, rows):
+    """Excel ファイルの解析（キャッシュなし）"""
+    path = str(synthetic_file("tasks", rows))
+    bench(lambda: read_columns(path, TASK_COLUMNS), rows)
+
+
+def test_excel_read_cached(bench, workdir, synthetic_file, rows):
+    """解析済みキャッシュからの読み込み（初回の準備運転でキャッシュを作成）"""
+    path = str(synthetic_file("tasks", rows))
+    bench(lambda: read_columns_cached(path, TASK_COLUMNS), rows)
+
+
+def test_excel_write(bench, workdir, rows):
+    """write-only モードでの Excel ファイルの書き出し"""
+    df = synthetic.make_task_frame(rows)
+
+    def write():
+        writer = StreamingExcelWriter(str(workdir / "out.xlsx"))
+        writer.write_frame("詳細一覧", df)
+        writer.save()
+
+    bench(write, rows)
@@ -0,0 +1,66 @@
+"""
+ブラウザを使わない取得 (web_scraper.py) のベンチマークです。
+
+ローカルの HTTP サーバーから rows ページを取得・解析する時間を計測します。
+同じページをブラウザで1件ずつ開く場合は、起動を除いても1ページあたり
+数百ミリ秒かかります。
+"""
+
+import functools
+import http.server
+import threading
+
+import pytest
+
+import web_scraper
+
+# 1ページに含める商品の数
+PRODUCTS_PER_PAGE = 20
+
+SPEC = {
+    "rows": "li.product",
+    "fields": {
+        "name": "h2",
+        "price": "span.price",
+        "link": {"css": "a", "attr": "href"},
+    },
+}
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def product_site(tmp_path_factory):
+    """
+    商品一覧のページを配信するローカル HTTP サーバーを起動します。
+    """
+    site = tmp_path_factory.mktemp("site")
+    items = "".join(
+        f'<li class="product"><h2>商品{i}</h2>'
+        f'<span class="price">{i * 100}円</span>'
+        f'<a href="/items/{i}.html">詳細</a></li>'
+        for i in range(PRODUCTS_PER_PAGE)
+    )
+    (site / "products.html").write_text(
+        f"<html><body><ul>{items}</ul></body></html>", encoding="utf-8"
+    )
+    handler = functools.partial(QuietHandler, directory=str(site))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_scrape_static_pages(bench, product_site, rows):
+    """rows ページを同時に取得して解析する時間"""
+    urls = [f"{product_site}/products.html?page={i}" for i in range(rows)]
+
+    def scrape():
+        results = web_scraper.scrape(urls, SPEC, use_browser=False)
+        assert len(results) == rows * PRODUCTS_PER_PAGE
+
+    bench(scrape, rows)
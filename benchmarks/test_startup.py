@@ -0,0 +1,61 @@
+"""
+コマンドの起動時間のベンチマークです。
+
+main.py のサブコマンドは必要になるまで重いライブラリを import しないため、
+すべてのスクリプトのモジュールを最初に import する場合と比べて
+起動が速いことを確認します。
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+
+import harness
+from conftest import REPO_DIR
+
+MAIN_PATH = os.path.join(REPO_DIR, "main.py")
+
+# 従来の各スクリプトが起動時に読み込んでいたモジュール
+EAGER_IMPORTS = (
+    "import progress_tracker, generate_contracts, create_sample_assets, "
+    "selenium_demo, verify_deps"
+)
+
+
+def run_python(*args, cwd=REPO_DIR):
+    """
+    Python を起動し、終了を待ちます。
+    """
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    subprocess.run(
+        [sys.executable, *args],
+        cwd=cwd,
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def test_startup_eager_imports(bench):
+    """全モジュールを import した場合の起動時間（比較用）"""
+    bench(lambda: run_python("-c", EAGER_IMPORTS), 1)
+
+
+def test_startup_help(bench):
+    """python main.py --help の起動時間"""
+    bench(lambda: run_python(MAIN_PATH, "--help"), 1)
+
+
+def test_startup_small_progress_job(bench, workdir, synthetic_file):
+    """10行の A.xlsx を集計する python main.py progress の実行時間"""
+    shutil.copy(synthetic_file("tasks", 10), workdir / "A.xlsx")
+    bench(lambda: run_python(MAIN_PATH, "progress", cwd=workdir), 10)
+
+
+def test_startup_help_is_faster_than_eager_imports():
+    """--help の起動が全モジュールの import の半分未満の時間で済むこと"""
+    eager = harness.measure(lambda: run_python("-c", EAGER_IMPORTS), 1)
+    lazy = harness.measure(lambda: run_python(MAIN_PATH, "--help"), 1)
+    assert lazy["seconds_median"] < eager["seconds_median"] / 2
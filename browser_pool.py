@@ -0,0 +1,349 @@
+"""
+Selenium のブラウザ（ヘッドレス Chrome）を使い回すためのセッションプールです。
+
+ブラウザの起動には1回あたり数秒かかるため、多数のページを巡回する処理では
+起動時間が全体の大半を占めてしまいます。BrowserPool は起動したブラウザを
+N 個まで保持しておき、処理ごとに貸し出して（lease）、返却されたら
+Cookie などの状態を消してから次の処理に貸し出します。
+
+決まった回数だけ使ったブラウザや、応答しなくなったブラウザは自動的に
+終了させ、必要になった時点で新しく起動し直します。
+
+使用例:
+    with BrowserPool(size=4) as pool:
+        for result in pool.run_tasks(get_title, urls):
+            print(result.item, result.value, result.error)
+
+    def get_title(session, url):
+        session.open(url, ready_locator=("css selector", "h1"))
+        return session.driver.title
+"""
+
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import driver_resolver
+import utils  # ログ出力用
+
+# プールに保持するブラウザの数
+DEFAULT_POOL_SIZE = 2
+
+# 1つのブラウザを使い回す最大回数（これを超えたら起動し直します）
+DEFAULT_MAX_USES = 50
+
+# 要素の表示などを待つ最大秒数
+DEFAULT_WAIT_SECONDS = 10
+
+# run_tasks の1件分の結果（成功時は error が None）
+TaskResult = namedtuple("TaskResult", ["item", "value", "error"])
+
+
+def create_headless_chrome(page_load_timeout=30, allow_download=None):
+    """
+    ヘッドレスモード（画面を表示しない）の Chrome を起動します。
+
+    ドライバは driver_resolver で解決するため、キャッシュが有効な間は
+    インターネットに接続せずに起動します。
+
+    Args:
+        page_load_timeout (int): ページの読み込みを待つ最大秒数
+        allow_download (bool | None): ドライバが見つからない場合に
+            ダウンロードを許可するか（None は環境変数の設定に従います）
+
+    Returns:
+        selenium.webdriver.Chrome: 起動したブラウザ
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service as ChromeService
+
+    resolved = driver_resolver.resolve_chromedriver(
+        allow_download=allow_download
+    )
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--window-size=1280,800")
+    if resolved.browser_path:
+        options.binary_location = resolved.browser_path
+
+    # ドライバのパスを指定すると、Selenium Manager による確認も行われません
+    service = ChromeService(executable_path=resolved.driver_path)
+    driver = webdriver.Chrome(service=service, options=options)
+    driver.set_page_load_timeout(page_load_timeout)
+    return driver
+
+
+class BrowserSession:
+    """
+    プールから貸し出される1つのブラウザです。
+
+    Attributes:
+        driver: Selenium の WebDriver
+        uses (int): これまでに貸し出した回数
+        broken (bool): ブラウザが応答しなくなった場合は True
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.broken = False
+
+    def wait_for(self, condition, timeout=DEFAULT_WAIT_SECONDS):
+        """
+        条件を満たすまで待ちます（time.sleep で決め打ちの時間を待つ代わりに使います）。
+
+        Args:
+            condition: driver を受け取り、満たした場合に真の値を返す関数
+                （selenium.webdriver.support.expected_conditions の条件など）
+            timeout (float): 待つ最大秒数
+
+        Returns:
+            condition が最後に返した値
+
+        Raises:
+            selenium.common.exceptions.TimeoutException: 時間内に満たさない場合
+        """
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        return WebDriverWait(self.driver, timeout).until(condition)
+
+    def wait_for_element(self, locator, timeout=DEFAULT_WAIT_SECONDS):
+        """
+        要素が表示されるまで待ち、その要素を返します。
+
+        Args:
+            locator (tuple): ("css selector", "h1") のような (方法, 値) の組
+            timeout (float): 待つ最大秒数
+        """
+        from selenium.webdriver.support import expected_conditions as ec
+
+        return self.wait_for(
+            ec.visibility_of_element_located(locator), timeout
+        )
+
+    def open(self, url, ready_locator=None, timeout=DEFAULT_WAIT_SECONDS):
+        """
+        ページを開き、読み込みが終わるまで待ちます。
+
+        Args:
+            url (str): 開くページの URL
+            ready_locator (tuple | None): 指定した場合は、この要素が
+                表示されるまで待ちます（JavaScript で描画されるページ向け）
+            timeout (float): 待つ最大秒数
+        """
+        self.driver.get(url)
+        self.wait_for(
+            lambda driver: driver.execute_script("return document.readyState")
+            == "complete",
+            timeout,
+        )
+        if ready_locator is not None:
+            self.wait_for_element(ready_locator, timeout)
+
+    def reset(self):
+        """
+        次の処理に影響しないよう、Cookie・ストレージ・追加のタブを消します。
+        """
+        driver = self.driver
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.delete_all_cookies()
+        driver.execute_script(
+            "try { window.localStorage.clear(); "
+            "window.sessionStorage.clear(); } catch (e) {}"
+        )
+        driver.get("about:blank")
+
+    def is_alive(self):
+        """
+        ブラウザが応答するかどうかを返します。
+        """
+        try:
+            self.driver.window_handles
+        except Exception:
+            return False
+        return True
+
+
+class BrowserPool:
+    """
+    起動済みのブラウザを保持し、処理ごとに貸し出すクラスです。
+
+    ブラウザは必要になった時点で size 個まで起動します。
+    """
+
+    def __init__(
+        self,
+        size=DEFAULT_POOL_SIZE,
+        max_uses=DEFAULT_MAX_USES,
+        driver_factory=create_headless_chrome,
+    ):
+        """
+        Args:
+            size (int): 同時に使うブラウザの最大数
+            max_uses (int): 1つのブラウザを使い回す最大回数
+            driver_factory: 引数なしで新しい WebDriver を返す関数
+        """
+        self.size = size
+        self.max_uses = max_uses
+        self.driver_factory = driver_factory
+        self.started_count = 0
+        # 空いているブラウザ（最後に返却されたものから貸し出します）
+        self._idle = []
+        self._created = 0
+        self._lock = threading.Lock()
+        # 空きを待つスレッドに、返却や終了でブラウザの数が減ったことを知らせます
+        self._available = threading.Condition(self._lock)
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """
+        ブラウザを1つ借ります。with 文を抜けると自動的に返却されます。
+
+        Args:
+            timeout (float | None): 空きを待つ最大秒数（None は無制限）
+
+        Raises:
+            TimeoutError: 時間内にブラウザが空かなかった場合
+        """
+        session = self._acquire(timeout)
+        try:
+            yield session
+        except Exception:
+            # 処理中のエラーがブラウザの異常によるものなら、作り直します
+            session.broken = not session.is_alive()
+            raise
+        finally:
+            self._release(session)
+
+    def _acquire(self, timeout):
+        """
+        空いているブラウザを取り出します。なければ起動するか、空くまで待ちます。
+
+        待っている間に他のブラウザが終了した場合（使用回数の上限や異常による
+        終了）は、待っていたスレッドが新しいブラウザを起動します。
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._available:
+            while True:
+                if self._closed:
+                    raise RuntimeError("BrowserPool は終了しています。")
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("空いているブラウザがありません。")
+                self._available.wait(remaining)
+
+        try:
+            return self._start_session()
+        except Exception:
+            with self._available:
+                self._created -= 1
+                self._available.notify()
+            raise
+
+    def _start_session(self):
+        """
+        新しいブラウザを起動します。
+        """
+        session = BrowserSession(self.driver_factory())
+        with self._lock:
+            self.started_count += 1
+        return session
+
+    def _release(self, session):
+        """
+        返却されたブラウザの状態を消して、次の貸し出しに備えます。
+
+        使用回数が上限に達したブラウザと、異常のあるブラウザは終了させます。
+        """
+        session.uses += 1
+        if self._closed or session.broken or session.uses >= self.max_uses:
+            self._discard(session)
+            return
+        try:
+            session.reset()
+        except Exception as e:
+            utils.log_warning(
+                f"ブラウザの状態を初期化できないため終了します: {e}"
+            )
+            self._discard(session)
+            return
+        with self._available:
+            if not self._closed:
+                self._idle.append(session)
+                self._available.notify()
+                return
+        # 初期化している間にプールが終了した場合です
+        self._discard(session)
+
+    def _discard(self, session):
+        """
+        ブラウザを終了させ、プールから取り除きます。
+        """
+        try:
+            session.driver.quit()
+        except Exception as e:
+            utils.log_warning(f"ブラウザの終了に失敗しました: {e}")
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def run_tasks(self, task, items, timeout=None):
+        """
+        items の各要素に対して task をプールのブラウザで同時に実行します。
+
+        Args:
+            task: (BrowserSession, 要素) を受け取って結果を返す関数
+            items: 処理する要素（URL など）の並び
+            timeout (float | None): ブラウザの空きを待つ最大秒数
+
+        Yields:
+            TaskResult: items と同じ順序の結果（失敗した場合は error に例外）
+        """
+
+        def run(item):
+            try:
+                with self.lease(timeout) as session:
+                    return TaskResult(item, task(session, item), None)
+            except Exception as e:
+                return TaskResult(item, None, e)
+
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            yield from executor.map(run, items)
+
+    def close(self):
+        """
+        保持しているブラウザをすべて終了させます。
+
+        貸し出し中のブラウザは、返却された時点で終了させます。
+        """
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            # 空きを待っているスレッドには RuntimeError で知らせます
+            self._available.notify_all()
+        for session in idle:
+            self._discard(session)
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+from collections import deque
+
+import utils  # ハッシュ値の計算用
+
+# マニフェストファイルの名前（出力ディレクトリに作成します）
+MANIFEST_FILENAME = ".contract_manifest.jsonl"
+
+
+def hash_row(row, template_hash):
+    """
+    1行分の入力値とテンプレートのハッシュ値から行のハッシュ値を計算します。
+    """
+    payload = json.dumps(
+        [template_hash, row], sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ContractManifest:
+    """
+    生成済みの契約書を記録し、変更のない行の再生成を省略するためのクラスです。
+
+    マニフェストは出力ディレクトリ内の JSON Lines ファイルで、
+    1行目にテンプレートのハッシュ値、2行目以降に
+    「出力ファイル名 → 入力値のハッシュ値」を1件ずつ追記します。
+    1件生成するたびに追記するため、処理が途中で止まっても
+    次回はそこから再開できます。テンプレートが変わった場合は
+    すべての記録を無効として全件を生成し直します。
+    行ごとにテンプレートを選ぶ場合は、各行のハッシュ値にその行の
+    テンプレートのハッシュ値を含めるため、変わったテンプレートを使う
+    行だけが生成し直されます。
+
+    使用例:
+        manifest = ContractManifest("output", template_path)
+        rows = manifest.filter_rows(rows, key_func, output.exists)
+        for success in results:
+            manifest.record_result(success)
+        manifest.close()
+    """
+
+    def __init__(self, output_dir, template_path):
+        self.path = os.path.join(output_dir, MANIFEST_FILENAME)
+        self.template_hash = utils.hash_file(template_path)
+        # 行ごとのテンプレートのパス -> ハッシュ値
+        self._template_hashes = {}
+        self.entries = self._load()
+        self.skipped_count = 0
+        # filter_rows で処理対象にした行の (キー, ハッシュ値)。入力順に並びます
+        self._pending = deque()
+        self._file = None
+
+    def _load(self):
+        """
+        既存のマニフェストを読み込み、{出力ファイル名: ハッシュ値} を返します。
+        """
+        if not os.path.exists(self.path):
+            return {}
+
+        entries = {}
+        with open(self.path, encoding="utf-8") as f:
+            header = f.readline()
+            try:
+                template_hash = json.loads(header).get("template_hash")
+            except ValueError:
+                return {}
+            if template_hash != self.template_hash:
+                # テンプレートが変わった場合は全件を生成し直します
+                return {}
+
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # 書き込み途中で中断された最終行は無視します
+                    continue
+                entries[entry["key"]] = entry["hash"]
+        return entries
+
+    def template_hash_for(self, template_path):
+        """
+        行ごとのテンプレートのハッシュ値を返します（同じファイルは1回だけ計算します）。
+
+        Args:
+            template_path (str | None): テンプレートのパス
+                （None の場合は既定のテンプレートです）
+        """
+        if template_path is None:
+            return self.template_hash
+        if template_path not in self._template_hashes:
+            self._template_hashes[template_path] = utils.hash_file(
+                template_path
+            )
+        return self._template_hashes[template_path]
+
+    def filter_rows(self, rows, key_func, exists, template_func=None):
+        """
+        変更のない行を読み飛ばし、生成が必要な行だけを返します。
+
+        Args:
+            rows: (行番号, 行データ) の並び
+            key_func: 行データから出力ファイル名を求める関数
+            exists: 出力ファイル名から出力済みかどうかを返す関数
+            template_func: 行データからその行のテンプレートのパスを
+                求める関数（省略時はすべての行で既定のテンプレートを使います）
+
+        Yields:
+            tuple: 生成が必要な (行番号, 行データ)
+        """
+        for index, row in rows:
+            key = key_func(row)
+            template_path = template_func(row) if template_func else None
+            row_hash = hash_row(row, self.template_hash_for(template_path))
+            if self.entries.get(key) == row_hash and exists(key):
+                self.skipped_count += 1
+                continue
+            self._pending.append((key, row_hash))
+            yield index, row
+
+    def record_result(self, success):
+        """
+        filter_rows で返した行の処理結果を、入力順に1件ずつ記録します。
+
+        Args:
+            success (bool): 契約書の生成に成功した場合は True
+        """
+        key, row_hash = self._pending.popleft()
+        if not success:
+            # 失敗した行は記録を消して、次回必ず生成し直します
+            self.entries.pop(key, None)
+            return
+
+        self.entries[key] = row_hash
+        if self._file is None:
+            self._file = self._open_for_append()
+        entry = {"key": key, "hash": row_hash}
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        # 中断に備えて、1件ごとにディスクへ書き出します
+        self._file.flush()
+
+    def defer(self):
+        """
+        filter_rows で返した行のうち、まだ記録していない先頭の行を後回しにします。
+
+        一時的なエラーで再試行する行に使います。後続の行は record_result で
+        これまでどおり入力順に記録できます。
+
+        Returns:
+            tuple: 後で record_deferred に渡す (キー, ハッシュ値)
+        """
+        return self._pending.popleft()
+
+    def record_deferred(self, token, success):
+        """
+        defer で後回しにした行の処理結果を記録します。
+
+        Args:
+            token (tuple): defer の戻り値
+            success (bool): 契約書の生成に成功した場合は True
+        """
+        self._pending.appendleft(token)
+        self.record_result(success)
+
+    def _open_for_append(self):
+        """
+        追記用にマニフェストを開きます。記録が無効な場合は作り直します。
+        """
+        self._rewrite()
+        return open(self.path, "a", encoding="utf-8")
+
+    def _rewrite(self):
+        """
+        現在の記録でマニフェストを書き直します。
+
+        一時ファイルに書き出してから置き換えるため、
+        書き込み中に中断されても壊れたファイルは残りません。
+        """
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            header = {"template_hash": self.template_hash}
+            f.write(json.dumps(header) + "\n")
+            for key, row_hash in self.entries.items():
+                entry = {"key": key, "hash": row_hash}
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.path)
+
+    def reset(self):
+        """
+        記録をすべて消去し、全件を生成し直す対象にします（--full 用）。
+
+        マニフェストのファイルは、次に記録するときに作り直します。
+        """
+        self.entries.clear()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        """
+        マニフェストを閉じ、重複した記録をまとめて書き直します。
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._rewrite()
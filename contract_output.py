@@ -0,0 +1,395 @@
+import csv
+import hashlib
+import os
+import threading
+import time
+import zipfile
+
+# 契約書の保存先を記録する索引ファイル名
+# （ZIP 出力ではアーカイブとエントリ名、ファイル出力では相対パスを記録します）
+ARCHIVE_INDEX_FILENAME = "contracts_index.csv"
+
+# 索引ファイルの列名
+ARCHIVE_INDEX_COLUMNS = ["filename", "row", "archive", "entry"]
+
+# ファイル出力で、索引をまとめて書き出す件数
+INDEX_FLUSH_ROWS = 1000
+
+# ZIP の1エントリあたりのヘッダーなどの概算サイズ（バイト）
+_ZIP_ENTRY_OVERHEAD = 128
+
+# 出力ディレクトリのサブディレクトリの分け方
+OUTPUT_LAYOUTS = ("flat", "hash", "date")
+
+# ファイル名の最大文字数（拡張子などを付ける前の長さです）
+FILENAME_MAX_LENGTH = 120
+
+# ファイル名に使えない文字（Windows の禁止文字と制御文字）
+UNSAFE_FILENAME_CHARS = r'[\\/:*?"<>|\x00-\x1f]'
+
+# Windows でファイル名に使えない予約名（拡張子が付いていても使えません）
+WINDOWS_RESERVED_NAMES = r"(?i)(CON|PRN|AUX|NUL|COM[1-9]|LPT[1-9])(\.|$)"
+
+
+def sanitize_filenames(names, max_length=FILENAME_MAX_LENGTH):
+    """
+    ファイル名に使えない文字を "_" に置き換え、どの OS でも保存できる名前にします。
+
+    行ごとのループを使わず、列単位でまとめて変換します。
+
+    - Unicode の表記ゆれ（濁点の結合文字など）を NFC にそろえます
+    - Windows で使えない文字・制御文字を "_" に置き換えます
+    - 末尾の空白とピリオドを取り除きます
+    - CON や NUL などの Windows の予約名には先頭に "_" を付けます
+    - 長すぎる名前は max_length 文字で切り詰めます
+
+    Args:
+        names (pd.Series): 元の名前の列
+
+    Returns:
+        pd.Series: 変換した名前の列
+    """
+    names = (
+        names.astype(str)
+        .str.normalize("NFC")
+        .str.replace(UNSAFE_FILENAME_CHARS, "_", regex=True)
+        .str.strip()
+        .str.rstrip(". ")
+    )
+    reserved = names.str.match(WINDOWS_RESERVED_NAMES)
+    names = names.mask(reserved, "_" + names)
+    names = names.str.slice(0, max_length)
+    return names.mask(names.eq(""), "_")
+
+
+def sanitize_filename(name, max_length=FILENAME_MAX_LENGTH):
+    """
+    1つの名前を sanitize_filenames と同じ規則で変換します。
+    """
+    import pandas as pd
+
+    return sanitize_filenames(pd.Series([name]), max_length).iloc[0]
+
+
+def shard_path(filename, layout, date=None):
+    """
+    出力ディレクトリからの相対パス（サブディレクトリを含む）を返します。
+
+    Args:
+        filename (str): 出力ファイル名
+        layout (str): "flat"（サブディレクトリなし）、"hash"（ファイル名の
+            ハッシュ値の先頭2文字ずつで2階層。例: "3f/a2/Contract_A.docx"）、
+            "date"（保存した日付。例: "2025/01/31/Contract_A.docx"）
+        date (time.struct_time | None): "date" で使う日付（省略時は今日）
+    """
+    if layout == "flat":
+        return filename
+    if layout == "hash":
+        digest = hashlib.sha1(filename.encode("utf-8")).hexdigest()
+        return f"{digest[:2]}/{digest[2:4]}/{filename}"
+    if layout == "date":
+        return time.strftime("%Y/%m/%d/", date or time.localtime()) + filename
+    raise ValueError(f"不明な出力レイアウトです: {layout}")
+
+
+def read_index(index_path):
+    """
+    索引ファイルを読み込み、{ファイル名: 索引の行} を返します。
+
+    追記の途中で中断されて列が欠けた（または余分な）行は読み飛ばします。
+    同じファイル名の行が複数ある場合は、後から追記した行を使います。
+    """
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path, encoding="utf-8", newline="") as f:
+        return {
+            row["filename"]: row
+            for row in csv.DictReader(f)
+            if None not in row and None not in row.values()
+        }
+
+
+def write_index(index_path, entries):
+    """
+    索引ファイルを書き出します。
+
+    一時ファイルに書き出してから置き換えるため、
+    書き込み中に中断されても壊れた索引は残りません。
+    """
+    temp_path = index_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=ARCHIVE_INDEX_COLUMNS)
+        writer.writeheader()
+        writer.writerows(entries.values())
+    os.replace(temp_path, index_path)
+
+
+def append_index(index_path, rows):
+    """
+    索引ファイルの末尾に行を追記します（ファイルがなければ列名から書きます）。
+
+    保存するたびに追記しておくと、途中で中断されても保存済みの契約書の
+    場所が索引に残り、次回の実行で同じ場所を参照できます。
+    """
+    with open(index_path, "a", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=ARCHIVE_INDEX_COLUMNS)
+        if f.tell() == 0:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+class DirectoryOutput:
+    """
+    生成した契約書を1件ずつファイルとして出力ディレクトリに保存します。
+
+    layout に "hash" または "date" を指定すると、サブディレクトリに分けて
+    保存します（1つのディレクトリに数十万件のファイルが並ぶと、ファイルの
+    検索や一覧の表示が遅くなるためです）。どのファイルをどこに保存したかは
+    出力ディレクトリの contracts_index.csv に追記し（archive 列は空欄）、
+    次回以降も同じ場所に上書きします。close で重複した行をまとめて
+    索引を書き直します。
+
+    索引は開いたままのファイルにバッファーを使って追記し、
+    INDEX_FLUSH_ROWS 件ごとに書き出します。保存先が実行日で変わる
+    "date" レイアウトだけは、中断しても次回に同じ場所を使えるよう、
+    ファイルを保存する前に1件ずつ書き出します。
+
+    ファイルごとに書き込むため、複数のスレッドから同時に save できます。
+    """
+
+    # 同時に save できるスレッドの数（None は制限なし）
+    max_writers = None
+
+    def __init__(self, output_dir, layout="flat"):
+        """
+        Args:
+            output_dir (str): 出力先ディレクトリ
+            layout (str): サブディレクトリの分け方（shard_path を参照）
+        """
+        shard_path("", layout)  # 不明なレイアウトはここでエラーにします
+        self.output_dir = output_dir
+        self.layout = layout
+        self.index_path = os.path.join(output_dir, ARCHIVE_INDEX_FILENAME)
+        # ZIP 出力の記録も残すため、索引はすべて読み込みます
+        self.entries = read_index(self.index_path)
+        self._date = time.localtime()
+        self._index_file = None
+        self._index_writer = None
+        self._unflushed = 0
+        self._index_lock = threading.Lock()
+        # 作成済みのサブディレクトリ（同じディレクトリを何度も確認しません）
+        self._made_dirs = set()
+
+    def path_of(self, filename):
+        """
+        契約書の保存先の相対パスを返します（保存済みであれば前回と同じ場所）。
+        """
+        entry = self.entries.get(filename)
+        if entry is not None and not entry["archive"]:
+            return entry["entry"]
+        return shard_path(filename, self.layout, self._date)
+
+    def exists(self, filename):
+        """
+        指定したファイル名の契約書が出力済みか確認します。
+        """
+        return os.path.exists(
+            os.path.join(self.output_dir, self.path_of(filename))
+        )
+
+    def save(self, index, filename, data):
+        """
+        契約書を保存し、保存先のパスを返します。
+
+        Args:
+            index: 行番号
+            filename (str): 出力ファイル名
+            data (bytes): .docx ファイルのバイト列
+
+        Returns:
+            str: 保存先のパス（ログ出力用）
+        """
+        relative_path = self.path_of(filename)
+        output_path = os.path.join(self.output_dir, relative_path)
+        entry = {
+            "filename": filename,
+            "row": index,
+            "archive": "",
+            "entry": relative_path,
+        }
+        # ファイルより先に保存先を索引に追記します。書き込み中に中断されても
+        # 次回は同じ場所に上書きするため、"date" レイアウトで日付をまたいで
+        # 再実行しても、同じ契約書が別の日付のディレクトリに重複しません
+        with self._index_lock:
+            self._append_entry(entry)
+        directory = os.path.dirname(output_path)
+        if directory not in self._made_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._made_dirs.add(directory)
+        with open(output_path, "wb") as f:
+            f.write(data)
+        return output_path
+
+    def _append_entry(self, entry):
+        """
+        索引に1件追記します（ロックを取得した状態で呼び出します）。
+        """
+        if self._index_file is None:
+            # 前回中断したときの書きかけの行を取り除いてから追記します
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._made_dirs.add(self.output_dir)
+            write_index(self.index_path, self.entries)
+            self._index_file = open(
+                self.index_path, "a", encoding="utf-8", newline=""
+            )
+            self._index_writer = csv.DictWriter(
+                self._index_file, fieldnames=ARCHIVE_INDEX_COLUMNS
+            )
+        self.entries[entry["filename"]] = entry
+        self._index_writer.writerow(entry)
+        self._unflushed += 1
+        if self.layout == "date" or self._unflushed >= INDEX_FLUSH_ROWS:
+            self._index_file.flush()
+            self._unflushed = 0
+
+    def close(self):
+        """
+        重複した行をまとめて索引ファイルを書き直します
+        （保存した契約書がない場合は何もしません）。
+        """
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = self._index_writer = None
+            write_index(self.index_path, self.entries)
+
+
+class ZipArchiveOutput:
+    """
+    生成した契約書を ZIP アーカイブにまとめて保存します。
+
+    契約書ごとにファイルを作る代わりに、メモリ上で生成したバイト列を
+    そのまま ZIP のエントリとして書き込みます。アーカイブが max_bytes を
+    超えそうになったら、次の番号のアーカイブに切り替えます。
+    .docx 自体がすでに圧縮されているため、エントリは無圧縮で格納します。
+
+    どの行がどのアーカイブのどのエントリに入っているかは、
+    出力ディレクトリの contracts_index.csv に記録します。ZIP のエントリは
+    アーカイブを閉じるまで読み出せないため、アーカイブを切り替えるたびに
+    閉じたアーカイブの分を索引に追記します。
+    変更のない行を読み飛ばした場合でも、前回の記録は索引に残ります。
+
+    1つのアーカイブへ順に書き込むため、save は同時に1つのスレッドだけが
+    実行できます（他のスレッドから呼ばれた場合は前の書き込みを待ちます）。
+    """
+
+    # 同時に save できるスレッドの数
+    max_writers = 1
+
+    def __init__(self, output_dir, max_bytes):
+        """
+        Args:
+            output_dir (str): 出力先ディレクトリ
+            max_bytes (int): 1つのアーカイブの最大サイズ（バイト）
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(output_dir, ARCHIVE_INDEX_FILENAME)
+        self.entries = read_index(self.index_path)
+
+        # アーカイブ名の重複を避けるため、実行ごとに日時を付けます
+        self._prefix = time.strftime("contracts_%Y%m%d_%H%M%S")
+        self._archive = None
+        self._archive_name = None
+        self._archive_size = 0
+        self._archive_count = 0
+        # 開いているアーカイブに書き込んだが、まだ索引に追記していない行
+        self._unindexed = []
+        self._lock = threading.Lock()
+
+    def exists(self, filename):
+        """
+        指定したファイル名の契約書がいずれかのアーカイブに格納済みか確認します。
+        """
+        entry = self.entries.get(filename)
+        # archive 列が空欄の記録は、ファイルとして保存したものです
+        return bool(entry and entry["archive"]) and os.path.exists(
+            os.path.join(self.output_dir, entry["archive"])
+        )
+
+    def _close_archive(self):
+        """
+        現在のアーカイブを閉じ、書き込んだエントリを索引に追記します。
+        """
+        self._archive.close()
+        self._archive = None
+        append_index(self.index_path, self._unindexed)
+        self._unindexed = []
+
+    def _next_archive(self):
+        """
+        現在のアーカイブを閉じ、次の番号のアーカイブを開きます。
+        """
+        if self._archive is not None:
+            self._close_archive()
+        else:
+            # 前回中断したときの書きかけの行を取り除いてから追記します
+            write_index(self.index_path, self.entries)
+        self._archive_count += 1
+        self._archive_name = f"{self._prefix}_{self._archive_count:04d}.zip"
+        self._archive = zipfile.ZipFile(
+            os.path.join(self.output_dir, self._archive_name),
+            "w",
+            compression=zipfile.ZIP_STORED,
+        )
+        self._archive_size = 0
+
+    def save(self, index, filename, data):
+        """
+        契約書をアーカイブのエントリとして書き込みます。
+
+        Args:
+            index: 行番号
+            filename (str): エントリ名
+            data (bytes): .docx ファイルのバイト列
+
+        Returns:
+            str: "アーカイブ名:エントリ名"（ログ出力用）
+        """
+        with self._lock:
+            return self._save(index, filename, data)
+
+    def _save(self, index, filename, data):
+        """
+        save の本体です（ロックを取得した状態で呼び出します）。
+        """
+        entry_size = len(data) + len(filename.encode("utf-8")) * 2
+        entry_size += _ZIP_ENTRY_OVERHEAD
+        if self._archive is None or (
+            self._archive_size > 0
+            and self._archive_size + entry_size > self.max_bytes
+        ):
+            self._next_archive()
+
+        info = zipfile.ZipInfo(filename, time.localtime()[:6])
+        self._archive.writestr(info, data)
+        self._archive_size += entry_size
+
+        entry = {
+            "filename": filename,
+            "row": index,
+            "archive": self._archive_name,
+            "entry": filename,
+        }
+        self.entries[filename] = entry
+        self._unindexed.append(entry)
+        return f"{self._archive_name}:{filename}"
+
+    def close(self):
+        """
+        アーカイブを閉じ、重複した行をまとめて索引ファイルを書き直します
+        （write_index を参照）。
+        """
+        if self._archive is not None:
+            self._close_archive()
+        write_index(self.index_path, self.entries)
@@ -0,0 +1,447 @@
+import os
+import re
+import struct
+import threading
+import time
+import zipfile
+import zlib
+from collections import OrderedDict
+from xml.sax.saxutils import escape
+
+# {{placeholder}} 形式のプレースホルダーを検出する正規表現
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+
+# Word の文字列ノード (<w:t>...</w:t>) を検出する正規表現
+TEXT_NODE_PATTERN = re.compile(r"(<w:t(?:\s[^>]*)?>)([^<]*)</w:t>")
+
+# 段落の区切り（この前後の文字列ノードはつなげて扱いません）
+PARAGRAPH_BOUNDARY_PATTERN = re.compile(r"</w:p>|<w:p[\s>]")
+
+# プレースホルダーを探す対象の XML パーツ（本文・ヘッダー・フッター）
+TEMPLATE_PART_PATTERN = re.compile(
+    r"^word/(document|header\d*|footer\d*)\.xml$"
+)
+
+# ZIP の各種シグネチャ
+_LOCAL_HEADER_SIGNATURE = 0x04034B50
+_CENTRAL_HEADER_SIGNATURE = 0x02014B50
+_END_OF_CENTRAL_DIR_SIGNATURE = 0x06054B50
+
+# ファイル名を UTF-8 として扱うことを示すフラグ
+_UTF8_FLAG = 0x800
+
+# 解析済みテンプレートをメモリ上に保持する最大件数と最大サイズ（バイト）
+TEMPLATE_CACHE_MAX_ENTRIES = 32
+TEMPLATE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _deflate(data):
+    """
+    ZIP 格納用に raw deflate 形式で圧縮します。
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _dos_timestamp(timestamp=None):
+    """
+    ZIP ヘッダー用の DOS 形式の日付・時刻を返します。
+    """
+    t = time.localtime(timestamp)
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+def _group_text_nodes(xml_text):
+    """
+    文字列ノードを段落ごとのグループに分けて返します。
+
+    Returns:
+        list[list[re.Match]]: 段落ごとの文字列ノードの一致結果
+    """
+    groups = []
+    previous_end = None
+    for match in TEXT_NODE_PATTERN.finditer(xml_text):
+        if previous_end is None or PARAGRAPH_BOUNDARY_PATTERN.search(
+            xml_text, previous_end, match.start()
+        ):
+            groups.append([])
+        groups[-1].append(match)
+        previous_end = match.end()
+    return groups
+
+
+def _merge_group(texts):
+    """
+    1段落分の文字列ノードのテキストで、複数ノードにまたがる
+    プレースホルダーを最初のノードにまとめます。
+
+    Args:
+        texts (list[str]): 各ノードのテキスト
+
+    Returns:
+        list[str]: まとめた後の各ノードのテキスト（変更がなければ同じ内容）
+    """
+    # 段落全体のテキストの各文字が、どのノードに属するかを記録します
+    owners = [i for i, text in enumerate(texts) for _ in text]
+    joined = "".join(texts)
+    for match in PLACEHOLDER_PATTERN.finditer(joined):
+        first = owners[match.start()]
+        if owners[match.end() - 1] != first:
+            owners[match.start() : match.end()] = [first] * len(match.group())
+
+    merged = [[] for _ in texts]
+    for char, owner in zip(joined, owners):
+        merged[owner].append(char)
+    return ["".join(chars) for chars in merged]
+
+
+def merge_split_placeholders(xml_text):
+    """
+    Word が複数の run に分割したプレースホルダーを1つの run にまとめます。
+
+    Word で編集すると "{{prop" と "erty_name}}" のように、1つのプレースホルダーが
+    スペルチェックや書式の境目で別々の run (<w:r>) に分かれることがあります。
+    段落ごとに文字列ノードのテキストをつなげてプレースホルダーを探し、
+    またがっているものは最初のノードへ移します。置換後の文字列には
+    プレースホルダーが始まる run の書式が適用されます。
+
+    Args:
+        xml_text (str): XML パーツのテキスト
+
+    Returns:
+        str: プレースホルダーをまとめた XML テキスト
+    """
+    if "{" not in xml_text:
+        return xml_text
+
+    pieces = []
+    position = 0
+    for group in _group_text_nodes(xml_text):
+        texts = [match.group(2) for match in group]
+        merged = _merge_group(texts)
+        if merged == texts:
+            continue
+        for match, text in zip(group, merged):
+            tag = match.group(1)
+            if text != text.strip() and "xml:space" not in tag:
+                # 前後の空白が消えないように指定します
+                tag = tag[:-1] + ' xml:space="preserve">'
+            pieces.append(xml_text[position : match.start()])
+            pieces.append(f"{tag}{text}</w:t>")
+            position = match.end()
+    pieces.append(xml_text[position:])
+    return "".join(pieces)
+
+
+class _ZipEntry:
+    """
+    圧縮済みの ZIP エントリ（名前・CRC・圧縮データ）を保持します。
+    """
+
+    __slots__ = ("name", "crc", "size", "data")
+
+    def __init__(self, name, raw):
+        self.name = name.encode("utf-8")
+        self.crc = zlib.crc32(raw)
+        self.size = len(raw)
+        self.data = _deflate(raw)
+
+
+def build_zip(entries, timestamp=None):
+    """
+    圧縮済みエントリの並びから ZIP ファイルのバイト列を組み立てます。
+
+    テンプレートの固定パーツは事前に圧縮しておけるため、
+    行ごとに圧縮し直す必要があるのはプレースホルダーを含むパーツだけです。
+
+    Args:
+        entries (list[_ZipEntry]): 格納するエントリ
+        timestamp (float | None): ファイルに記録する更新日時
+
+    Returns:
+        bytes: ZIP ファイル全体のバイト列
+    """
+    dos_time, dos_date = _dos_timestamp(timestamp)
+    chunks = []
+    central = []
+    offset = 0
+
+    for entry in entries:
+        header = struct.pack(
+            "<IHHHHHIIIHH",
+            _LOCAL_HEADER_SIGNATURE,
+            20,
+            _UTF8_FLAG,
+            zipfile.ZIP_DEFLATED,
+            dos_time,
+            dos_date,
+            entry.crc,
+            len(entry.data),
+            entry.size,
+            len(entry.name),
+            0,
+        )
+        central.append(
+            struct.pack(
+                "<IHHHHHHIIIHHHHHII",
+                _CENTRAL_HEADER_SIGNATURE,
+                20,
+                20,
+                _UTF8_FLAG,
+                zipfile.ZIP_DEFLATED,
+                dos_time,
+                dos_date,
+                entry.crc,
+                len(entry.data),
+                entry.size,
+                len(entry.name),
+                0,
+                0,
+                0,
+                0,
+                0,
+                offset,
+            )
+            + entry.name
+        )
+        chunks.append(header)
+        chunks.append(entry.name)
+        chunks.append(entry.data)
+        offset += len(header) + len(entry.name) + len(entry.data)
+
+    central_bytes = b"".join(central)
+    end_record = struct.pack(
+        "<IHHHHIIH",
+        _END_OF_CENTRAL_DIR_SIGNATURE,
+        0,
+        0,
+        len(entries),
+        len(entries),
+        len(central_bytes),
+        offset,
+        0,
+    )
+    return b"".join(chunks) + central_bytes + end_record
+
+
+class CompiledTemplate:
+    """
+    一度だけ解析した Word テンプレートから契約書を高速に生成するクラスです。
+
+    テンプレート (.docx) を読み込む際に、プレースホルダーを含む XML パーツを
+    「固定テキスト」と「プレースホルダー名」の並びに分解して記録します。
+    それ以外のパーツは圧縮済みの状態で保持するため、1件ごとの処理は
+    プレースホルダー部分の差し込みと、そのパーツの再圧縮だけで済みます。
+
+    XML 全体を1回走査するだけで、本文・表のセル・ヘッダー・フッターの
+    すべてのプレースホルダーを差し込みます。処理時間は文書の大きさに
+    比例し、プレースホルダーの数が増えても1件あたりの走査回数は増えません。
+    run の書式 (<w:rPr>) には手を加えないため、書式はそのまま残ります。
+
+    Attributes:
+        path (str): テンプレートファイルのパス
+        placeholders (frozenset[str]): テンプレート内のプレースホルダー名
+        nbytes (int): 保持しているデータのおおよそのサイズ（バイト）
+    """
+
+    def __init__(self, template_path):
+        self.path = template_path
+        self._parts = []
+
+        with zipfile.ZipFile(template_path) as archive:
+            for info in archive.infolist():
+                raw = archive.read(info)
+                if TEMPLATE_PART_PATTERN.match(info.filename):
+                    segments = self._compile_part(raw.decode("utf-8"))
+                    if len(segments) > 1:
+                        self._parts.append((info.filename, segments))
+                        continue
+                self._parts.append(_ZipEntry(info.filename, raw))
+
+        self.placeholders = frozenset(
+            name
+            for part in self._parts
+            if not isinstance(part, _ZipEntry)
+            for name in part[1][1::2]
+        )
+        self.nbytes = sum(
+            (
+                len(part.data)
+                if isinstance(part, _ZipEntry)
+                else sum(len(segment) for segment in part[1])
+            )
+            for part in self._parts
+        )
+
+    @staticmethod
+    def _compile_part(xml_text):
+        """
+        XML テキストを固定部分とプレースホルダー名が交互に並ぶリストに分解します。
+
+        例: "<w:t>{{address}}</w:t>" -> ["<w:t>", "address", "</w:t>"]
+        偶数番目が固定テキスト、奇数番目がプレースホルダー名です。
+        複数の run に分かれたプレースホルダーは、先に1つにまとめます。
+        """
+        xml_text = merge_split_placeholders(xml_text)
+        segments = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(xml_text):
+            segments.append(xml_text[position : match.start()])
+            segments.append(match.group(1))
+            position = match.end()
+        segments.append(xml_text[position:])
+        return segments
+
+    def render(self, values):
+        """
+        置換値を差し込んだ .docx ファイルのバイト列を生成します。
+
+        Args:
+            values (dict[str, str]): プレースホルダー名と置換文字列の辞書
+                （キーは "{{" "}}" を含まない名前です）
+
+        Returns:
+            bytes: 生成した .docx のバイト列
+        """
+        entries = []
+        for part in self._parts:
+            if isinstance(part, _ZipEntry):
+                entries.append(part)
+                continue
+
+            name, segments = part
+            pieces = list(segments)
+            for i in range(1, len(pieces), 2):
+                placeholder = pieces[i]
+                if placeholder in values:
+                    pieces[i] = escape(str(values[placeholder]))
+                else:
+                    # 値がないプレースホルダーはそのまま残します
+                    pieces[i] = "{{" + placeholder + "}}"
+            entries.append(_ZipEntry(name, "".join(pieces).encode("utf-8")))
+
+        return build_zip(entries)
+
+    def save(self, values, output_path):
+        """
+        置換値を差し込んだ .docx ファイルを保存します。
+
+        Args:
+            values (dict[str, str]): プレースホルダー名と置換文字列の辞書
+            output_path (str): 保存先のパス
+        """
+        data = self.render(values)
+        with open(output_path, "wb") as f:
+            f.write(data)
+
+
+class TemplateCache:
+    """
+    解析済みのテンプレートを、最近使った順に決まった量だけ保持するクラスです。
+
+    件数 (max_entries) と合計サイズ (max_bytes) のどちらかを超えると、
+    最も長く使われていないテンプレートから捨てます（LRU 方式）。
+    テンプレートのファイルが更新された場合は、解析し直します。
+
+    Attributes:
+        hits (int): 保持していたテンプレートを返した回数
+        misses (int): テンプレートを解析した回数
+        evictions (int): 上限を超えたために捨てた回数
+    """
+
+    def __init__(
+        self,
+        max_entries=TEMPLATE_CACHE_MAX_ENTRIES,
+        max_bytes=TEMPLATE_CACHE_MAX_BYTES,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # テンプレートの絶対パス -> (更新日時, サイズ, CompiledTemplate)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        """
+        保持しているテンプレートの合計サイズ（バイト）です。
+        """
+        return self._bytes
+
+    def get(self, template_path):
+        """
+        解析済みのテンプレートを返します（保持していなければ解析します）。
+        """
+        key = os.path.abspath(template_path)
+        stat = os.stat(key)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[:2] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+
+        # 解析には時間がかかるため、ロックの外で行います
+        template = CompiledTemplate(template_path)
+        with self._lock:
+            self.misses += 1
+            self._store(key, signature, template)
+        return template
+
+    def _store(self, key, signature, template):
+        """
+        テンプレートを追加し、上限を超えた分を古いものから捨てます。
+        """
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[2].nbytes
+        self._entries[key] = (*signature, template)
+        self._bytes += template.nbytes
+
+        # 直前に追加したものは、上限より大きくても1件だけは残します
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries
+            or self._bytes > self.max_bytes
+        ):
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        """
+        保持しているテンプレートをすべて捨てます。
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+# プロセス全体で共有する解析済みテンプレートのキャッシュ
+_template_cache = TemplateCache()
+
+
+def load_template(template_path):
+    """
+    解析済みのテンプレートを返します。
+
+    同じプロセスで同じテンプレートを何度も使う場合（行ごとにテンプレートを
+    選ぶ場合や常駐プロセスなど）に、ファイルが変わっていなければ
+    前回解析した結果を使い回します。保持する量には上限があり、
+    最も長く使われていないテンプレートから捨てます（TemplateCache を参照）。
+
+    Args:
+        template_path (str): テンプレートファイルのパス
+
+    Returns:
+        CompiledTemplate: 解析済みのテンプレート
+    """
+    return _template_cache.get(template_path)
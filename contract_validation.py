@@ -0,0 +1,183 @@
+"""
+契約データの検証と、差し込み用の文字列への変換を列単位でまとめて行うモジュールです。
+
+1行ずつ処理するのではなく、列全体に対して一度に判定・変換するため、
+行数が多くても高速に処理できます。問題のある行は契約書を生成する前に
+取り除き、理由を一覧（除外レポート）にまとめます。
+"""
+
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from excel_writer import StreamingExcelWriter
+
+# 行ごとにテンプレートを選ぶ場合の列名（省略可）
+TEMPLATE_COLUMN = "template"
+
+# 金額として受け付ける絶対値の上限
+# （これより大きい値は小数の誤差で桁が正しく表示できないため除外します）
+MAX_AMOUNT = 10**15
+
+# 除外レポートのファイル名（出力ディレクトリに作成します）
+REJECTION_REPORT_FILENAME = "rejected_rows.xlsx"
+
+# 検証結果（rows: 差し込み用の文字列に変換済みの正常な行、rejected: 除外した行）
+PreparedContracts = namedtuple("PreparedContracts", ["rows", "rejected"])
+
+
+def find_problems(df):
+    """
+    各行の問題点を列単位で判定します。
+
+    物件名の重複とファイル名に使えない文字は問題としません
+    （出力ファイル名は generate_contracts.assign_output_names で、
+    重複しない安全な名前に変換します）。
+
+    Args:
+        df (pd.DataFrame): property_name, address, amount 列を含む契約データ
+
+    Returns:
+        list[tuple[pd.Series, str]]: (問題がある行を表す bool 列, 理由) の一覧
+    """
+    text = {
+        column: df[column].astype("string").str.strip()
+        for column in ["property_name", "address", "amount"]
+    }
+    missing = {
+        column: values.isna() | values.eq("")
+        for column, values in text.items()
+    }
+    amounts = pd.to_numeric(df["amount"], errors="coerce")
+
+    problems = [
+        (missing[column], f"{column} が空欄です") for column in missing
+    ]
+    problems.append(
+        (amounts.isna() & ~missing["amount"], "amount が数値ではありません")
+    )
+    # inf や 1e30 のような値は数値ですが、金額としては扱えません
+    problems.append(
+        (
+            amounts.notna() & ~(amounts.abs() <= MAX_AMOUNT),
+            "amount が大きすぎるか有限の値ではありません",
+        )
+    )
+    return [
+        (mask.fillna(False).astype(bool), reason) for mask, reason in problems
+    ]
+
+
+def format_amounts(amounts):
+    """
+    金額の列を3桁区切りの文字列に変換します（例: 100000 -> "100,000"）。
+
+    整数の値は小数点なしで、小数を含む値はそのまま3桁区切りにします。
+    整数への変換は行わないため、find_problems で除外していない大きな値を
+    渡しても桁があふれることはありません。
+    """
+    numbers = pd.to_numeric(amounts, errors="coerce").astype(float)
+    integral = np.isfinite(numbers) & (numbers == np.floor(numbers))
+    formatted = pd.Series("", index=amounts.index, dtype=object)
+    formatted[integral] = numbers[integral].map("{:,.0f}".format)
+    formatted[~integral] = numbers[~integral].map("{:,}".format)
+    return formatted
+
+
+def resolve_templates(names, resolve_template):
+    """
+    template 列の値を、テンプレートファイルのパスに変換します。
+
+    同じ値は1回だけ変換するため、行数が多くても変換の回数は
+    テンプレートの種類の数だけです。
+
+    Args:
+        names (pd.Series): template 列
+        resolve_template: テンプレート名（空欄は None）を受け取り、
+            ファイルのパスを返す関数（見つからない場合は None を返します）
+
+    Returns:
+        pd.Series: 各行のテンプレートのパス（見つからない行は欠損値）
+    """
+    # 空欄は None にそろえます（既定のテンプレートを使う行です）
+    names = names.astype("string").str.strip()
+    names = names.mask(names.eq("")).astype(object)
+    names = names.where(names.notna(), None)
+    paths = {name: resolve_template(name) for name in names.unique()}
+    return names.map(paths)
+
+
+def prepare_contracts(df, resolve_template=None):
+    """
+    契約データを検証し、正常な行だけを差し込み用の文字列に変換します。
+
+    Args:
+        df (pd.DataFrame): property_name, address, amount 列を含む契約データ
+            （template 列があれば、行ごとにテンプレートを選びます）
+        resolve_template: テンプレート名をファイルのパスに変換する関数
+            （resolve_templates を参照。None の場合は template 列を使いません）
+
+    Returns:
+        PreparedContracts:
+            rows: 正常な行（各列はプレースホルダーに差し込む文字列。
+                template 列がある場合はテンプレートのパスも含みます）
+            rejected: 除外した行（行番号・物件名・理由）
+    """
+    problems = find_problems(df)
+    templates = None
+    if resolve_template is not None and TEMPLATE_COLUMN in df.columns:
+        templates = resolve_templates(df[TEMPLATE_COLUMN], resolve_template)
+        problems.append(
+            (templates.isna(), "template のファイルが見つかりません")
+        )
+
+    reasons = pd.Series("", index=df.index, dtype=object)
+    for mask, reason in problems:
+        reasons[mask] = reasons[mask] + reason + "、"
+    rejected_mask = reasons.ne("")
+
+    valid = df[~rejected_mask]
+    rows = pd.DataFrame(
+        {
+            "property_name": valid["property_name"].astype(str),
+            "address": valid["address"].astype(str),
+            "amount": format_amounts(valid["amount"]),
+        },
+        index=valid.index,
+    )
+    if templates is not None:
+        rows[TEMPLATE_COLUMN] = templates[~rejected_mask]
+
+    rejected = pd.DataFrame(
+        {
+            # Excel 上の行番号（ヘッダー行の次が2行目です）
+            "行番号": df.index[rejected_mask] + 2,
+            "property_name": df.loc[rejected_mask, "property_name"],
+            "理由": reasons[rejected_mask].str.rstrip("、"),
+        }
+    )
+    return PreparedContracts(rows, rejected.reset_index(drop=True))
+
+
+def write_rejection_report(rejected, output_dir):
+    """
+    除外した行の一覧を出力ディレクトリに Excel ファイルとして保存します。
+
+    除外した行がない場合は、前回のレポートが残っていれば削除します。
+
+    Returns:
+        str | None: 保存したファイルのパス（除外した行がない場合は None）
+    """
+    path = os.path.join(output_dir, REJECTION_REPORT_FILENAME)
+    if rejected.empty:
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+
+    os.makedirs(output_dir, exist_ok=True)
+    writer = StreamingExcelWriter(path)
+    writer.write_frame("除外一覧", rejected)
+    writer.save()
+    return path
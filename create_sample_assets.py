@@ -3,6 +3,7 @@ import os
 import pandas as pd
 from docx import Document
 
+import batch_runner  # 一時的なエラーの再試行用
 import utils  # ログ出力とエラーハンドリング用
 
 
@@ -48,8 +49,9 @@ def create_sample_data():
         excel_path = "data/contract_data.xlsx"
 
         # Excelファイルへの書き込み（外部I/Oなのでエラーハンドリング）
+        # ファイルが Excel で開かれているなどの一時的なエラーは再試行します
         try:
-            df.to_excel(excel_path, index=False)
+            batch_runner.call_with_retry(df.to_excel, excel_path, index=False)
             print(f"成功: Excelデータを作成しました: {excel_path}")
         except Exception as e:
             utils.log_error(f"Excelファイルの作成に失敗: {excel_path}")
@@ -84,7 +86,7 @@ def create_sample_data():
 
             # Wordファイルへの保存（外部I/Oなのでエラーハンドリング）
             template_path = "templates/contract_template.docx"
-            doc.save(template_path)
+            batch_runner.call_with_retry(doc.save, template_path)
             print(f"成功: Wordテンプレートを作成しました: {template_path}")
 
         except Exception as e:
@@ -0,0 +1,297 @@
+"""
+Chrome を操作するためのドライバ (chromedriver) の場所を決めるモジュールです。
+
+ChromeDriverManager().install() は実行のたびにインターネットで最新の
+バージョンを確認するため、起動が遅くなり、インターネットにつながらない
+環境では失敗します。ここでは次の順番でドライバを探し、見つかった場所を
+ローカルのキャッシュファイルに記録します。
+
+    1. 引数または環境変数 TEAM_PJ_CHROMEDRIVER で指定したドライバ
+    2. PATH 上の chromedriver
+    3. webdriver_manager・Selenium が過去にダウンロードしたドライバ
+    4. （許可した場合のみ）ChromeDriverManager によるダウンロード
+
+ドライバのメジャーバージョンがインストール済みの Chrome と一致するものだけを
+使います。キャッシュが有効な間（既定は7日）は Chrome が更新されていない限り
+バージョンの確認も省略するため、ドライバの起動に余分な時間がかかりません。
+
+インターネットからのダウンロードは、引数 allow_download=True か
+環境変数 TEAM_PJ_ALLOW_DRIVER_DOWNLOAD=1 を指定した場合だけ行います。
+"""
+
+import glob
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from collections import namedtuple
+
+# 解決したドライバの場所を記録するキャッシュファイル
+DRIVER_CACHE_PATH = ".cache/drivers/chromedriver.json"
+
+# キャッシュの有効期間（秒）
+DRIVER_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Chrome の実行ファイルとして探す名前
+BROWSER_NAMES = (
+    "google-chrome",
+    "google-chrome-stable",
+    "chromium",
+    "chromium-browser",
+    "chrome",
+)
+
+# webdriver_manager・Selenium がドライバを保存するディレクトリ
+DOWNLOADED_DRIVER_PATTERNS = (
+    "~/.wdm/drivers/chromedriver/**/chromedriver*",
+    "~/.cache/selenium/chromedriver/**/chromedriver*",
+)
+
+# "Google Chrome 120.0.6099.109" のような出力からバージョンを取り出す正規表現
+VERSION_PATTERN = re.compile(r"(\d+)\.\d+\.\d+(?:\.\d+)?")
+
+# 解決結果（バージョンは "120.0.6099.109" のような文字列）
+ResolvedDriver = namedtuple(
+    "ResolvedDriver",
+    ["driver_path", "driver_version", "browser_path", "browser_version"],
+)
+
+
+def _env_flag(name):
+    """
+    環境変数が "1" や "true" などの有効を示す値かどうかを返します。
+    """
+    return os.environ.get(name, "").lower() in ("1", "true", "yes")
+
+
+def read_version(executable):
+    """
+    実行ファイルを --version 付きで起動し、バージョンを返します。
+
+    Returns:
+        str | None: "120.0.6099.109" のようなバージョン（取得できない場合は None）
+    """
+    try:
+        completed = subprocess.run(
+            [executable, "--version"],
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    match = VERSION_PATTERN.search(completed.stdout)
+    return match.group(0) if match else None
+
+
+def _major(version):
+    """
+    バージョン文字列のメジャーバージョン（先頭の数字）を返します。
+    """
+    return version.split(".", 1)[0]
+
+
+def find_browser(browser_path=None):
+    """
+    Chrome の実行ファイルのパスを返します。
+
+    Args:
+        browser_path (str | None): 指定した場合はこのパスを使います
+            （省略時は環境変数 TEAM_PJ_CHROME_BINARY、次に PATH を探します）
+    """
+    browser_path = browser_path or os.environ.get("TEAM_PJ_CHROME_BINARY")
+    if browser_path:
+        return browser_path
+    for name in BROWSER_NAMES:
+        found = shutil.which(name)
+        if found:
+            return found
+    return None
+
+
+def candidate_drivers(driver_path=None):
+    """
+    ドライバの候補のパスを、優先する順に返します。
+    """
+    configured = driver_path or os.environ.get("TEAM_PJ_CHROMEDRIVER")
+    if configured:
+        # 明示的に指定された場合は、他の場所を探しません
+        return [configured]
+
+    candidates = []
+    on_path = shutil.which("chromedriver")
+    if on_path:
+        candidates.append(on_path)
+    for pattern in DOWNLOADED_DRIVER_PATTERNS:
+        matches = glob.glob(os.path.expanduser(pattern), recursive=True)
+        # 新しくダウンロードしたものを先に試します
+        matches.sort(key=os.path.getmtime, reverse=True)
+        candidates.extend(
+            path
+            for path in matches
+            if os.path.isfile(path) and os.access(path, os.X_OK)
+        )
+    return candidates
+
+
+def _file_signature(path):
+    """
+    ファイルが更新されたかどうかを判定するための (更新日時, サイズ) を返します。
+    """
+    if not path or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _requested(driver_path, browser_path):
+    """
+    引数と環境変数から、指定されたドライバと Chrome のパスを返します。
+
+    キャッシュを使えるかどうかの判定に使います（環境変数を変えた場合も
+    キャッシュを使わずに探し直すためです）。
+    """
+    return [
+        driver_path or os.environ.get("TEAM_PJ_CHROMEDRIVER"),
+        browser_path or os.environ.get("TEAM_PJ_CHROME_BINARY"),
+    ]
+
+
+def _load_cached(cache_path, ttl, requested):
+    """
+    キャッシュが有効であれば、記録した解決結果を返します。
+
+    期限切れ・ドライバの削除・Chrome の更新・指定の変更（引数と環境変数）が
+    あった場合は None を返します。
+    """
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    resolved = ResolvedDriver(**entry["resolved"])
+    if (
+        time.time() - entry["resolved_at"] > ttl
+        or entry["requested"] != requested
+        or not os.path.exists(resolved.driver_path)
+        or entry["browser_signature"] != _file_signature(resolved.browser_path)
+    ):
+        return None
+    return resolved
+
+
+def _save_cached(cache_path, resolved, requested):
+    """
+    解決結果をキャッシュファイルに記録します。
+
+    BrowserPool が複数のブラウザを同時に起動する場合に備えて、
+    一時ファイルの名前は呼び出しごとに変えてから置き換えます。
+    """
+    cache_dir = os.path.dirname(cache_path) or "."
+    os.makedirs(cache_dir, exist_ok=True)
+    entry = {
+        "resolved_at": time.time(),
+        "requested": requested,
+        "browser_signature": _file_signature(resolved.browser_path),
+        "resolved": resolved._asdict(),
+    }
+    fd, temp_path = tempfile.mkstemp(
+        dir=cache_dir, prefix=os.path.basename(cache_path), suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, cache_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _download_driver(browser_version):
+    """
+    ChromeDriverManager で Chrome に合ったドライバをダウンロードします。
+    """
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    if browser_version:
+        return ChromeDriverManager(driver_version=browser_version).install()
+    return ChromeDriverManager().install()
+
+
+def _find_matching_driver(candidates, browser_version):
+    """
+    候補の中から Chrome とメジャーバージョンが一致するドライバを探します。
+
+    Returns:
+        tuple[str, str] | None: (ドライバのパス, バージョン)
+    """
+    for path in candidates:
+        version = read_version(path)
+        if version is None:
+            continue
+        if browser_version is None or _major(version) == _major(
+            browser_version
+        ):
+            return path, version
+    return None
+
+
+def resolve_chromedriver(
+    driver_path=None,
+    browser_path=None,
+    allow_download=None,
+    cache_path=DRIVER_CACHE_PATH,
+    ttl=DRIVER_CACHE_TTL_SECONDS,
+):
+    """
+    使用する chromedriver を決めて返します。
+
+    Args:
+        driver_path (str | None): 使用するドライバのパス
+        browser_path (str | None): 使用する Chrome のパス
+        allow_download (bool | None): ドライバのダウンロードを許可するか
+            （None の場合は環境変数 TEAM_PJ_ALLOW_DRIVER_DOWNLOAD に従います）
+        cache_path (str): 解決結果を記録するキャッシュファイル
+        ttl (float): キャッシュの有効期間（秒）
+
+    Returns:
+        ResolvedDriver: 解決したドライバと Chrome の情報
+
+    Raises:
+        FileNotFoundError: Chrome に合うドライバが見つからず、
+            ダウンロードも許可されていない場合
+    """
+    requested = _requested(driver_path, browser_path)
+    cached = _load_cached(cache_path, ttl, requested)
+    if cached is not None:
+        return cached
+
+    found_browser = find_browser(browser_path)
+    browser_version = read_version(found_browser) if found_browser else None
+    match = _find_matching_driver(
+        candidate_drivers(driver_path), browser_version
+    )
+
+    if match is None:
+        if allow_download is None:
+            allow_download = _env_flag("TEAM_PJ_ALLOW_DRIVER_DOWNLOAD")
+        if not allow_download:
+            raise FileNotFoundError(
+                "Chrome "
+                f"{browser_version or '(バージョン不明)'} に合う chromedriver "
+                "が見つかりません。TEAM_PJ_CHROMEDRIVER でパスを指定するか、"
+                "TEAM_PJ_ALLOW_DRIVER_DOWNLOAD=1 でダウンロードを許可して"
+                "ください。"
+            )
+        downloaded = _download_driver(browser_version)
+        match = (downloaded, read_version(downloaded))
+
+    resolved = ResolvedDriver(
+        match[0], match[1], found_browser, browser_version
+    )
+    _save_cached(cache_path, resolved, requested)
+    return resolved
@@ -0,0 +1,293 @@
+import pandas as pd
+from openpyxl import load_workbook
+
+import utils  # 読み込み結果のキャッシュ用
+
+# キャッシュを作成するときに、まとめて書き込む行数
+CACHE_CHUNK_ROWS = 10000
+
+
+class ExcelRowReader:
+    """
+    Excelファイルを1行ずつ読み込むためのクラスです。
+
+    openpyxl の read-only モードを使うため、ファイル全体をメモリに
+    展開せずに先頭から順番に行を取り出せます。ファイルが大きくても
+    メモリ使用量はほぼ一定で、最初の行はすぐに処理を始められます。
+
+    1行目を列名（ヘッダー）として扱い、2行目以降を
+    {列名: 値} の辞書として返します。
+
+    使用例:
+        reader = ExcelRowReader("data/contract_data.xlsx")
+        print(reader.columns)
+        for index, row in reader:
+            print(index, row["property_name"])
+    """
+
+    def __init__(self, path, sheet_name=None, columns=None):
+        """
+        Args:
+            path (str): Excelファイルのパス
+            sheet_name (str | None): シート名（省略時は先頭のシート）
+            columns (list[str] | None): 取り出す列名（省略時は全列）
+        """
+        self.path = path
+        self.sheet_name = sheet_name
+        self.selected_columns = columns
+        # ブックを開く処理（共有文字列の読み込みなど）は大きなファイルでは
+        # 時間がかかるため、ヘッダーを読んだブックを最初の読み込みで使い回します
+        self._opened = None
+        self.columns, self.row_count = self._read_header()
+
+    def _open_sheet(self):
+        """
+        read-only モードでブックを開き、(ブック, シート) を返します。
+        """
+        workbook = load_workbook(self.path, read_only=True, data_only=True)
+        if self.sheet_name is None:
+            sheet = workbook.worksheets[0]
+        else:
+            sheet = workbook[self.sheet_name]
+        return workbook, sheet
+
+    def _read_header(self):
+        """
+        ヘッダー行だけを読み込み、列名とデータ行数（目安）を返します。
+        """
+        workbook, sheet = self._open_sheet()
+        try:
+            header = next(sheet.iter_rows(max_row=1, values_only=True), ())
+            # シートの範囲情報 (dimension) がない場合は行数を取得できません
+            max_row = sheet.max_row
+        except Exception:
+            workbook.close()
+            raise
+        self._opened = (workbook, sheet)
+
+        columns = [
+            str(value) if value is not None else f"Unnamed: {i}"
+            for i, value in enumerate(header)
+        ]
+        row_count = max_row - 1 if max_row else None
+        return columns, row_count
+
+    def _column_positions(self):
+        """
+        取り出す列の (列位置, 列名) のリストを返します。
+        """
+        if self.selected_columns is None:
+            return list(enumerate(self.columns))
+        return [
+            (self.columns.index(name), name) for name in self.selected_columns
+        ]
+
+    def __iter__(self):
+        """
+        データ行を (行番号, {列名: 値}) の形で1行ずつ返します。
+
+        行番号は pandas.read_excel で読み込んだ場合の index と同じく
+        0 から始まります。値がすべて空の行は読み飛ばします。
+        """
+        positions = self._column_positions()
+
+        if self._opened is not None:
+            workbook, sheet = self._opened
+            self._opened = None
+        else:
+            workbook, sheet = self._open_sheet()
+        try:
+            rows = sheet.iter_rows(min_row=2, values_only=True)
+            for index, values in enumerate(rows):
+                if all(value is None for value in values):
+                    continue
+                width = len(values)
+                yield index, {
+                    name: values[i] if i < width else None
+                    for i, name in positions
+                }
+        finally:
+            # 途中で読み込みを止めた場合もファイルを確実に閉じます
+            workbook.close()
+
+    def close(self):
+        """
+        ヘッダーの読み込みで開いたままのブックを閉じます。
+
+        行を最後まで読み込んだ場合は自動的に閉じられるため、
+        ヘッダーだけを使う場合に呼び出してください。
+        """
+        if self._opened is not None:
+            self._opened[0].close()
+            self._opened = None
+
+
+def read_columns(path, columns, sheet_name=None):
+    """
+    指定した列だけを1行ずつ読み込んで DataFrame を作成します。
+
+    pd.read_excel と違い、不要な列は読み込んだそばから捨てるため、
+    列数の多いファイルでもメモリ使用量を抑えられます。
+
+    Args:
+        path (str): Excelファイルのパス
+        columns (list[str]): 取り出す列名
+        sheet_name (str | None): シート名（省略時は先頭のシート）
+
+    Returns:
+        pd.DataFrame: 指定した列だけを持つデータフレーム
+    """
+    reader = ExcelRowReader(path, sheet_name=sheet_name, columns=columns)
+    index = []
+    data = {name: [] for name in columns}
+    for row_index, row in reader:
+        index.append(row_index)
+        for name in columns:
+            data[name].append(row[name])
+    return pd.DataFrame(data, index=index, columns=columns)
+
+
+def read_header(path, sheet_name=None):
+    """
+    ヘッダー行の列名を返します。元ファイルが変わっていなければキャッシュを使います。
+
+    read-only モードでも、ブックを開く際には共有文字列の表などを
+    読み込むため、大きなファイルでは列名の確認だけでも時間がかかります。
+
+    Args:
+        path (str): Excelファイルのパス
+        sheet_name (str | None): シート名（省略時は先頭のシート）
+
+    Returns:
+        list[str]: 列名の一覧
+    """
+    df = utils.load_cached_frame(
+        path,
+        lambda: pd.DataFrame(columns=_read_header_only(path, sheet_name)),
+        variant=f"header|{sheet_name}",
+    )
+    return list(df.columns)
+
+
+def _read_header_only(path, sheet_name):
+    """
+    ExcelRowReader でヘッダー行だけを読み込み、ブックを閉じます。
+    """
+    reader = ExcelRowReader(path, sheet_name=sheet_name)
+    reader.close()
+    return reader.columns
+
+
+def read_columns_cached(path, columns, sheet_name=None):
+    """
+    read_columns と同じ DataFrame を、キャッシュがあればそこから返します。
+
+    Args:
+        path (str): Excelファイルのパス
+        columns (list[str]): 取り出す列名
+        sheet_name (str | None): シート名（省略時は先頭のシート）
+
+    Returns:
+        pd.DataFrame: 指定した列だけを持つデータフレーム
+    """
+    return utils.load_cached_frame(
+        path,
+        lambda: read_columns(path, columns, sheet_name=sheet_name),
+        variant=_columns_variant(columns, sheet_name),
+    )
+
+
+def _columns_variant(columns, sheet_name):
+    """
+    列を指定して読み込んだ結果のキャッシュを区別するための識別子を返します。
+    """
+    return f"columns|{sheet_name}|{','.join(columns)}"
+
+
+def iter_rows_cached(path, columns, sheet_name=None):
+    """
+    指定した列の行を (行番号, {列名: 値}) の形で1行ずつ返します。
+
+    キャッシュがあればそこから返します。ない場合は ExcelRowReader で
+    1行ずつ読みながら返し、CACHE_CHUNK_ROWS 行ごとにキャッシュへ追記して、
+    最後まで読み終えた時点でキャッシュとして保存します。
+    メモリ上に保持するのは1チャンク分の行だけなので、行数が多くても
+    メモリ使用量はほぼ一定です。
+
+    Args:
+        path (str): Excelファイルのパス
+        columns (list[str]): 取り出す列名
+        sheet_name (str | None): シート名（省略時は先頭のシート）
+    """
+    variant = _columns_variant(columns, sheet_name)
+    cached = utils.get_cached_frame(path, variant)
+    if cached is not None:
+        yield from iter_frame_rows(cached)
+        return
+
+    # 読み込み中の更新に気付けるよう、署名は読み込む前に取得します
+    writer = utils.CachedFrameWriter(
+        path, variant, signature=utils.source_signature(path)
+    )
+    index, data = [], {name: [] for name in columns}
+    reader = ExcelRowReader(path, sheet_name=sheet_name, columns=columns)
+    try:
+        for row_index, row in reader:
+            index.append(row_index)
+            for name in columns:
+                data[name].append(row[name])
+            yield row_index, row
+            if len(index) >= CACHE_CHUNK_ROWS:
+                writer = _append_cache_chunk(writer, index, data, columns)
+                index, data = [], {name: [] for name in columns}
+
+        # 行がない場合も、列名だけのキャッシュを保存します
+        writer = _append_cache_chunk(writer, index, data, columns)
+        if writer is not None:
+            _commit_cache(writer)
+    finally:
+        # 途中で読むのをやめた場合は、書きかけのキャッシュを削除します
+        if writer is not None:
+            writer.abort()
+
+
+def _commit_cache(writer):
+    """
+    書き込んだチャンクをキャッシュとして保存します（失敗しても続行します）。
+    """
+    try:
+        writer.commit()
+    except OSError as e:
+        utils.log_warning(f"キャッシュを保存できませんでした: {e}")
+
+
+def _append_cache_chunk(writer, index, data, columns):
+    """
+    読み込んだ行をキャッシュに追記します。
+
+    Feather で保存できない値（数値と文字列が混ざった列など）があった場合は
+    キャッシュを諦め、None を返します（読み込み自体は続けます）。
+    """
+    if writer is None:
+        return None
+    # 列の型はチャンクごとに推測せず、値から pyarrow に判定させます
+    chunk = pd.DataFrame(data, index=index, columns=columns, dtype=object)
+    try:
+        writer.append(chunk)
+    except Exception as e:
+        utils.log_warning(f"キャッシュを保存できませんでした: {e}")
+        writer.abort()
+        return None
+    return writer
+
+
+def iter_frame_rows(df, chunk_size=10000):
+    """
+    DataFrame の行を ExcelRowReader と同じ (行番号, {列名: 値}) の形で返します。
+
+    chunk_size 行ずつ辞書に変換するため、値は numpy の型ではなく
+    Python の int や str になります（ExcelRowReader と同じ型です）。
+    """
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start : start + chunk_size]
+        yield from zip(chunk.index, chunk.to_dict("records"))
@@ -0,0 +1,157 @@
+import os
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, NamedStyle, PatternFill
+
+# Excel の1シートあたりの最大行数（ヘッダー行を含みます）
+EXCEL_MAX_ROWS = 1_048_576
+
+# Excel のシート名の最大文字数
+EXCEL_MAX_SHEET_NAME = 31
+
+# ヘッダー行に適用する名前付きスタイルの名前
+HEADER_STYLE_NAME = "ヘッダー"
+
+
+def make_header_style():
+    """
+    ヘッダー行用の名前付きスタイル（太字・白文字・青背景）を作成します。
+    """
+    style = NamedStyle(name=HEADER_STYLE_NAME)
+    # 太字、文字色白
+    style.font = Font(bold=True, color="FFFFFF")
+    # 背景色青 (カラーコード 4F81BD)
+    style.fill = PatternFill(
+        start_color="4F81BD", end_color="4F81BD", fill_type="solid"
+    )
+    return style
+
+
+def _clean_value(value):
+    """
+    セルに書き込めない値（NaN など）を空セル (None) に変換します。
+    """
+    # 欠損値 (NaN, NaT) は自分自身と等しくならない性質を使って判定します
+    # （pd.NA は比較結果を真偽値にできないため、例外として判定します）
+    try:
+        if value != value:
+            return None
+    except (TypeError, ValueError):
+        return None
+    return value
+
+
+class StreamingExcelWriter:
+    """
+    openpyxl の write-only モードで、行をそのままディスクへ書き出すクラスです。
+
+    通常のモードでは全セルをメモリ上に保持してから保存しますが、
+    write-only モードでは追加した行を順次書き出すため、
+    数百万行を出力してもメモリ使用量はほぼ一定です。
+
+    ヘッダーの装飾は名前付きスタイルとしてブックに1つだけ登録し、
+    各セルからはその名前を参照します（セルごとに Font や PatternFill を
+    作らないため、ファイルサイズと処理時間を抑えられます）。
+
+    1シートの行数が Excel の上限を超える場合は、
+    「シート名_2」「シート名_3」... と自動的にシートを分割します。
+
+    使用例:
+        writer = StreamingExcelWriter("B.xlsx")
+        writer.write_frame("サマリー", summary_df)
+        writer.write_frame("詳細一覧", detail_df)
+        writer.save()
+    """
+
+    def __init__(self, path, max_rows=EXCEL_MAX_ROWS):
+        """
+        Args:
+            path (str): 出力先のパス
+            max_rows (int): 1シートあたりの最大行数（ヘッダー行を含む）
+        """
+        self.path = path
+        self.max_rows = max_rows
+        self.workbook = Workbook(write_only=True)
+        self.workbook.add_named_style(make_header_style())
+
+    def _create_sheet(self, sheet_name, columns):
+        """
+        シートを作成し、ヘッダー行を書き込みます。
+        """
+        sheet = self.workbook.create_sheet(title=sheet_name)
+        header = []
+        for column in columns:
+            cell = WriteOnlyCell(sheet, value=str(column))
+            cell.style = HEADER_STYLE_NAME
+            header.append(cell)
+        sheet.append(header)
+        return sheet
+
+    def _sheet_name(self, base_name, number):
+        """
+        分割したシートの名前を返します（1枚目は元の名前のまま）。
+        """
+        if number == 1:
+            return base_name[:EXCEL_MAX_SHEET_NAME]
+        suffix = f"_{number}"
+        return base_name[: EXCEL_MAX_SHEET_NAME - len(suffix)] + suffix
+
+    def write_rows(self, sheet_name, columns, rows):
+        """
+        行の並びをシートに書き込みます。
+
+        Args:
+            sheet_name (str): シート名
+            columns (list[str]): 列名（ヘッダー行）
+            rows: 1行分の値のタプル（またはリスト）の並び
+
+        Returns:
+            list[str]: 書き込んだシート名（分割した場合は複数）
+        """
+        rows_per_sheet = self.max_rows - 1
+        sheet_names = [self._sheet_name(sheet_name, 1)]
+        sheet = self._create_sheet(sheet_names[0], columns)
+        written = 0
+
+        for row in rows:
+            if written >= rows_per_sheet:
+                sheet_names.append(
+                    self._sheet_name(sheet_name, len(sheet_names) + 1)
+                )
+                sheet = self._create_sheet(sheet_names[-1], columns)
+                written = 0
+            sheet.append([_clean_value(value) for value in row])
+            written += 1
+
+        return sheet_names
+
+    def write_frame(self, sheet_name, df):
+        """
+        DataFrame をシートに書き込みます（index は出力しません）。
+
+        Args:
+            sheet_name (str): シート名
+            df (pd.DataFrame): 書き込むデータ
+
+        Returns:
+            list[str]: 書き込んだシート名（分割した場合は複数）
+        """
+        rows = df.itertuples(index=False, name=None)
+        return self.write_rows(sheet_name, list(df.columns), rows)
+
+    def save(self):
+        """
+        ブックをファイルに保存します。
+
+        一時ファイルに書き出してから置き換えるため、保存中に B.xlsx を
+        開いた人（ダッシュボードなど）が書きかけのファイルを読むことはなく、
+        中断された場合も前回のファイルがそのまま残ります。
+        """
+        temp_path = f"{self.path}.tmp"
+        try:
+            self.workbook.save(temp_path)
+            os.replace(temp_path, self.path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
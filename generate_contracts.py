@@ -1,9 +1,87 @@
+import argparse
+import logging
 import os
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 import pandas as pd
-from docx import Document
 
+import batch_runner  # 一時的なエラーの再試行用
+import perf  # 処理時間の計測用
 import utils  # ログ出力とエラーハンドリング用
+from contract_manifest import ContractManifest
+from contract_output import (
+    OUTPUT_LAYOUTS,
+    DirectoryOutput,
+    ZipArchiveOutput,
+    sanitize_filename,
+    sanitize_filenames,
+)
+from contract_template import load_template
+from contract_validation import (
+    TEMPLATE_COLUMN,
+    prepare_contracts,
+    write_rejection_report,
+)
+from excel_reader import iter_frame_rows, iter_rows_cached, read_header
+
+# 契約書の生成に必要な列
+REQUIRED_COLUMNS = ["property_name", "address", "amount"]
+
+# 契約書を保存するスレッドの既定の数
+DEFAULT_WRITERS = 4
+
+# 保存を待つ契約書の最大件数（これを超えると、保存が進むまで生成を待ちます）
+DEFAULT_WRITE_QUEUE_SIZE = 64
+
+# 再試行しても生成・保存できなかった行の一覧（出力ディレクトリに作成します）
+FAILED_ROWS_FILENAME = "failed_rows.xlsx"
+
+# 重複を避けた出力ファイル名を入れる列（PreparedRows で追加します）
+OUTPUT_NAME_COLUMN = "output_name"
+
+# 契約データを読み込んで検証する1回あたりの行数（PreparedRows を参照）
+PREPARE_CHUNK_SIZE = 10000
+
+# 1件分の生成結果
+# （成功時は error が None、失敗時は data が None。seconds は生成にかかった秒数）
+RenderedContract = namedtuple(
+    "RenderedContract", ["index", "filename", "data", "error", "seconds"]
+)
+
+
+def make_template_resolver(template_dir, default_path):
+    """
+    template 列の値をテンプレートファイルのパスに変換する関数を作成します。
+
+    値はテンプレートディレクトリからの相対パスです。拡張子を省略した場合は
+    ".docx" を補います（例: "parking" -> templates/parking.docx）。
+    空欄の行は既定のテンプレートを使います。
+
+    Args:
+        template_dir (str): テンプレートを置くディレクトリ
+        default_path (str): template 列が空欄の行に使うテンプレート
+
+    Returns:
+        テンプレート名（空欄は None）を受け取り、パスを返す関数
+        （ファイルが見つからない場合とディレクトリの外を指す場合は None）
+    """
+    base_dir = os.path.abspath(template_dir)
+
+    def resolve(name):
+        if name is None:
+            return default_path
+        if not os.path.splitext(name)[1]:
+            name += ".docx"
+        path = os.path.abspath(os.path.join(base_dir, name))
+        # "../" などでディレクトリの外のファイルを指定させないようにします
+        if os.path.commonpath([base_dir, path]) != base_dir:
+            return None
+        return path if os.path.isfile(path) else None
+
+    return resolve
 
 
 def check_files_exist(excel_path, template_path):
@@ -29,10 +107,14 @@ def validate_dataframe(df):
     """
     データフレームに必要な列が存在するか確認します。
     """
-    required_columns = ["property_name", "address", "amount"]
-    missing_columns = [
-        col for col in required_columns if col not in df.columns
-    ]
+    return validate_columns(df.columns)
+
+
+def validate_columns(columns):
+    """
+    列名の一覧（ヘッダー行）に必要な列が存在するか確認します。
+    """
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in columns]
 
     if missing_columns:
         utils.log_error(
@@ -46,92 +128,827 @@ def validate_dataframe(df):
     return True
 
 
-def process_single_contract(index, row, template_path, output_dir):
+def build_replacements(row):
+    """
+    1行分のデータからプレースホルダーの置換値を作成します。
+
+    金額の3桁区切りなどの書式化は prepare_contracts で列ごとに
+    済ませてあるため、ここでは値を取り出すだけです。
+
+    Returns:
+        dict: プレースホルダー名と置換文字列の辞書
+    """
+    return {column: str(row[column]) for column in REQUIRED_COLUMNS}
+
+
+def contract_filename(row):
+    """
+    1行分のデータから契約書の出力ファイル名を作成します。
+
+    assign_output_names で決めた名前があれば、それを使います。
+    """
+    name = row.get(OUTPUT_NAME_COLUMN)
+    if name:
+        return name
+    return f"Contract_{sanitize_filename(row['property_name'])}.docx"
+
+
+def assign_output_names(property_names, used_names=None):
+    """
+    物件名から、重複しない出力ファイル名を決めます。
+
+    同じ物件名（大文字・小文字の違いだけのものを含みます）が複数ある場合は、
+    入力の順に2件目から "Contract_物件_2.docx"、"Contract_物件_3.docx" と
+    番号を付けます。入力が同じであれば毎回同じ名前になるため、
+    変更のない行の読み飛ばし（マニフェスト）もそのまま使えます。
+
+    Args:
+        property_names (pd.Series): 物件名の列（入力の順）
+        used_names (set[str] | None): 前のチャンクまでに使った名前
+            （小文字にそろえたもの）。ここで使った名前を追加します
+
+    Returns:
+        pd.Series: 出力ファイル名（拡張子 .docx を含みます）
+    """
+    if used_names is None:
+        used_names = set()
+    bases = "Contract_" + sanitize_filenames(property_names)
+    # Windows などでは大文字・小文字を区別しないため、小文字にそろえて比べます
+    keys = bases.str.casefold()
+    conflicts = keys.duplicated() | keys.isin(used_names)
+    used_names.update(keys)
+    if not conflicts.any():
+        return bases + ".docx"
+
+    names = bases.copy()
+    for position in keys.index[conflicts.to_numpy()]:
+        base = bases[position]
+        number = 2
+        while f"{base}_{number}".casefold() in used_names:
+            number += 1
+        names[position] = f"{base}_{number}"
+        used_names.add(names[position].casefold())
+    return names + ".docx"
+
+
+def render_single_contract(index, row, template):
+    """
+    1件の契約書をメモリ上で生成します。保存とログ出力は呼び出し元で行います。
+
+    並列実行時はワーカープロセス内で呼ばれるため、ここでは画面出力をせず
+    結果を返すだけにしています（ログの順序を揃えるため）。
+
+    Args:
+        index: 行番号（ログ出力用）
+        row: 1行分のデータ
+        template (CompiledTemplate): 解析済みのテンプレート
+
+    Returns:
+        RenderedContract: 生成結果
+    """
+    start = time.perf_counter()
+    try:
+        filename = contract_filename(row)
+        # 解析済みテンプレートのプレースホルダー位置に値を差し込む
+        data = template.render(build_replacements(row))
+        error = None
+    except Exception as e:
+        filename = data = None
+        error = f"行 {index} の処理中にエラーが発生: {e}"
+    seconds = time.perf_counter() - start
+    return RenderedContract(index, filename, data, error, seconds)
+
+
+def save_contract(rendered, output):
+    """
+    生成済みの契約書を出力先に保存します。
+
+    Args:
+        rendered (RenderedContract): render_single_contract の戻り値
+        output: 出力先 (DirectoryOutput または ZipArchiveOutput)
+
+    Returns:
+        tuple[bool, str, Exception | None]: (成功した場合は True,
+            ログ用メッセージ, 保存に失敗した場合は発生した例外)
+    """
+    if rendered.error is not None:
+        return False, rendered.error, None
+
+    start = time.perf_counter()
+    try:
+        location = output.save(
+            rendered.index, rendered.filename, rendered.data
+        )
+        return True, f"成功: 契約書を生成しました: {location}", None
+    except Exception as e:
+        return False, f"ファイル保存に失敗: {rendered.filename} - {e}", e
+    finally:
+        perf.record_latency("save", time.perf_counter() - start)
+
+
+def report_result(success, message):
+    """
+    1件分の処理結果を出力します。
+
+    件数に比例して出力されるログなので、log_row で出力します
+    （書き出しは別スレッドで行われ、件数が多い場合は間引かれます）。
+    """
+    if success:
+        utils.log_row(message)
+    else:
+        utils.log_row(message, logging.ERROR)
+
+
+def render_row(index, row, default_template_path):
+    """
+    行の template 列で指定したテンプレートを使って、1件の契約書を生成します。
+
+    解析済みのテンプレートは load_template のキャッシュから取り出すため、
+    同じテンプレートのファイルを読み込むのは最初の1回だけです。
+
+    Args:
+        index: 行番号（ログ出力用）
+        row: 1行分のデータ
+        default_template_path (str): template 列がない行に使うテンプレート
+
+    Returns:
+        RenderedContract: 生成結果
+    """
+    template_path = row.get(TEMPLATE_COLUMN) or default_template_path
+    try:
+        template = load_template(template_path)
+    except Exception as e:
+        error = (
+            f"行 {index} のテンプレートの読み込みに失敗: {template_path} - {e}"
+        )
+        return RenderedContract(index, None, None, error, 0.0)
+    return render_single_contract(index, row, template)
+
+
+def process_single_contract(index, row, template, output):
     """
     1件の契約書生成処理を行います。
 
     Returns:
         bool: 成功した場合は True
     """
+    rendered = render_single_contract(index, row, template)
+    success, message, _ = save_contract(rendered, output)
+    report_result(success, message)
+    return success
+
+
+# --- 並列実行用 ---
+# ワーカープロセスで template 列がない行に使うテンプレートのパスです
+# （解析済みのテンプレートは load_template のキャッシュに保持されます）
+_worker_template_path = None
+
+
+def _init_worker(template_path, log_queue=None):
+    """
+    ワーカープロセスの起動時に既定のテンプレートを読み込みます。
+
+    log_queue を指定した場合、ワーカーのログは親プロセスへ送られます。
+    """
+    global _worker_template_path
+    if log_queue is not None:
+        utils.configure_worker_logging(log_queue)
+    _worker_template_path = template_path
+    load_template(template_path)
+
+
+def _process_chunk(chunk):
+    """
+    ワーカープロセス内で複数行をまとめて生成します。
+    """
+    return [
+        render_row(index, row, _worker_template_path) for index, row in chunk
+    ]
+
+
+def iter_chunks(rows, chunk_size):
+    """
+    (行番号, 行データ) の並びを chunk_size 件ずつのリストに分割します。
+    """
+    chunk = []
+    for item in rows:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_parallel(rows, template_path, workers, chunk_size=64):
+    """
+    複数プロセスで契約書を生成し、入力と同じ順序で結果を返します。
+
+    保存は呼び出し元（親プロセス）で行うため、ZIP アーカイブのように
+    1つのファイルへまとめて書き込む出力先でも並列に生成できます。
+
+    未処理のチャンクは最大 workers * 2 個までしか投入しないため、
+    入力がどれだけ大きくてもメモリ使用量は一定に保たれます。
+
+    Args:
+        rows: (行番号, 行データ) の並び
+        template_path (str): template 列がない行に使うテンプレートのパス
+        workers (int): ワーカープロセス数
+        chunk_size (int): 1回でワーカーに渡す行数
+
+    Yields:
+        RenderedContract: 1件ごとの render_single_contract の戻り値
+    """
+    # ワーカーのログは親プロセスに集めて、まとめて書き出します
+    log_queue = utils.get_process_log_queue()
     try:
-        # テンプレートを毎回新しく読み込む
-        doc = Document(template_path)
-
-        # プレースホルダーと置換値の辞書
-        replacements = {
-            "{{property_name}}": str(row["property_name"]),
-            "{{address}}": str(row["address"]),
-            "{{amount}}": f"{row['amount']:,}",
-        }
-
-        # 段落内のテキストを置換
-        for paragraph in doc.paragraphs:
-            for key, value in replacements.items():
-                if key in paragraph.text:
-                    paragraph.text = paragraph.text.replace(key, value)
-
-        # ドキュメントを保存
-        output_filename = f"Contract_{row['property_name']}.docx"
-        output_path = os.path.join(output_dir, output_filename)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=utils.process_pool_context(),
+            initializer=_init_worker,
+            initargs=(template_path, log_queue),
+        ) as executor:
+            pending = deque()
+            for chunk in iter_chunks(rows, chunk_size):
+                pending.append(executor.submit(_process_chunk, chunk))
+                # 先頭から順に結果を取り出すことで、出力順を入力順に揃えます
+                if len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+    except BrokenProcessPool as e:
+        # テンプレートが読み込めないなどでワーカーが起動できなかった場合です
+        utils.log_error(f"ワーカープロセスが異常終了しました: {template_path}")
+        utils.handle_error(e)
+    finally:
+        utils.stop_process_logging(log_queue)
+
+
+def iter_rendered(rows, template_path, workers=1):
+    """
+    各行の契約書を生成し、入力順に render_single_contract の戻り値を返します。
+
+    行ごとのテンプレート（template 列）は load_template のキャッシュから
+    取り出すため、各テンプレートを読み込んで解析するのは1回だけです。
+
+    Args:
+        rows: (行番号, 行データ) の並び
+        template_path (str): template 列がない行に使うテンプレートのパス
+        workers (int): 並列実行するプロセス数（1 の場合は逐次実行）
+    """
+    if workers > 1:
+        # 並列実行: 各ワーカーがテンプレートを一度だけ読み込んで使い回す
+        return run_parallel(rows, template_path, workers)
+
+    # 既定のテンプレートは先に読み込み、読み込めない場合はここで止めます
+    try:
+        batch_runner.call_with_retry(load_template, template_path)
+    except Exception as e:
+        utils.log_error(f"テンプレートの読み込みに失敗: {template_path}")
+        utils.handle_error(e)
+    return (render_row(index, row, template_path) for index, row in rows)
+
+
+def contract_columns(excel_path, with_template):
+    """
+    契約データの Excel ファイルから読み込む列（生成に使う列だけ）を返します。
+
+    Args:
+        excel_path (str): 契約データの Excel ファイルのパス
+        with_template (bool): True の場合は template 列があれば一緒に読み込みます
+    """
+    columns = REQUIRED_COLUMNS
+    if with_template:
+        columns = REQUIRED_COLUMNS + [
+            column
+            for column in read_header(excel_path)
+            if column == TEMPLATE_COLUMN
+        ]
+    return columns
+
+
+class PreparedRows:
+    """
+    契約データを少しずつ読み込みながら検証し、契約書を生成できる行を返すクラスです。
+
+    ExcelRowReader で chunk_size 行ずつ読み込み、その行の分だけ
+    prepare_contracts で列単位の検証と書式化を行います。ファイル全体を
+    DataFrame にしないため、行数が多くてもメモリ使用量はほぼ一定で、
+    最初のチャンクを読み終えた時点で生成を始められます
+    （重複を避けるために出力ファイル名だけは全行分を保持します）。
+
+    template 列がある場合は、チャンクの中で同じテンプレートの行が続くように
+    並べ替えます（同じテンプレートの中では元の順序のままです）。
+
+    問題のある行は、最後まで読み終えた時点で除外レポート
+    (rejected_rows.xlsx) に理由とともに出力します。
+
+    使用例:
+        rows = PreparedRows(excel_path, output_dir, resolve_template)
+        for index, row in rows:
+            ...
+        print(rows.rejected_count)
+    """
+
+    def __init__(
+        self,
+        excel_path,
+        output_dir,
+        resolve_template=None,
+        chunk_size=PREPARE_CHUNK_SIZE,
+    ):
+        """
+        Args:
+            excel_path (str): 契約データの Excel ファイルのパス
+            output_dir (str): 除外レポートの出力先ディレクトリ
+            resolve_template: template 列の値をパスに変換する関数
+                （make_template_resolver を参照。None の場合は template 列を
+                使いません）
+            chunk_size (int): 1回に検証する行数
+        """
+        self.excel_path = excel_path
+        self.output_dir = output_dir
+        self.resolve_template = resolve_template
+        self.chunk_size = chunk_size
+        # 除外した件数（最後まで読み終えた時点で確定します）
+        self.rejected_count = 0
+
+    def __iter__(self):
+        """
+        (行番号, 差し込み用の値) を入力の順（チャンク内はテンプレート順）に返します。
+        """
+        chunks = self._read_chunks()
+        used_names = set()
+        rejected = []
+        while True:
+            try:
+                with perf.span("read"):
+                    chunk = next(chunks, None)
+            except Exception as e:
+                utils.log_error(
+                    f"Excelファイルの読み込みに失敗: {self.excel_path}"
+                )
+                utils.handle_error(e)
+            if chunk is None:
+                break
+            with perf.span("prepare"):
+                rows, chunk_rejected = self._prepare(chunk, used_names)
+            rejected.append(chunk_rejected)
+            yield from iter_frame_rows(rows)
+        self._report(rejected)
+
+    def _read_chunks(self):
+        """
+        chunk_size 行ずつの (行番号, 行データ) のリストを返すイテレーターを作ります。
+
+        ネットワークドライブの一時的な切断などは待ってから開き直しますが、
+        再試行するのは最初のチャンクを読み込むまでです。
+        """
+
+        def open_chunks():
+            columns = contract_columns(
+                self.excel_path, self.resolve_template is not None
+            )
+            chunks = iter_chunks(
+                iter_rows_cached(self.excel_path, columns), self.chunk_size
+            )
+            return next(chunks, None), chunks
 
         try:
-            doc.save(output_path)
-            print(f"成功: 契約書を生成しました: {output_path}")
-            return True
+            first, chunks = batch_runner.call_with_retry(open_chunks)
         except Exception as e:
-            utils.log_error(f"ファイル保存に失敗: {output_path} - {e}")
-            return False
+            utils.log_error(
+                f"Excelファイルの読み込みに失敗: {self.excel_path}"
+            )
+            utils.handle_error(e)
+        if first is not None:
+            yield first
+            yield from chunks
 
-    except Exception as e:
-        utils.log_error(f"行 {index} の処理中にエラーが発生: {e}")
-        return False
+    def _prepare(self, chunk, used_names):
+        """
+        1チャンク分の行を検証し、(生成できる行, 除外した行) を返します。
+        """
+        df = pd.DataFrame.from_records(
+            [row for _, row in chunk], index=[index for index, _ in chunk]
+        )
+        prepared = prepare_contracts(df, self.resolve_template)
+        rows = prepared.rows
+        rows[OUTPUT_NAME_COLUMN] = assign_output_names(
+            rows["property_name"], used_names
+        )
+        if TEMPLATE_COLUMN in rows.columns:
+            rows = rows.sort_values(TEMPLATE_COLUMN, kind="stable")
+        return rows, prepared.rejected
+
+    def _report(self, rejected):
+        """
+        除外した行を除外レポートに出力します（なければ前回のレポートを削除します）。
+        """
+        rejected = [frame for frame in rejected if not frame.empty]
+        if rejected:
+            rejected = pd.concat(rejected, ignore_index=True)
+        else:
+            rejected = pd.DataFrame(
+                columns=["行番号", "property_name", "理由"]
+            )
+        self.rejected_count = len(rejected)
+        with perf.span("prepare"):
+            report_path = write_rejection_report(rejected, self.output_dir)
+        if report_path is not None:
+            utils.log_warning(
+                f"検証エラーの {self.rejected_count} 件を除外しました: "
+                f"{report_path}"
+            )
 
 
-def generate_contracts():
+def iter_saved(
+    rendered_rows,
+    output,
+    writers=DEFAULT_WRITERS,
+    queue_size=DEFAULT_WRITE_QUEUE_SIZE,
+):
+    """
+    生成済みの契約書を保存用のスレッドで保存し、入力順に結果を返します。
+
+    保存（ディスクやネットワークドライブへの書き込み）を待っている間も
+    次の契約書の生成を進めるため、全体の処理時間は「生成 + 保存」ではなく
+    おおよそ長い方の時間になります。保存を待つ契約書は queue_size 件までで、
+    保存が追いつかない場合は生成の方を待たせます（メモリ使用量は一定です）。
+
+    Args:
+        rendered_rows: RenderedContract の並び
+        output: 出力先 (DirectoryOutput または ZipArchiveOutput)
+        writers (int): 保存するスレッドの数（0 の場合は生成と交互に保存）
+        queue_size (int): 保存を待つ契約書の最大件数
+
+    Yields:
+        tuple: (RenderedContract, 成功した場合は True, ログ用メッセージ,
+            保存に失敗した場合は発生した例外)
+    """
+    if output.max_writers is not None:
+        writers = min(writers, output.max_writers)
+    if writers <= 0:
+        for rendered in rendered_rows:
+            yield (rendered, *save_contract(rendered, output))
+        return
+
+    # 常駐プロセスのジョブのログと計測結果を、保存用のスレッドに引き継ぎます
+    with ThreadPoolExecutor(
+        max_workers=writers,
+        thread_name_prefix="contract-writer",
+        initializer=utils.context_initializer(),
+    ) as executor:
+        pending = deque()
+        for rendered in rendered_rows:
+            future = executor.submit(save_contract, rendered, output)
+            pending.append((rendered, future))
+            # 先頭から順に結果を取り出すことで、出力順を入力順に揃えます
+            if len(pending) >= queue_size:
+                rendered, future = pending.popleft()
+                yield (rendered, *future.result())
+        while pending:
+            rendered, future = pending.popleft()
+            yield (rendered, *future.result())
+
+
+class SaveTracker:
+    """
+    保存結果を集計し、一時的なエラーで保存できなかった行を再試行するクラスです。
+
+    一時的なエラー（ロックされたファイル・ネットワークドライブの切断など）で
+    失敗した行は RetryQueue に入れて後回しにし、他の行の保存を続けます。
+    待ち時間が過ぎた行は次の行の合間に、残った行は最後にまとめて再試行します。
+    再試行しても失敗した行と恒久的なエラーの行は failures に記録します。
+    """
+
+    def __init__(self, output, manifest, retry_queue):
+        self.output = output
+        self.manifest = manifest
+        self.retry_queue = retry_queue
+        self.success_count = 0
+        self.retried_count = 0
+        self.failures = []
+
+    def handle(self, rendered, success, message, error):
+        """
+        保存結果を1件分処理します（入力順に呼び出します）。
+        """
+        if not success and self.retry_queue.can_retry(error, 1):
+            token = self.manifest.defer()
+            self.retry_queue.add((rendered, token), 1)
+            utils.log_row(
+                f"一時的なエラーのため後で再試行します: {message}",
+                logging.WARNING,
+            )
+        else:
+            self._finish(rendered, success, message, error, 1)
+            self.manifest.record_result(success)
+        for item, attempt in self.retry_queue.pop_due():
+            self._retry(item, attempt)
+
+    def drain(self):
+        """
+        後回しにした行を、待ち時間が過ぎるのを待ちながらすべて再試行します。
+        """
+        for item, attempt in self.retry_queue.drain():
+            self._retry(item, attempt)
+
+    def _retry(self, item, attempt):
+        """
+        後回しにした行の保存をもう一度試します。
+        """
+        rendered, token = item
+        self.retried_count += 1
+        success, message, error = save_contract(rendered, self.output)
+        if not success and self.retry_queue.can_retry(error, attempt + 1):
+            self.retry_queue.add(item, attempt + 1)
+            return
+        self._finish(rendered, success, message, error, attempt + 1)
+        self.manifest.record_deferred(token, success)
+
+    def _finish(self, rendered, success, message, error, attempts):
+        """
+        1件分の最終的な結果を出力し、失敗した行を記録します。
+        """
+        report_result(success, message)
+        if success:
+            self.success_count += 1
+            return
+        self.failures.append(
+            batch_runner.FailedItem(
+                rendered.index,
+                rendered.filename,
+                "生成" if error is None else "保存",
+                error is not None and batch_runner.is_transient(error),
+                attempts,
+                message,
+            )
+        )
+
+
+def save_all(
+    rendered_rows,
+    output,
+    manifest,
+    writers=DEFAULT_WRITERS,
+    retry_queue=None,
+):
+    """
+    生成済みの契約書を保存し、結果を出力・記録します。
+
+    保存は iter_saved で生成と並行して行いますが、結果は入力順に
+    出力・記録します。1件ごとにマニフェストへ記録するため、
+    中断しても次回は続きから再開できます（マニフェストが途中経過の
+    記録を兼ねます）。一時的なエラーで保存できなかった行は、
+    SaveTracker で後回しにして再試行します。
+
+    Args:
+        retry_queue (batch_runner.RetryQueue | None): 再試行の設定
+            （省略時は既定の回数・待ち時間で再試行します）
+
+    Returns:
+        tuple[int, list[batch_runner.FailedItem]]: (成功件数, 失敗した行)
+    """
+    tracker = SaveTracker(
+        output, manifest, retry_queue or batch_runner.RetryQueue()
+    )
+    for rendered, success, message, error in iter_saved(
+        rendered_rows, output, writers
+    ):
+        # 1件ごとの生成時間を記録します（並列実行時はワーカーでの時間です）
+        perf.record_latency("render", rendered.seconds)
+        tracker.handle(rendered, success, message, error)
+    tracker.drain()
+    if tracker.retried_count:
+        utils.log_warning(
+            f"一時的なエラーの行を {tracker.retried_count} 回再試行しました"
+        )
+    return tracker.success_count, tracker.failures
+
+
+def generate_contracts(
+    workers=1,
+    full=False,
+    zip_max_bytes=None,
+    excel_path="data/contract_data.xlsx",
+    template_path="templates/contract_template.docx",
+    output_dir="output",
+    template_dir=None,
+    writers=DEFAULT_WRITERS,
+    retries=batch_runner.DEFAULT_RETRY_ATTEMPTS,
+    layout="flat",
+):
     """
     Excelデータを読み込み、Wordテンプレートを使用して
     複数の契約書ファイルを自動生成します。
+
+    契約データに template 列がある場合は、行ごとにテンプレートを選びます
+    （template_dir からの相対パス。空欄の行は template_path を使います）。
+    見つからないテンプレートを指定した行は、除外レポートに出力します。
+
+    前回の実行から入力値とテンプレートが変わっていない行は、
+    出力ディレクトリのマニフェストを参照して生成を省略します。
+
+    Args:
+        workers (int): 並列実行するプロセス数（1 の場合は逐次実行）
+        full (bool): True の場合はマニフェストを無視して全件を生成
+        zip_max_bytes (int | None): 指定した場合は契約書を個別のファイルに
+            せず、1つあたりこのサイズまでの ZIP アーカイブにまとめて保存
+        excel_path (str): 契約データの Excel ファイルのパス
+        template_path (str): Word テンプレートのパス（既定のテンプレート）
+        output_dir (str): 契約書の出力先ディレクトリ
+        template_dir (str | None): template 列で指定するテンプレートを
+            置くディレクトリ（省略時は template_path と同じディレクトリ）
+        writers (int): 契約書を保存するスレッドの数
+            （0 の場合は生成と保存を交互に行います）
+        retries (int): 一時的なエラーの場合の1件あたりの最大試行回数
+            （最初の1回を含みます。再試行しても失敗した行は
+            failed_rows.xlsx に出力します）
+        layout (str): 契約書を保存するサブディレクトリの分け方
+            （"flat"・"hash"・"date"。contract_output.shard_path を参照。
+            ZIP にまとめる場合は使いません）
     """
     utils.log_start("generate_contracts")
 
-    excel_path = "data/contract_data.xlsx"
-    template_path = "templates/contract_template.docx"
-    output_dir = "output"
-
     # ファイル存在確認
     if not check_files_exist(excel_path, template_path):
         utils.log_end("generate_contracts")
         return
 
-    # データの読み込み
+    # ヘッダー行だけを先に読み、必要な列があるかを確認します
+    # 前回から変わっていないファイルは、解析済みのキャッシュから読み込みます
     try:
-        df = pd.read_excel(excel_path)
-        print(f"成功: {len(df)}件のレコードを読み込みました。")
+        with perf.span("read"):
+            columns = batch_runner.call_with_retry(read_header, excel_path)
     except Exception as e:
         utils.log_error(f"Excelファイルの読み込みに失敗: {excel_path}")
         utils.handle_error(e)
 
-    # バリデーション
-    if not validate_dataframe(df):
+    # バリデーション（ヘッダー行だけで判定できます）
+    with perf.span("validate"):
+        valid = validate_columns(columns)
+    if not valid:
         utils.log_end("generate_contracts")
         return
 
+    # 行ごとの検証と書式化を済ませ、生成できる行だけを処理します
+    if template_dir is None:
+        template_dir = os.path.dirname(template_path) or "."
+    resolve_template = make_template_resolver(template_dir, template_path)
+    source_rows = PreparedRows(excel_path, output_dir, resolve_template)
+
     # 各行を処理
-    success_count = 0
-    error_count = 0
+    if zip_max_bytes:
+        output = ZipArchiveOutput(output_dir, zip_max_bytes)
+    else:
+        output = DirectoryOutput(output_dir, layout)
+    manifest = ContractManifest(output_dir, template_path)
+    if full:
+        manifest.reset()
+    rows = manifest.filter_rows(
+        source_rows,
+        contract_filename,
+        output.exists,
+        template_func=lambda row: row.get(TEMPLATE_COLUMN),
+    )
+    rendered_rows = iter_rendered(rows, template_path, workers)
 
-    for index, row in df.iterrows():
-        if process_single_contract(index, row, template_path, output_dir):
-            success_count += 1
-        else:
-            error_count += 1
+    with perf.span("contracts"):
+        success_count, failures = save_all(
+            rendered_rows,
+            output,
+            manifest,
+            writers,
+            batch_runner.RetryQueue(attempts=retries),
+        )
+    output.close()
+    manifest.close()
+    failures_path = batch_runner.write_failures(
+        failures, os.path.join(output_dir, FAILED_ROWS_FILENAME)
+    )
 
     print("\n--- 処理完了 ---")
     print(f"成功: {success_count}件")
-    print(f"失敗: {error_count}件")
+    print(f"失敗: {len(failures)}件")
+    if failures_path is not None:
+        print(f"失敗した行の一覧: {failures_path}")
+    print(f"除外（検証エラー）: {source_rows.rejected_count}件")
+    print(f"スキップ（変更なし）: {manifest.skipped_count}件")
 
     utils.log_end("generate_contracts")
 
 
+def parse_args(argv=None):
+    """
+    コマンドライン引数を解析します。
+    """
+    parser = argparse.ArgumentParser(
+        description="Excelデータから契約書を一括生成します。"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="並列実行するプロセス数（0 を指定するとCPUコア数）",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="変更のない行も含めて全件を生成し直します",
+    )
+    parser.add_argument(
+        "--zip",
+        action="store_true",
+        help="契約書を個別のファイルではなく ZIP アーカイブにまとめます",
+    )
+    parser.add_argument(
+        "--zip-max-mb",
+        type=int,
+        default=1024,
+        help="ZIP アーカイブ1つあたりの最大サイズ（MB）",
+    )
+    parser.add_argument(
+        "--writers",
+        type=int,
+        default=DEFAULT_WRITERS,
+        help="契約書を保存するスレッドの数（0 を指定すると生成と交互に保存）",
+    )
+    parser.add_argument(
+        "--layout",
+        choices=OUTPUT_LAYOUTS,
+        default="flat",
+        help="契約書を保存するサブディレクトリの分け方"
+        "（hash: ファイル名のハッシュ値、date: 保存した日付）",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=batch_runner.DEFAULT_RETRY_ATTEMPTS,
+        help="一時的なエラーの場合の1件あたりの最大試行回数（最初の1回を含む）",
+    )
+    parser.add_argument(
+        "--template",
+        default="templates/contract_template.docx",
+        help="template 列が空欄の行に使う Word テンプレート",
+    )
+    parser.add_argument(
+        "--template-dir",
+        help="template 列で指定するテンプレートのディレクトリ"
+        "（省略時は --template と同じディレクトリ）",
+    )
+    parser.add_argument(
+        "--perf-report",
+        help="処理時間・メモリ使用量のレポート (JSON) の出力先",
+    )
+    parser.add_argument(
+        "--profile",
+        help="最も時間のかかった段階の cProfile 結果 (.prof) の出力先",
+    )
+    parser.add_argument(
+        "--perf-memory",
+        action="store_true",
+        help="段階ごとのメモリ使用量も計測します（処理は遅くなります）",
+    )
+    args = parser.parse_args(argv)
+    if args.workers < 0:
+        parser.error("--workers には 0 以上を指定してください。")
+    if args.writers < 0:
+        parser.error("--writers には 0 以上を指定してください。")
+    if args.retries < 1:
+        parser.error("--retries には 1 以上を指定してください。")
+    if args.zip_max_mb <= 0:
+        parser.error("--zip-max-mb には 1 以上を指定してください。")
+    if args.workers == 0:
+        args.workers = os.cpu_count() or 1
+    return args
+
+
+def main(argv=None):
+    """
+    コマンドライン引数に従って契約書を生成します。
+
+    Args:
+        argv (list[str] | None): 引数の一覧（省略時は sys.argv の値）
+    """
+    args = parse_args(argv)
+    perf.configure(
+        report_path=args.perf_report,
+        profile_path=args.profile,
+        trace_memory=args.perf_memory or None,
+    )
+    zip_max_bytes = args.zip_max_mb * 1024 * 1024 if args.zip else None
+    generate_contracts(
+        workers=args.workers,
+        full=args.full,
+        zip_max_bytes=zip_max_bytes,
+        template_path=args.template,
+        template_dir=args.template_dir,
+        writers=args.writers,
+        retries=args.retries,
+        layout=args.layout,
+    )
+
+
 if __name__ == "__main__":
-    generate_contracts()
+    main()
@@ -1,6 +1,365 @@
-def main():
-    print("Hello from team-pj!")
+"""
+team-PJ の各処理を1つのコマンドから実行するための入口です。
+
+使用例:
+    python main.py progress
+    python main.py progress --watch
+    python main.py contracts --workers 4 --zip
+    python main.py sample-data --kind tasks
+    python main.py scrape
+    python main.py crawl spec.json --urls-file urls.txt
+    python main.py daemon
+    python main.py submit progress
+
+起動を速くするため、pandas・python-docx・selenium などの重いライブラリは
+選んだサブコマンドを実行する直前に import します。
+--help の表示や引数の誤りの確認では、これらのライブラリは読み込みません。
+"""
+
+import argparse
+import sys
+
+
+def run_progress(args, extra):
+    """
+    A.xlsx の進捗を集計して B.xlsx に出力します。
+    """
+    import perf
+
+    perf.configure(
+        report_path=args.perf_report,
+        profile_path=args.profile,
+        trace_memory=args.perf_memory or None,
+    )
+    history_path = None if args.no_history else args.history
+    if args.watch:
+        if args.batch:
+            print("エラー: --watch と --batch は同時に指定できません。")
+            sys.exit(2)
+        import progress_watch
+
+        progress_watch.watch(
+            args.input, args.output, history_path, debounce=args.debounce
+        )
+        return
+    if args.batch:
+        import progress_batch
+
+        progress_batch.main(args.batch, args.output, workers=args.workers)
+        return
+    if len(args.input) > 1:
+        print("エラー: 複数の入力ファイルは --watch か --batch で指定します。")
+        sys.exit(2)
+
+    import progress_tracker
+
+    progress_tracker.main(
+        args.input[0], args.output, history_path=history_path
+    )
+
+
+def run_contracts(args, extra):
+    """
+    Excelデータから契約書を一括生成します。
+
+    オプションは generate_contracts.py の引数をそのまま受け取ります
+    （python main.py contracts --help で一覧を表示します）。
+    """
+    import generate_contracts
+
+    generate_contracts.main(extra)
+
+
+def run_sample_data(args, extra):
+    """
+    動作確認用のサンプルデータを作成します。
+    """
+    if args.kind in ("tasks", "all"):
+        import create_sample_data
+
+        create_sample_data.main()
+    if args.kind in ("contracts", "all"):
+        import create_sample_assets
+
+        create_sample_assets.create_sample_data()
+
+
+def run_scrape(args, extra):
+    """
+    ブラウザを起動して Web ページの情報を取得します。
+    """
+    import selenium_demo
+
+    selenium_demo.main(allow_download=args.allow_driver_download or None)
+
+
+def run_crawl(args, extra):
+    """
+    ブラウザを使わずに Web ページから情報を取り出します。
+
+    オプションは web_scraper.py の引数をそのまま受け取ります
+    （python main.py crawl --help で一覧を表示します）。
+    """
+    import web_scraper
+
+    web_scraper.main(extra)
+
+
+def run_daemon(args, extra):
+    """
+    ジョブを受け付ける常駐プロセスを起動します。
+    """
+    import worker_daemon
+
+    worker_daemon.serve(
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        queue_size=args.queue_size,
+        root=args.root,
+        token_path=args.token_file or worker_daemon.DEFAULT_TOKEN_PATH,
+    )
+
+
+def job_arguments(args):
+    """
+    submit サブコマンドの引数から、常駐プロセスに渡すジョブの引数を作成します。
+    """
+    if args.job == "progress":
+        return {"input_file": args.input, "output_file": args.output}
+    return {"full": args.full, "zip": args.zip, "zip_max_mb": args.zip_max_mb}
+
+
+def run_submit(args, extra):
+    """
+    常駐プロセスにジョブを登録し、完了を待って結果を表示します。
+    """
+    import urllib.error
+
+    import worker_daemon
+
+    try:
+        result = worker_daemon.submit_job(
+            args.job,
+            job_arguments(args),
+            host=args.host,
+            port=args.port,
+            wait=not args.no_wait,
+            token_path=args.token_file or worker_daemon.DEFAULT_TOKEN_PATH,
+        )
+    except urllib.error.URLError as e:
+        print(f"エラー: 常駐プロセスに接続できません: {e.reason}")
+        sys.exit(1)
+    except OSError as e:
+        print(f"エラー: 常駐プロセスのトークンを読み込めません: {e}")
+        sys.exit(1)
+
+    if "error" in result and "id" not in result:
+        print(f"エラー: ジョブを登録できませんでした: {result['error']}")
+        sys.exit(1)
+    if args.no_wait:
+        print(f"ジョブを登録しました: {result['id']}")
+        return
+    print(result["output"], end="")
+    if result["error"]:
+        print(f"エラー: {result['error']}")
+    sys.exit(result["exit_code"])
+
+
+def add_daemon_arguments(parser):
+    """
+    常駐プロセスの接続先の引数を追加します。
+    """
+    parser.add_argument(
+        "--host", default="127.0.0.1", help="常駐プロセスのホスト名"
+    )
+    parser.add_argument(
+        "--port", type=int, default=8765, help="常駐プロセスのポート番号"
+    )
+    parser.add_argument(
+        "--token-file",
+        default=None,
+        help="常駐プロセスのトークンを保存するファイル"
+        "（省略時は ~/.team_pj/worker_daemon.token）",
+    )
+
+
+def add_daemon_parsers(subparsers):
+    """
+    daemon と submit サブコマンドの引数を定義します。
+    """
+    daemon = subparsers.add_parser(
+        "daemon", help="ジョブを受け付ける常駐プロセスを起動します"
+    )
+    add_daemon_arguments(daemon)
+    daemon.add_argument(
+        "--workers", type=int, default=2, help="同時に実行するジョブの数"
+    )
+    daemon.add_argument(
+        "--queue-size",
+        type=int,
+        default=16,
+        help="待ち行列に入れられるジョブの最大数",
+    )
+    daemon.add_argument(
+        "--root",
+        default=None,
+        help="ジョブの作業ディレクトリに指定できる場所（省略時は現在の場所）",
+    )
+    daemon.set_defaults(handler=run_daemon)
+
+    submit = subparsers.add_parser(
+        "submit", help="常駐プロセスにジョブを登録します"
+    )
+    submit.add_argument("job", choices=["progress", "contracts"])
+    add_daemon_arguments(submit)
+    submit.add_argument(
+        "--no-wait", action="store_true", help="ジョブの完了を待ちません"
+    )
+    submit.add_argument("--input", default="A.xlsx", help="progress の入力")
+    submit.add_argument("--output", default="B.xlsx", help="progress の出力")
+    submit.add_argument(
+        "--full", action="store_true", help="contracts: 全件を生成し直す"
+    )
+    submit.add_argument(
+        "--zip", action="store_true", help="contracts: ZIP にまとめる"
+    )
+    submit.add_argument(
+        "--zip-max-mb",
+        type=int,
+        default=1024,
+        help="contracts: ZIP アーカイブ1つあたりの最大サイズ（MB）",
+    )
+    submit.set_defaults(handler=run_submit)
+
+
+def build_parser():
+    """
+    サブコマンドごとの引数の定義を作成します。
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="team-PJ の各処理を実行します。",
+    )
+    subparsers = parser.add_subparsers(
+        dest="command", required=True, metavar="command"
+    )
+
+    progress = subparsers.add_parser(
+        "progress", help="A.xlsx の進捗を集計して B.xlsx に出力します"
+    )
+    progress.add_argument(
+        "--input",
+        nargs="+",
+        default=["A.xlsx"],
+        help="入力ファイル（--watch では複数指定できます）",
+    )
+    progress.add_argument("--output", default="B.xlsx", help="出力ファイル")
+    progress.add_argument(
+        "--batch",
+        metavar="DIR_OR_GLOB",
+        help="複数のタスク一覧（ディレクトリまたは glob パターン）を"
+        "まとめて集計します",
+    )
+    progress.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="--batch で並列実行するプロセス数（0 を指定するとCPUコア数）",
+    )
+    progress.add_argument(
+        "--watch",
+        action="store_true",
+        help="入力ファイルを監視し、保存されるたびに出力ファイルを作り直します",
+    )
+    progress.add_argument(
+        "--debounce",
+        type=float,
+        default=0.3,
+        help="--watch で、保存を見つけてからファイルが変わらなくなるまで"
+        "待つ秒数",
+    )
+    progress.add_argument(
+        "--perf-report",
+        help="処理時間・メモリ使用量のレポート (JSON) の出力先",
+    )
+    progress.add_argument(
+        "--profile",
+        help="最も時間のかかった段階の cProfile 結果 (.prof) の出力先",
+    )
+    progress.add_argument(
+        "--perf-memory",
+        action="store_true",
+        help="段階ごとのメモリ使用量も計測します（処理は遅くなります）",
+    )
+    progress.add_argument(
+        "--history",
+        default="data/task_history.db",
+        help="実行ごとの履歴を記録するデータベース"
+        "（既定: data/task_history.db）",
+    )
+    progress.add_argument(
+        "--no-history",
+        action="store_true",
+        help="履歴を記録せず、推移のシートも出力しません",
+    )
+    progress.set_defaults(handler=run_progress)
+
+    # 引数は generate_contracts.py にそのまま渡すため、ここでは定義しません
+    contracts = subparsers.add_parser(
+        "contracts",
+        help="Excelデータから契約書を一括生成します",
+        add_help=False,
+    )
+    contracts.set_defaults(handler=run_contracts, pass_extra=True)
+
+    sample_data = subparsers.add_parser(
+        "sample-data", help="動作確認用のサンプルデータを作成します"
+    )
+    sample_data.add_argument(
+        "--kind",
+        choices=["tasks", "contracts", "all"],
+        default="all",
+        help="作成するデータ（tasks: A.xlsx、contracts: 契約データと"
+        "テンプレート。既定は all）",
+    )
+    sample_data.set_defaults(handler=run_sample_data)
+
+    scrape = subparsers.add_parser(
+        "scrape", help="ブラウザを起動して Web ページの情報を取得します"
+    )
+    scrape.add_argument(
+        "--allow-driver-download",
+        action="store_true",
+        help="chromedriver が見つからない場合にダウンロードを許可します",
+    )
+    scrape.set_defaults(handler=run_scrape)
+
+    # 引数は web_scraper.py にそのまま渡すため、ここでは定義しません
+    crawl = subparsers.add_parser(
+        "crawl",
+        help="ブラウザを使わずに Web ページから情報を取り出します",
+        add_help=False,
+    )
+    crawl.set_defaults(handler=run_crawl, pass_extra=True)
+
+    add_daemon_parsers(subparsers)
+    return parser
+
+
+def main(argv=None):
+    """
+    コマンドライン引数を解析し、指定されたサブコマンドを実行します。
+
+    Args:
+        argv (list[str] | None): 引数の一覧（省略時は sys.argv の値）
+    """
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if extra and not getattr(args, "pass_extra", False):
+        parser.error(f"認識できない引数です: {' '.join(extra)}")
+    args.handler(args, extra)
 
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
@@ -0,0 +1,451 @@
+"""
+処理時間・CPU時間・メモリ使用量を計測するためのモジュールです。
+
+utils.log_start / utils.log_end で囲まれた処理を1回の「実行 (run)」とし、
+その中の各段階（読み込み・検証・生成・保存・書き込みなど）を span で計測します。
+1件ごとの処理時間は record_latency でヒストグラムに記録します。
+
+実行が終わると、設定されていれば JSON 形式のレポートを出力します。
+
+設定方法（どちらか一方）:
+    - 環境変数 TEAM_PJ_PERF_REPORT にレポートの出力先を指定する
+      （TEAM_PJ_PROFILE に .prof の出力先を指定すると cProfile も有効、
+      TEAM_PJ_PERF_MEMORY=1 で段階ごとのメモリ使用量の計測も有効）
+    - perf.configure(report_path=..., profile_path=..., trace_memory=...)
+      を呼び出す
+
+段階ごとのメモリ使用量は tracemalloc で計測します（Python と numpy が
+確保したメモリの最大値です）。処理が遅くなるため、既定では計測しません。
+常駐プロセスで複数のジョブを同時に実行している場合、tracemalloc は
+プロセス全体で1つのため、段階ごとの値は他のジョブの分を含みます。
+
+使用例:
+    with perf.span("read"):
+        df = load()
+
+    @perf.timed("aggregate")
+    def aggregate(df):
+        ...
+"""
+
+import bisect
+import contextlib
+import contextvars
+import cProfile
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows には resource モジュールがありません
+    resource = None
+
+# レイテンシのヒストグラムの区切り（秒）。最後の区間はそれより長いもの全部です
+LATENCY_BUCKETS = [
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+]
+
+
+def peak_rss_mb():
+    """
+    プロセス開始からのメモリ使用量（RSS）の最大値を MB 単位で返します。
+
+    取得できない環境（Windows など）では None を返します。
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux ではKB単位、macOS ではバイト単位で返されます
+    if sys.platform == "darwin":
+        return round(peak / (1024 * 1024), 1)
+    return round(peak / 1024, 1)
+
+
+class LatencyHistogram:
+    """
+    1件ごとの処理時間を区間ごとの件数として記録するクラスです。
+
+    すべての値を保持しないため、件数が増えてもメモリ使用量は一定です。
+    パーセンタイルは該当する区間の上限値で近似します。
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        """
+        処理時間を1件記録します。
+        """
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, ratio):
+        """
+        指定した割合（0〜1）のパーセンタイル値（秒）の近似値を返します。
+        """
+        if self.count == 0:
+            return 0.0
+        target = ratio * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                if i < len(LATENCY_BUCKETS):
+                    return min(LATENCY_BUCKETS[i], self.max)
+                return self.max
+        return self.max
+
+    def to_dict(self):
+        """
+        レポート用の辞書に変換します。
+        """
+        labels = [f"<={bound * 1000:g}ms" for bound in LATENCY_BUCKETS]
+        labels.append(f">{LATENCY_BUCKETS[-1] * 1000:g}ms")
+        return {
+            "count": self.count,
+            "total_seconds": round(self.total, 6),
+            "mean_ms": (
+                round(self.total / self.count * 1000, 3) if self.count else 0.0
+            ),
+            "p50_ms": round(self.percentile(0.5) * 1000, 3),
+            "p90_ms": round(self.percentile(0.9) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "histogram": dict(zip(labels, self.counts)),
+        }
+
+
+class _OpenSpan:
+    """
+    計測中の1つの span の時間・プロファイル・メモリ使用量を記録するクラスです。
+
+    内側の span を計測している間は pause で止め、終わったら resume で
+    再開します。
+    """
+
+    def __init__(self, profile=False, trace_memory=False):
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_mb = None
+        self.profiler = cProfile.Profile() if profile else None
+        self._trace_memory = trace_memory
+        self._wall_start = None
+        self._cpu_start = None
+
+    def resume(self):
+        """
+        計測を開始（再開）します。
+        """
+        if self._trace_memory:
+            # 最大値を現在の使用量に戻し、ここからの最大値を計測します
+            tracemalloc.reset_peak()
+        if self.profiler is not None:
+            self.profiler.enable()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    def pause(self):
+        """
+        計測を止め、ここまでの時間とメモリ使用量の最大値を記録します。
+        """
+        self.wall += time.perf_counter() - self._wall_start
+        self.cpu += time.process_time() - self._cpu_start
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self._trace_memory and tracemalloc.is_tracing():
+            peak = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+            self.peak_mb = max(self.peak_mb or 0, peak)
+
+
+class PerfRecorder:
+    """
+    1回の実行の中の各段階の計測結果を集めるクラスです。
+    """
+
+    def __init__(self):
+        self.report_path = os.environ.get("TEAM_PJ_PERF_REPORT")
+        self.profile_path = os.environ.get("TEAM_PJ_PROFILE")
+        # True の場合は tracemalloc で段階ごとのメモリ使用量の最大値を計測します
+        self.trace_memory = os.environ.get("TEAM_PJ_PERF_MEMORY") == "1"
+        self._runs = []
+        # 計測中の span（内側のものほど後ろ）
+        self._spans = []
+        self._started_tracemalloc = False
+        # record_latency は保存用のスレッドからも呼ばれます
+        self._latency_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        記録した計測結果をすべて消去します。
+        """
+        self.stages = {}
+        self.latencies = {}
+        self.profiles = {}
+
+    def start_run(self, name):
+        """
+        実行の開始を記録します。
+        """
+        if not self._runs:
+            self.reset()
+            if self.trace_memory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+        self._runs.append((name, time.perf_counter(), time.process_time()))
+
+    def end_run(self, name):
+        """
+        実行の終了を記録し、所要時間（秒）を返します。
+
+        開始が記録されていない名前の場合は None を返します。
+        最も外側の実行が終わった時点でレポートを出力します。
+        """
+        names = [run[0] for run in self._runs]
+        if name not in names:
+            return None
+        # 対応する終了がない開始（ログ出力だけの用途など）は読み捨てます
+        position = len(names) - 1 - names[::-1].index(name)
+        _, wall_start, cpu_start = self._runs[position]
+        del self._runs[position:]
+
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        if not self._runs:
+            self._finish(name, wall, cpu)
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+        return wall
+
+    def add_stage(self, name, wall, cpu, peak_mb=None):
+        """
+        段階ごとの所要時間を加算し、メモリ使用量の最大値を更新します。
+        """
+        stage = self.stages.setdefault(
+            name,
+            {
+                "calls": 0,
+                "wall_seconds": 0.0,
+                "cpu_seconds": 0.0,
+                "peak_traced_mb": None,
+            },
+        )
+        stage["calls"] += 1
+        stage["wall_seconds"] += wall
+        stage["cpu_seconds"] += cpu
+        if peak_mb is not None:
+            stage["peak_traced_mb"] = max(
+                stage["peak_traced_mb"] or 0, peak_mb
+            )
+
+    def record_latency(self, name, seconds):
+        """
+        1件ごとの処理時間をヒストグラムに記録します。
+        """
+        with self._latency_lock:
+            histogram = self.latencies.get(name)
+            if histogram is None:
+                histogram = self.latencies[name] = LatencyHistogram()
+            histogram.add(seconds)
+
+    @contextlib.contextmanager
+    def span(self, name):
+        """
+        with 文で囲んだ処理の所要時間を段階 name として記録します。
+
+        span の中で別の span を使った場合、内側の span の間は外側の段階の
+        計測を止めます。そのため段階ごとの時間は重複せず、合計が実行全体の
+        時間を超えることはありません（ストリーミング処理では読み込みなどが
+        生成の途中で行われるためです）。cProfile とメモリ使用量の計測も、
+        内側の span の間は内側の段階に記録します。
+        """
+        parent = self._spans[-1] if self._spans else None
+        if parent is not None:
+            parent.pause()
+        current = _OpenSpan(
+            profile=bool(self.profile_path),
+            trace_memory=self.trace_memory and tracemalloc.is_tracing(),
+        )
+        self._spans.append(current)
+        current.resume()
+        try:
+            yield
+        finally:
+            current.pause()
+            self._spans.pop()
+            self.add_stage(name, current.wall, current.cpu, current.peak_mb)
+            if current.profiler is not None:
+                self._keep_profile(name, current.profiler)
+            if parent is not None:
+                parent.resume()
+
+    def _keep_profile(self, name, profiler):
+        """
+        段階ごとのプロファイル結果をまとめて保持します。
+        """
+        import pstats
+
+        if name in self.profiles:
+            self.profiles[name].add(profiler)
+        else:
+            self.profiles[name] = pstats.Stats(profiler)
+
+    def build_report(self, run_name, wall, cpu):
+        """
+        計測結果をレポート用の辞書にまとめます。
+        """
+        stages = [
+            {
+                "name": name,
+                "calls": stage["calls"],
+                "wall_seconds": round(stage["wall_seconds"], 6),
+                "cpu_seconds": round(stage["cpu_seconds"], 6),
+                "peak_traced_mb": stage["peak_traced_mb"],
+            }
+            for name, stage in self.stages.items()
+        ]
+        return {
+            "run": run_name,
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "wall_seconds": round(wall, 6),
+            "cpu_seconds": round(cpu, 6),
+            "process_peak_rss_mb": peak_rss_mb(),
+            "stages": stages,
+            "latencies": {
+                name: histogram.to_dict()
+                for name, histogram in self.latencies.items()
+            },
+        }
+
+    def _finish(self, run_name, wall, cpu):
+        """
+        実行の終了時にレポートとプロファイル結果を出力します。
+        """
+        if self.report_path:
+            try:
+                report = self.build_report(run_name, wall, cpu)
+                with open(self.report_path, "w", encoding="utf-8") as f:
+                    json.dump(report, f, ensure_ascii=False, indent=2)
+                logging.info(f"計測レポートを出力しました: {self.report_path}")
+            except OSError as e:
+                logging.warning(f"計測レポートを出力できませんでした: {e}")
+
+        if self.profile_path and self.profiles:
+            # 最も時間のかかった段階のプロファイル結果だけを出力します
+            hottest = max(
+                self.profiles, key=lambda n: self.stages[n]["wall_seconds"]
+            )
+            try:
+                self.profiles[hottest].dump_stats(self.profile_path)
+                logging.info(
+                    f"プロファイル結果を出力しました ({hottest}): "
+                    f"{self.profile_path}"
+                )
+            except OSError as e:
+                logging.warning(f"プロファイル結果を出力できませんでした: {e}")
+
+
+# プログラム全体で共有する計測用オブジェクト
+recorder = PerfRecorder()
+
+# use_recorder で切り替えた計測用オブジェクト（None の場合は recorder）
+_active_recorder = contextvars.ContextVar("perf_recorder", default=None)
+
+
+def current():
+    """
+    現在のジョブの計測用オブジェクトを返します。
+
+    use_recorder の中ではそこで指定したもの、それ以外では recorder です。
+    """
+    return _active_recorder.get() or recorder
+
+
+@contextlib.contextmanager
+def use_recorder(job_recorder):
+    """
+    with 文の中の計測結果を job_recorder に記録します。
+
+    常駐プロセス (worker_daemon.py) で複数のジョブを同時に実行する場合に、
+    ジョブごとに別々の PerfRecorder を使うためのものです。
+    contextvars で切り替えるため、他のスレッドのジョブには影響しません。
+    """
+    token = _active_recorder.set(job_recorder)
+    try:
+        yield job_recorder
+    finally:
+        _active_recorder.reset(token)
+
+
+def configure(report_path=None, profile_path=None, trace_memory=None):
+    """
+    レポートと cProfile の出力先、メモリ使用量を計測するかを設定します
+    （None の項目は変更しません）。
+    """
+    active = current()
+    if report_path is not None:
+        active.report_path = report_path
+    if profile_path is not None:
+        active.profile_path = profile_path
+    if trace_memory is not None:
+        active.trace_memory = trace_memory
+
+
+def span(name):
+    """
+    with 文で囲んだ処理の所要時間を記録します（PerfRecorder.span を参照）。
+    """
+    return current().span(name)
+
+
+def timed(name=None):
+    """
+    関数の所要時間を記録するデコレーターです。
+
+    Args:
+        name (str | None): 段階の名前（省略時は関数名）
+    """
+
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with current().span(stage_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_latency(name, seconds):
+    """
+    1件ごとの処理時間を記録します（PerfRecorder.record_latency を参照）。
+    """
+    current().record_latency(name, seconds)
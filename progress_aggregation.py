@@ -0,0 +1,295 @@
+import numpy as np
+import pandas as pd
+
+# 集計対象のステータス（この順番で列を並べます）
+STATUS_LABELS = ["完了", "対応中", "未着手"]
+
+# 「完了」のステータス番号（STATUS_LABELS の位置）
+COMPLETED_CODE = STATUS_LABELS.index("完了")
+
+# 上記以外のステータスをまとめる列名
+OTHER_STATUS_LABEL = "その他"
+
+# 担当者が空欄のタスクに付ける名前
+UNASSIGNED_LABEL = "(未設定)"
+
+# 集計に使う任意の列（存在する場合のみ使用します）
+OPTIONAL_COLUMNS = ["Assignee", "Start Date", "End Date"]
+
+# 集計のシート名と、その集計に使う任意の列・グループ名の列名
+BREAKDOWN_SHEETS = {
+    "担当者別": ("Assignee", "担当者"),
+    "週別(期限)": ("End Date", "週"),
+    "月別(期限)": ("End Date", "月"),
+}
+
+# 担当者別・週別・月別の集計に使う任意の列
+BREAKDOWN_COLUMNS = ["Assignee", "End Date"]
+
+# グループごとに数える列（ステータスごとの件数と期限超過の件数）
+COUNT_COLUMNS = STATUS_LABELS + [OTHER_STATUS_LABEL, "期限超過"]
+
+
+def prepare_tasks(df, columns=None):
+    """
+    集計用にタスク一覧の列の型を整えます。
+
+    Status と Assignee はカテゴリ型に変換します。カテゴリ型では値が
+    整数コードで保持されるため、数百万行でもメモリが少なく集計も高速です。
+    日付の列は datetime 型に変換し、解釈できない値は NaT (欠損) とします。
+
+    Args:
+        df (pd.DataFrame): 'Status' 列を含むタスク一覧
+        columns (list[str] | None): 集計に使う任意の列。df にない列は
+            すべて空欄の列として扱います（省略時は df にある任意の列）
+
+    Returns:
+        pd.DataFrame: 集計に使う列の型を整えたタスク一覧
+            （元の df は変更しません）
+    """
+    if columns is None:
+        columns = [c for c in OPTIONAL_COLUMNS if c in df.columns]
+    # 集計に使う列だけをコピーします（Task Name などはコピーしません）
+    tasks = df[["Status"] + [c for c in columns if c in df.columns]].copy()
+    for column in columns:
+        if column not in tasks.columns:
+            tasks[column] = None
+    tasks["Status"] = tasks["Status"].astype("category")
+    if "Assignee" in tasks.columns:
+        tasks["Assignee"] = (
+            tasks["Assignee"].fillna(UNASSIGNED_LABEL).astype("category")
+        )
+    for column in ["Start Date", "End Date"]:
+        if column in tasks.columns:
+            tasks[column] = pd.to_datetime(tasks[column], errors="coerce")
+    return tasks
+
+
+def status_to_codes(status):
+    """
+    カテゴリ型の Status 列を、STATUS_LABELS の位置を表す番号に変換します。
+
+    カテゴリの種類ごとに番号の対応表を作り、各行のカテゴリコードで
+    対応表を引くことで、行数によらず一括で変換します。
+    STATUS_LABELS にないステータスと空欄は「その他」の番号になります。
+
+    Returns:
+        np.ndarray: 各行のステータス番号
+    """
+    other = len(STATUS_LABELS)
+    lookup = np.array(
+        [
+            STATUS_LABELS.index(c) if c in STATUS_LABELS else other
+            for c in status.cat.categories
+        ]
+        # 空欄（カテゴリコード -1）は対応表の末尾を参照します
+        + [other],
+        dtype=np.int64,
+    )
+    return lookup[status.cat.codes.to_numpy()]
+
+
+def count_by(codes, labels, status_codes, overdue):
+    """
+    グループごとのステータス件数と期限超過件数を数えます。
+
+    グループとステータスの組み合わせを1つの整数にまとめ、
+    np.bincount で一度に数えるため、行数に比例した時間で集計できます。
+
+    Args:
+        codes (np.ndarray): 各行のグループ番号（-1 は集計対象外）
+        labels: グループ番号に対応するグループ名
+        status_codes (np.ndarray): 各行のステータス番号
+            （STATUS_LABELS の位置。その他のステータスは len(STATUS_LABELS)）
+        overdue (np.ndarray): 各行が期限超過かどうか（bool）
+
+    Returns:
+        pd.DataFrame: グループ名を行の名前にした件数の表
+            （列は COUNT_COLUMNS）
+    """
+    valid = codes >= 0
+    codes = codes[valid]
+    group_count = len(labels)
+    status_count = len(STATUS_LABELS) + 1
+
+    counts = np.bincount(
+        codes * status_count + status_codes[valid],
+        minlength=group_count * status_count,
+    ).reshape(group_count, status_count)
+    overdue_counts = np.bincount(
+        codes, weights=overdue[valid], minlength=group_count
+    ).astype(np.int64)
+
+    return pd.DataFrame(
+        np.column_stack([counts, overdue_counts]),
+        columns=COUNT_COLUMNS,
+        index=pd.Index(labels),
+    )
+
+
+def format_counts(counts, label_name):
+    """
+    件数の表から、シートに出力する集計結果（合計・完了率付き）を作成します。
+
+    差分で件数を減らして0件になったグループは出力しません。
+    「その他」の列は、その他のステータスがある場合だけ出力します。
+
+    Args:
+        counts (pd.DataFrame): count_by の戻り値（または足し合わせた表）
+        label_name (str): グループ名の列名
+
+    Returns:
+        pd.DataFrame: グループごとの集計結果
+    """
+    totals = counts[STATUS_LABELS + [OTHER_STATUS_LABEL]].sum(axis=1)
+    counts = counts[totals > 0]
+    totals = totals[totals > 0]
+
+    result = counts[STATUS_LABELS].copy()
+    if counts[OTHER_STATUS_LABEL].any():
+        result[OTHER_STATUS_LABEL] = counts[OTHER_STATUS_LABEL]
+    result["合計"] = totals
+    result["完了率(%)"] = (counts["完了"] * 100 / totals).round(1)
+    result["期限超過"] = counts["期限超過"]
+    result.index.name = label_name
+    return result.reset_index()
+
+
+def resolve_today(today=None):
+    """
+    期限超過の判定に使う基準日を返します（省略時は今日）。
+    """
+    if today is None:
+        today = pd.Timestamp.today()
+    return pd.Timestamp(today).normalize()
+
+
+def count_breakdowns(df, today=None, columns=None):
+    """
+    担当者別・週別・月別の件数を数えます（合計と完了率はまだ求めません）。
+
+    件数の表は足したり引いたりできるため、ファイルごとや差分の行ごとに
+    数えた結果を add_breakdowns でまとめ、format_breakdowns で出力用の
+    表にできます。ステータス番号と期限超過フラグは最初に一度だけ計算し、
+    すべての集計で使い回します。行ごとの Python ループは使いません。
+
+    Args:
+        df (pd.DataFrame): 'Status' 列を含むタスク一覧
+        today (pd.Timestamp | None): 期限超過の判定に使う基準日
+            （省略時は今日）
+        columns (list[str] | None): 集計に使う任意の列（prepare_tasks を参照）
+
+    Returns:
+        dict[str, pd.DataFrame]: シート名と件数の表（count_by の戻り値）
+    """
+    tasks = prepare_tasks(df, columns)
+    status_codes = status_to_codes(tasks["Status"])
+    today = resolve_today(today)
+
+    if "End Date" in tasks.columns:
+        end_dates = tasks["End Date"]
+        overdue = (
+            (end_dates < today)
+            & (status_codes != COMPLETED_CODE)
+            & end_dates.notna()
+        ).to_numpy()
+    else:
+        end_dates = None
+        overdue = np.zeros(len(tasks), dtype=bool)
+
+    counts = {}
+    if "Assignee" in tasks.columns:
+        assignees = tasks["Assignee"].cat
+        counts["担当者別"] = count_by(
+            assignees.codes.to_numpy(),
+            assignees.categories,
+            status_codes,
+            overdue,
+        )
+
+    if end_dates is not None:
+        # 日単位の datetime64 配列に変換し、NumPy の日付演算で週・月を求めます
+        days = end_dates.to_numpy(dtype="datetime64[D]")
+
+        # 週は月曜日始まりとし、その週の月曜日の日付で表します
+        # （1970-01-01 は木曜日なので、3日ずらして7で割った余りが曜日になります）
+        weekday = (days.astype(np.int64) + 3) % 7
+        weeks = days - weekday.astype("timedelta64[D]")
+        codes, labels = pd.factorize(weeks, sort=True)
+        counts["週別(期限)"] = count_by(
+            codes,
+            pd.DatetimeIndex(labels).strftime("%Y-%m-%d"),
+            status_codes,
+            overdue,
+        )
+
+        months = days.astype("datetime64[M]")
+        codes, labels = pd.factorize(months, sort=True)
+        counts["月別(期限)"] = count_by(
+            codes,
+            pd.DatetimeIndex(labels).strftime("%Y-%m"),
+            status_codes,
+            overdue,
+        )
+
+    return counts
+
+
+def add_breakdowns(total, part, sign=1):
+    """
+    count_breakdowns の件数の表 part を total に足します。
+
+    sign に -1 を指定すると引き算になります（差分で削除・変更された行の
+    分を減らす場合です）。グループは名前の順に並べ直します。
+
+    Returns:
+        dict[str, pd.DataFrame]: 足し合わせた件数の表（total は変更しません）
+    """
+    merged = dict(total)
+    for sheet_name, counts in part.items():
+        counts = counts * sign
+        if sheet_name in merged:
+            counts = merged[sheet_name].add(counts, fill_value=0)
+            try:
+                counts = counts.sort_index()
+            except TypeError:
+                # 数値と文字列の担当者名が混ざっている場合は並べ替えません
+                pass
+        merged[sheet_name] = counts.astype(np.int64)
+    return merged
+
+
+def format_breakdowns(counts, columns=None):
+    """
+    count_breakdowns / add_breakdowns の件数の表から、シートに出力する
+    集計結果を作成します。
+
+    Args:
+        counts (dict[str, pd.DataFrame]): シート名と件数の表
+        columns (list[str] | None): 入力にあった任意の列。その列を使う
+            集計だけを出力します（省略時は counts のすべて）
+
+    Returns:
+        dict[str, pd.DataFrame]: シート名と集計結果の辞書
+    """
+    return {
+        sheet_name: format_counts(counts[sheet_name], label_name)
+        for sheet_name, (column, label_name) in BREAKDOWN_SHEETS.items()
+        if sheet_name in counts and (columns is None or column in columns)
+    }
+
+
+def aggregate_progress(df, today=None):
+    """
+    タスク一覧から担当者別・週別・月別の進捗集計を作成します。
+
+    Args:
+        df (pd.DataFrame): 'Status' 列を含むタスク一覧
+            （'Assignee', 'End Date' 列があれば、それぞれの集計を行います）
+        today (pd.Timestamp | None): 期限超過の判定に使う基準日
+            （省略時は今日）
+
+    Returns:
+        dict[str, pd.DataFrame]: シート名と集計結果の辞書
+    """
+    return format_breakdowns(count_breakdowns(df, today))
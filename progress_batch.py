@@ -0,0 +1,358 @@
+"""
+複数のタスク一覧 (A.xlsx) をまとめて集計し、1つの B.xlsx に出力するモジュールです。
+
+チームやプロジェクトごとに分かれた数百個のタスク一覧を、ディレクトリまたは
+glob パターン（例: "teams/**/*.xlsx"）で指定して読み込みます。
+ファイルの読み込みと列の確認・ファイルごとの件数と担当者別などの集計は
+複数のプロセスで同時に行い、親プロセスでその件数を足し合わせます。
+ワーカープロセスから親プロセスへ送る行は、詳細一覧に出力する
+Task Name と Status の列だけです。
+
+列名が見つからない場合の救済措置（2列目を Task Name、6列目を Status とみなす）は
+ファイルごとに適用します。読み込めないファイルがあっても処理は止めず、
+B.xlsx の「ファイル別」シートにエラーとして記録します（ワーカープロセスが
+異常終了した場合も、読み込めなかったファイルのエラーとして記録します）。
+
+使用例:
+    python main.py progress --batch teams/ --workers 4
+"""
+
+import glob
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+import batch_runner
+import perf
+import utils
+from excel_reader import read_columns, read_header
+from excel_writer import StreamingExcelWriter
+from progress_aggregation import (
+    BREAKDOWN_COLUMNS,
+    add_breakdowns,
+    count_breakdowns,
+    format_breakdowns,
+    resolve_today,
+)
+from progress_tracker import (
+    REQUIRED_COLUMNS,
+    add_counts,
+    count_statuses,
+    fallback_columns,
+    make_summary,
+    optional_columns_in,
+)
+
+# 1ファイル分の読み込み結果（失敗した場合は tasks が None で error にメッセージ）
+# tasks は詳細一覧に出力する Task Name と Status の列だけの表、
+# breakdowns は担当者別などの件数（count_breakdowns の戻り値）、
+# columns はファイルにあった任意の列（Assignee など）です
+SourceResult = namedtuple(
+    "SourceResult",
+    ["path", "tasks", "counts", "breakdowns", "columns", "note", "error"],
+)
+
+# 列の位置で読み込んだファイルの備考
+FALLBACK_NOTE = "列名がないため2列目と6列目を使用"
+
+# 「ファイル別」シートの列
+SOURCE_COLUMNS = [
+    "ファイル",
+    "全タスク数",
+    "完了",
+    "対応中",
+    "未着手",
+    "進捗率(%)",
+    "備考",
+    "エラー",
+]
+
+
+def find_workbooks(pattern, exclude=()):
+    """
+    ディレクトリまたは glob パターンから、読み込む Excel ファイルを探します。
+
+    ディレクトリを指定した場合は、サブディレクトリも含めて *.xlsx を探します。
+    Excel が作成する一時ファイル（~$ で始まるファイル）と exclude に
+    指定したファイル（出力先の B.xlsx など）は除きます。
+
+    Returns:
+        list[str]: 見つかったファイルのパス（名前順）
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "**", "*.xlsx")
+    excluded = {os.path.abspath(path) for path in exclude}
+    return sorted(
+        path
+        for path in glob.glob(pattern, recursive=True)
+        if os.path.isfile(path)
+        and not os.path.basename(path).startswith("~$")
+        and os.path.abspath(path) not in excluded
+    )
+
+
+def failed_result(path, error):
+    """
+    読み込めなかったファイルの結果を作成します。
+    """
+    return SourceResult(
+        path, None, None, None, [], "", f"{type(error).__name__}: {error}"
+    )
+
+
+def read_workbook(path, today=None):
+    """
+    1つのタスク一覧を読み込み、ファイルごとの件数と集計を求めます。
+
+    ワーカープロセスで実行します。一時的なエラーは待ってから読み直し、
+    それでも読み込めない場合は例外にせず、結果に記録します。
+    担当者などの列がないファイルも空欄として数えておき、
+    ほかのファイルの件数と足し合わせられるようにします。
+
+    Args:
+        path (str): タスク一覧のパス
+        today (pd.Timestamp | None): 期限超過の判定に使う基準日
+            （省略時は今日）
+
+    Returns:
+        SourceResult: 読み込み結果
+    """
+    try:
+        columns = batch_runner.call_with_retry(read_header, path)
+        source_columns = fallback_columns(columns, REQUIRED_COLUMNS)
+        optional_columns = optional_columns_in(columns, source_columns)
+        tasks = batch_runner.call_with_retry(
+            read_columns, path, source_columns + optional_columns
+        )
+        tasks.columns = REQUIRED_COLUMNS + optional_columns
+    except Exception as e:
+        utils.log_warning(f"読み込みに失敗しました: {path}: {e}")
+        return failed_result(path, e)
+
+    note = FALLBACK_NOTE if source_columns != REQUIRED_COLUMNS else ""
+    return SourceResult(
+        path,
+        tasks[REQUIRED_COLUMNS],
+        count_statuses(tasks["Status"]),
+        count_breakdowns(tasks, today, BREAKDOWN_COLUMNS),
+        optional_columns,
+        note,
+        None,
+    )
+
+
+def _init_worker(log_queue=None):
+    """
+    ワーカープロセスの起動時に、ログの送り先を親プロセスに設定します。
+    """
+    if log_queue is not None:
+        utils.configure_worker_logging(log_queue)
+
+
+def collect_result(path, future):
+    """
+    ワーカープロセスの読み込み結果を取り出します。
+
+    ワーカープロセスが異常終了した場合（メモリ不足で強制終了された場合など）は、
+    処理を止めずに、そのファイルを読み込めなかったエラーとして記録します。
+    """
+    try:
+        return future.result()
+    except BrokenProcessPool as e:
+        utils.log_error(f"ワーカープロセスが異常終了しました: {path}")
+        return failed_result(path, e)
+
+
+def submit_reads(executor, paths, today):
+    """
+    各ファイルの読み込みをワーカープロセスに依頼し、paths の順に Future を返します。
+    """
+    futures = []
+    for path in paths:
+        try:
+            future = executor.submit(read_workbook, path, today)
+        except BrokenProcessPool as e:
+            # 異常終了したプールには依頼できないため、エラーの結果にします
+            future = Future()
+            future.set_exception(e)
+        futures.append(future)
+    return futures
+
+
+def read_workbooks(paths, workers=1, today=None):
+    """
+    タスク一覧を読み込み、paths と同じ順序で結果を返します。
+
+    Args:
+        paths (list[str]): 読み込むファイルのパス
+        workers (int): 並列実行するプロセス数（1 の場合は逐次実行）
+        today (pd.Timestamp | None): 期限超過の判定に使う基準日
+            （省略時は今日。すべてのワーカーで同じ日を使います）
+
+    Returns:
+        list[SourceResult]: 各ファイルの読み込み結果
+    """
+    today = resolve_today(today)
+    if workers <= 1 or len(paths) <= 1:
+        return [read_workbook(path, today) for path in paths]
+
+    log_queue = utils.get_process_log_queue()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=utils.process_pool_context(),
+            initializer=_init_worker,
+            initargs=(log_queue,),
+        ) as executor:
+            futures = submit_reads(executor, paths, today)
+            return [
+                collect_result(path, future)
+                for path, future in zip(paths, futures)
+            ]
+    finally:
+        utils.stop_process_logging(log_queue)
+
+
+def source_table(results, base_dir):
+    """
+    「ファイル別」シートの表を作成します。
+
+    Args:
+        results (list[SourceResult]): 各ファイルの読み込み結果
+        base_dir (str): ファイル名を表示する際の基準のディレクトリ
+    """
+    rows = []
+    for result in results:
+        name = os.path.relpath(result.path, base_dir)
+        if result.error:
+            rows.append([name, None, None, None, None, None, "", result.error])
+            continue
+        counts = result.counts
+        rows.append(
+            [
+                name,
+                counts["total"],
+                counts["completed"],
+                counts["in_progress"],
+                counts["not_started"],
+                round(counts["progress_rate"], 1),
+                result.note,
+                None,
+            ]
+        )
+    return pd.DataFrame(rows, columns=SOURCE_COLUMNS)
+
+
+def combine_tasks(results, base_dir):
+    """
+    読み込めたファイルの詳細一覧の行を、ファイル名の列を付けて1つにまとめます。
+    """
+    frames = [
+        result.tasks.assign(
+            **{"ファイル": os.path.relpath(result.path, base_dir)}
+        )
+        for result in results
+        if result.tasks is not None
+    ]
+    if not frames:
+        return pd.DataFrame(columns=["ファイル", *REQUIRED_COLUMNS])
+    return pd.concat(frames, ignore_index=True)
+
+
+def combine_breakdowns(results):
+    """
+    ファイルごとの担当者別・週別・月別の件数を足し合わせ、出力用の表にします。
+
+    どのファイルにもない列（Assignee など）を使う集計は出力しません。
+    """
+    breakdowns = {}
+    columns = set()
+    for result in results:
+        if result.error:
+            continue
+        breakdowns = add_breakdowns(breakdowns, result.breakdowns)
+        columns.update(result.columns)
+    return format_breakdowns(breakdowns, columns)
+
+
+def write_report(output_file, summary_df, sources_df, combined, breakdowns):
+    """
+    まとめた集計結果を B.xlsx に書き出します。
+    """
+    writer = StreamingExcelWriter(output_file)
+    writer.write_frame("サマリー", summary_df)
+    writer.write_frame("ファイル別", sources_df)
+    writer.write_frame(
+        "詳細一覧", combined[["ファイル", "Task Name", "Status"]]
+    )
+    for sheet_name, breakdown_df in breakdowns.items():
+        writer.write_frame(sheet_name, breakdown_df)
+    writer.save()
+
+
+def main(pattern, output_file="B.xlsx", workers=1):
+    """
+    複数のタスク一覧をまとめて集計し、B.xlsx に出力します。
+
+    Args:
+        pattern (str): タスク一覧のディレクトリ、または glob パターン
+        output_file (str): 出力ファイルのパス
+        workers (int): 並列実行するプロセス数（0 を指定するとCPUコア数）
+    """
+    utils.log_start("progress batch")
+    if workers == 0:
+        workers = os.cpu_count() or 1
+
+    paths = find_workbooks(pattern, exclude=[output_file])
+    if not paths:
+        print(f"エラー: '{pattern}' に Excel ファイルが見つかりません。")
+        sys.exit(1)
+    print(f"処理を開始します: {len(paths)}個のファイルを読み込んでいます...")
+    base_dir = pattern if os.path.isdir(pattern) else os.getcwd()
+
+    with perf.span("read"):
+        results = read_workbooks(paths, workers)
+    failed = [result for result in results if result.error]
+    for result in failed:
+        print(f"エラー: {result.path}: {result.error}")
+
+    with perf.span("aggregate"):
+        combined = combine_tasks(results, base_dir)
+        counts = add_counts(
+            [result.counts for result in results if not result.error]
+        )
+        summary_df = pd.concat(
+            [
+                make_summary(counts),
+                pd.DataFrame(
+                    {
+                        "項目": ["ファイル数", "読み込みエラー"],
+                        "値": [len(results), len(failed)],
+                    }
+                ),
+            ],
+            ignore_index=True,
+        )
+        sources_df = source_table(results, base_dir)
+        breakdowns = combine_breakdowns(results)
+
+    print(
+        f"集計結果: {len(results)}ファイル（エラー{len(failed)}件）, "
+        f"全{counts['total']}件, 完了{counts['completed']}件, "
+        f"進捗率{counts['progress_rate']:.1f}%"
+    )
+
+    try:
+        with perf.span("write"):
+            write_report(
+                output_file, summary_df, sources_df, combined, breakdowns
+            )
+        print(f"成功: '{output_file}' が作成されました。")
+    except Exception as e:
+        utils.handle_error(e)
+
+    utils.log_end("progress batch")
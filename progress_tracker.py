@@ -2,138 +2,328 @@ import os  # ファイル操作を行うための標準ライブラリ
 import sys  # システム終了などの操作を行うためのライブラリ
 
 import pandas as pd  # データ分析・操作のためのライブラリ (表形式のデータを扱うのが得意)
-from openpyxl.styles import (  # Excelの装飾（フォント、塗りつぶし）を行うためのクラス
-    Font,
-    PatternFill,
-)
 
+import batch_runner  # 一時的なエラーを再試行するための自作モジュール
+import perf  # 処理時間の計測用の自作モジュール
+import task_history  # 実行ごとの履歴を SQLite に記録する自作モジュール
 import utils  # 自作のユーティリティモジュール（ログ出力やエラーハンドリング用）
+from excel_reader import (  # Excelファイルを1行ずつ読み込むための自作モジュール
+    read_columns_cached,
+    read_header,
+)
+from excel_writer import (  # Excelファイルを省メモリで書き込むための自作モジュール
+    StreamingExcelWriter,
+)
+from progress_aggregation import (  # 担当者別・期間別の集計を行う自作モジュール
+    OPTIONAL_COLUMNS,
+    aggregate_progress,
+)
 
+# 集計に必要な列
+REQUIRED_COLUMNS = ["Task Name", "Status"]
 
-def main():
+
+def fallback_columns(columns, required_columns):
     """
-    メイン処理を行う関数です。
-    A.xlsx からデータを読み込み、進捗を集計して B.xlsx に出力します。
+    ヘッダーの列名から、読み込むべき列の名前を決定します（画面には表示しません）。
+
+    Args:
+        columns (list[str]): ヘッダー行の列名
+        required_columns (list[str]): 必要な列名 ('Task Name', 'Status')
+
+    Returns:
+        list[str]: 'Task Name' と 'Status' として読み込む列の名前
+
+    Raises:
+        ValueError: 必要な列がなく、列の数も足りない場合
     """
-    # 関数の開始をログ出力
-    utils.log_start("main")
+    # ヘッダーの列名に、必要な列が含まれているかチェック
+    # 初心者向けポイント: リスト内包表記と all() 関数を使った効率的なチェック方法です。
+    if all(col in columns for col in required_columns):
+        return required_columns
 
-    # ファイル名の設定
-    # 初心者向けポイント: ファイル名は変数にしておくと、後で変更しやすくなります。
-    input_file = "A.xlsx"
-    output_file = "B.xlsx"
+    # 列名が見つからない場合の救済措置（フォールバック）
+    # 2列目(インデックス1)を 'Task Name'、6列目(インデックス5)を 'Status' とみなします。
+    if len(columns) >= 6:
+        return [columns[1], columns[5]]
 
-    print(f"処理を開始します: {input_file} を読み込んでいます...")
+    # 列数が足りない場合は続行不可能なのでエラーとします
+    raise ValueError("Excelファイルの列数が不足しています。")
 
-    # --- セキュリティ & 安全性チェック: ファイルの存在確認 ---
-    # ファイルが存在しないのに読み込もうとするとエラーになるため、事前にチェックします。
-    if not os.path.exists(input_file):
-        print(f"エラー: 入力ファイル '{input_file}' が見つかりません。")
-        sys.exit(1)
 
-    # --- データの読み込み ---
-    try:
-        # pandasを使ってExcelファイルを読み込みます。
-        # df は DataFrame (データフレーム) の略で、表データを扱う変数名の慣習です。
-        # 外部ファイルの読み込みはI/O操作なので、エラーハンドリングを行います。
-        df = pd.read_excel(input_file)
-    except Exception as e:
-        utils.handle_error(e)
+def resolve_columns(columns, required_columns):
+    """
+    ヘッダーの列名から、読み込むべき列の名前を決定します。
 
-    # --- データ構造の確認 (バリデーション) ---
+    列名が見つからず列の位置で読み込む場合は、警告を表示します。
+    列の数が足りない場合はエラーを表示して終了します。
+
+    Args:
+        columns (list[str]): ヘッダー行の列名
+        required_columns (list[str]): 必要な列名 ('Task Name', 'Status')
+
+    Returns:
+        list[str]: 'Task Name' と 'Status' として読み込む列の名前
+    """
     # 必要な列（カラム）が存在するか確認します。
     # 万が一、列名が違っていると後の処理でエラーになるため、ここで防ぎます。
-    required_columns = ["Task Name", "Status"]
+    try:
+        source_columns = fallback_columns(columns, required_columns)
+    except ValueError as e:
+        print(f"エラー: {e}")
+        sys.exit(1)
 
-    # データフレームの列名に、必要な列が含まれているかチェック
-    # 初心者向けポイント: リスト内包表記と all() 関数を使った効率的なチェック方法です。
-    if not all(col in df.columns for col in required_columns):
+    if source_columns != required_columns:
         print(
             "警告: 想定している列名 ('Task Name', 'Status') が見つかりません。"
         )
         print("列の位置（2列目と6列目）を使って処理を続行します。")
+    return source_columns
 
-        # 列名が見つからない場合の救済措置（フォールバック）
-        # 2列目(インデックス1)を 'Task Name'、6列目(インデックス5)を 'Status' とみなして名前を付け替えます。
-        # ※注意: 列数が足りない場合はここでエラーになる可能性があります。
-        if len(df.columns) >= 6:
-            df.columns.values[1] = "Task Name"
-            df.columns.values[5] = "Status"
-        else:
-            # 列数が足りない場合は続行不可能なのでエラーとします
-            print("エラー: Excelファイルの列数が不足しています。")
-            sys.exit(1)
 
-    # --- 1. 進捗状況の集計 ---
-    # 全体のタスク数（行数）を取得
-    total_tasks = len(df)
+def optional_columns_in(columns, source_columns):
+    """
+    担当者・日付の列のうち、ファイルにあるものを返します。
+    """
+    return [
+        col
+        for col in OPTIONAL_COLUMNS
+        if col in columns and col not in source_columns
+    ]
 
-    # 'Status' 列の値ごとの個数をカウントします（例: 完了:2, 未着手:3）
-    status_counts = df["Status"].value_counts()
 
+def count_statuses(status):
+    """
+    ステータスごとの件数と進捗率を数えます。
+
+    Args:
+        status (pd.Series): 'Status' 列
+
+    Returns:
+        dict: total・completed・in_progress・not_started の件数と
+            progress_rate（進捗率 %）
+    """
+    # 'Status' 列の値ごとの個数をカウントします（例: 完了:2, 未着手:3）
+    status_counts = status.value_counts()
+    total = len(status)
     # 各ステータスの件数を取得（存在しない場合は 0 とする安全な取得方法 .get() を使用）
-    completed_count = status_counts.get("完了", 0)
-    in_progress_count = status_counts.get("対応中", 0)
-    not_started_count = status_counts.get("未着手", 0)
+    completed = int(status_counts.get("完了", 0))
 
     # 進捗率の計算
     # ゼロ除算（0で割ること）を防ぐため、タスクがある場合のみ計算します。
-    if total_tasks > 0:
-        progress_rate = (completed_count / total_tasks) * 100
-    else:
-        progress_rate = 0
+    progress_rate = (completed / total) * 100 if total > 0 else 0
+    return {
+        "total": total,
+        "completed": completed,
+        "in_progress": int(status_counts.get("対応中", 0)),
+        "not_started": int(status_counts.get("未着手", 0)),
+        "progress_rate": progress_rate,
+    }
+
+
+def add_counts(counts_list):
+    """
+    複数の count_statuses の結果（ファイルごとの件数など）を合計します。
+
+    Returns:
+        dict: count_statuses と同じ形の件数と進捗率
+    """
+    totals = {
+        key: sum(counts[key] for counts in counts_list)
+        for key in ["total", "completed", "in_progress", "not_started"]
+    }
+    total = totals["total"]
+    totals["progress_rate"] = (
+        (totals["completed"] / total) * 100 if total > 0 else 0
+    )
+    return totals
+
+
+def make_summary(counts):
+    """
+    count_statuses の結果から、サマリー（集計結果）の表を作成します。
+    """
+    return pd.DataFrame(
+        {
+            "項目": ["全タスク数", "完了", "対応中", "未着手", "進捗率"],
+            "値": [
+                counts["total"],
+                counts["completed"],
+                counts["in_progress"],
+                counts["not_started"],
+                f"{counts['progress_rate']:.1f}%",
+            ],
+        }
+    )
+
+
+@perf.timed("read")
+def load_tasks(input_file):
+    """
+    タスク一覧のExcelファイルから、集計に必要な列だけを読み込みます。
+
+    Args:
+        input_file (str): 入力ファイルのパス
+
+    Returns:
+        pd.DataFrame: 'Task Name', 'Status' と任意の列を持つデータフレーム
+    """
+    # --- データの読み込み ---
+    try:
+        # まずはヘッダー（1行目）だけを読み込みます。
+        # 列名の確認はヘッダーだけで行えるため、ファイル全体を読み込む前に
+        # 問題に気づくことができます。
+        # 外部ファイルの読み込みはI/O操作なので、エラーハンドリングを行います。
+        # 前回から変わっていないファイルは、解析済みのキャッシュから読み込みます。
+        # ネットワークドライブの一時的な切断などは、少し待ってから読み直します。
+        columns = batch_runner.call_with_retry(read_header, input_file)
+    except Exception as e:
+        utils.handle_error(e)
+
+    # --- データ構造の確認 (バリデーション) ---
+    # 読み込む列をヘッダーの列名から決定します（詳しくは resolve_columns を参照）
+    required_columns = REQUIRED_COLUMNS
+    source_columns = resolve_columns(columns, required_columns)
+
+    # 担当者・日付の列があれば、多角的な集計のために一緒に読み込みます
+    optional_columns = optional_columns_in(columns, source_columns)
+
+    try:
+        # 必要な列だけを1行ずつ読み込んで DataFrame にします。
+        # pd.read_excel のようにファイル全体を一度に展開しないため、
+        # 大きなファイルでもメモリ使用量を抑えられます。
+        # 2回目以降は、元のファイルが変わっていなければキャッシュから読み込みます。
+        df = batch_runner.call_with_retry(
+            read_columns_cached, input_file, source_columns + optional_columns
+        )
+        df.columns = required_columns + optional_columns
+    except Exception as e:
+        utils.handle_error(e)
+
+    return df
+
+
+def record_history(df, history_path):
+    """
+    今回のタスク一覧を履歴データベースに記録し、推移のシートを作成します。
+
+    履歴の記録に失敗しても B.xlsx の出力は続けられるよう、
+    エラーの場合は警告を表示して空の辞書を返します。
+
+    Args:
+        df (pd.DataFrame): 'Task Name' と 'Status' 列を含むタスク一覧
+        history_path (str): 履歴データベースのパス
+
+    Returns:
+        dict[str, pd.DataFrame]: シート名と推移の集計結果の辞書
+    """
+    try:
+        with task_history.open_history(history_path) as conn:
+            changed = task_history.record_run(conn, df)
+            sheets = task_history.trend_sheets(conn)
+    except Exception as e:
+        print(f"警告: 履歴を記録できませんでした: {e}")
+        return {}
+
+    print(f"履歴: 変更のあった{changed}件を記録しました ({history_path})")
+    return sheets
+
+
+def write_report(output_file, summary_df, detail_df, breakdown_sheets):
+    """
+    集計結果を B.xlsx に書き出します。
+
+    write-only モードの書き込みクラスを使います（詳しくは excel_writer.py）。
+    行を順次ディスクへ書き出すため、詳細一覧が数百万行あっても
+    メモリを使い切ることはありません。Excel の行数上限を超える場合は
+    「詳細一覧_2」のようにシートが自動的に分割されます。
+    ヘッダー（1行目）には太字・白文字・青背景のスタイルが適用されます。
+    """
+    writer = StreamingExcelWriter(output_file)
+    # シート名を指定してデータフレームを書き込みます
+    writer.write_frame("サマリー", summary_df)
+    writer.write_frame("詳細一覧", detail_df)
+    for sheet_name, breakdown_df in breakdown_sheets.items():
+        writer.write_frame(sheet_name, breakdown_df)
+    writer.save()
+
+
+def main(
+    input_file="A.xlsx",
+    output_file="B.xlsx",
+    history_path=task_history.DEFAULT_HISTORY_PATH,
+):
+    """
+    メイン処理を行う関数です。
+    A.xlsx からデータを読み込み、進捗を集計して B.xlsx に出力します。
+
+    Args:
+        input_file (str): 入力ファイルのパス（省略時は A.xlsx）
+        output_file (str): 出力ファイルのパス（省略時は B.xlsx）
+        history_path (str | None): 履歴データベースのパス
+            （None の場合は履歴を記録せず、推移のシートも出力しません）
+    """
+    # 関数の開始をログ出力
+    utils.log_start("main")
+
+    # 初心者向けポイント: ファイル名は引数にしておくと、
+    # 常駐プロセス (worker_daemon.py) などから別のファイルを指定できます。
+
+    print(f"処理を開始します: {input_file} を読み込んでいます...")
+
+    # --- セキュリティ & 安全性チェック: ファイルの存在確認 ---
+    # ファイルが存在しないのに読み込もうとするとエラーになるため、事前にチェックします。
+    if not os.path.exists(input_file):
+        print(f"エラー: 入力ファイル '{input_file}' が見つかりません。")
+        sys.exit(1)
+
+    # --- データの読み込み ---
+    # df は DataFrame (データフレーム) の略で、表データを扱う変数名の慣習です。
+    df = load_tasks(input_file)
+
+    # --- 1. 進捗状況の集計 ---
+    # 全体のタスク数・ステータスごとの件数・進捗率を求めます（count_statuses を参照）
+    counts = count_statuses(df["Status"])
 
     # 計算結果を画面に表示（f-string を使って変数を埋め込んでいます）
     # .1f は「小数点以下1桁まで表示」という意味です。
     print(
-        f"集計結果: 全{total_tasks}件, 完了{completed_count}件, "
-        f"進捗率{progress_rate:.1f}%"
+        f"集計結果: 全{counts['total']}件, 完了{counts['completed']}件, "
+        f"進捗率{counts['progress_rate']:.1f}%"
     )
 
     # --- 2. 出力用データの作成 ---
     # サマリー（集計結果）の表を作成
-    summary_data = {
-        "項目": ["全タスク数", "完了", "対応中", "未着手", "進捗率"],
-        "値": [
-            total_tasks,
-            completed_count,
-            in_progress_count,
-            not_started_count,
-            f"{progress_rate:.1f}%",
-        ],
-    }
-    summary_df = pd.DataFrame(summary_data)
+    summary_df = make_summary(counts)
 
     # 詳細一覧の表（必要な列だけを抽出してコピー）
     detail_df = df[["Task Name", "Status"]].copy()
 
+    # 担当者別・週別・月別の集計表（列がない集計は作成されません）
+    # 行ごとのループを使わず、pandas / NumPy の一括演算で集計します。
+    with perf.span("aggregate"):
+        breakdown_sheets = aggregate_progress(df)
+
+    # 実行ごとの履歴を記録し、バーンダウンなどの推移を集計します。
+    # 過去の B.xlsx を読み直さず、データベースへの問い合わせだけで求めます。
+    if history_path:
+        with perf.span("history"):
+            breakdown_sheets.update(record_history(df, history_path))
+
     # --- 3. Excelファイルへの書き込み ---
     try:
-        # openpyxl エンジンを指定して書き込みます。
-        # with 構文を使うことで、処理終了後にファイルを自動的に閉じてくれるので安全です。
         # 外部ファイルへの書き込みはI/O操作なので、エラーハンドリングを行います。
-        with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
-            # シート名を指定してデータフレームを書き込みます
-            summary_df.to_excel(writer, sheet_name="サマリー", index=False)
-            detail_df.to_excel(writer, sheet_name="詳細一覧", index=False)
-
-            # --- デザインの調整 (装飾) ---
-            # 書き込んだExcelブック（workbook）とシート（worksheet）のオブジェクトを取得
-            summary_sheet = writer.sheets["サマリー"]
-
-            # ヘッダー（1行目）のデザイン定義
-            # 太字、文字色白
-            header_font = Font(bold=True, color="FFFFFF")
-            # 背景色青 (カラーコード 4F81BD)
-            header_fill = PatternFill(
-                start_color="4F81BD", end_color="4F81BD", fill_type="solid"
+        # B.xlsx を Excel で開いたままにしていると書き込めない（ロックされる）
+        # ため、一時的なエラーは少し待ってから書き込み直します。
+        with perf.span("write"):
+            batch_runner.call_with_retry(
+                write_report,
+                output_file,
+                summary_df,
+                detail_df,
+                breakdown_sheets,
             )
 
-            # 1行目のすべてのセルに対してスタイルを適用
-            for cell in summary_sheet[1]:
-                cell.font = header_font
-                cell.fill = header_fill
-
         print(f"成功: '{output_file}' が作成されました。")
 
     except Exception as e:
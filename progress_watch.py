@@ -0,0 +1,462 @@
+"""
+A.xlsx の変更を監視し、保存されるたびに B.xlsx を作り直すモジュールです。
+
+progress_tracker.py を手で実行し直す代わりに、入力ファイルの更新日時と
+サイズを一定間隔で確認し、変わった時点で集計し直します。
+Excel は保存時にファイルを何回かに分けて書き込むため、変更を見つけてから
+debounce 秒の間ファイルが変わらなくなるのを待ってから読み込みます。
+
+入力ファイルは複数指定でき、B.xlsx にはすべてのファイルの合計を出力します。
+読み直すのは更新されたファイルだけです（.xlsx は圧縮されたファイルのため、
+変わった行だけを読むことはできず、更新されたファイルは全体を読み直します）。
+
+前回の内容はファイルごとに Task Name をキーにした表として保持しておき、
+今回の内容と比べて追加・削除・変更された行だけを求めます（RowDiff）。
+ステータスごとの件数・進捗率と、担当者別・週別・月別の件数は、全行を
+数え直さずに差分の行の分だけ増減させて更新します（日付が変わった場合は
+期限超過の判定が変わるため数え直します）。
+行が1件も変わっていない保存（上書き保存だけなど）では B.xlsx を書き直しません。
+
+B.xlsx は一時ファイルに書き出してから置き換えるため（StreamingExcelWriter.save）、
+ダッシュボードなどが書きかけの B.xlsx を読むことはありません。
+
+使用例:
+    python main.py progress --watch
+    python main.py progress --watch --input teams/a.xlsx teams/b.xlsx
+"""
+
+import os
+import time
+from collections import Counter, namedtuple
+
+import pandas as pd
+
+import batch_runner
+import utils
+from excel_reader import read_columns, read_header
+from progress_aggregation import (
+    BREAKDOWN_COLUMNS,
+    OPTIONAL_COLUMNS,
+    add_breakdowns,
+    count_breakdowns,
+    format_breakdowns,
+    resolve_today,
+)
+from progress_tracker import (
+    REQUIRED_COLUMNS,
+    add_counts,
+    fallback_columns,
+    make_summary,
+    optional_columns_in,
+    record_history,
+    write_report,
+)
+
+# 入力ファイルの更新を確認する間隔（秒）
+WATCH_INTERVAL_SECONDS = 0.2
+
+# 更新を見つけてから、ファイルが変わらなくなるまで待つ秒数
+DEFAULT_DEBOUNCE_SECONDS = 0.3
+
+# 前回との差分（それぞれ Task Name の pd.Index）
+RowDiff = namedtuple("RowDiff", ["added", "removed", "changed"])
+
+
+def file_signature(path):
+    """
+    ファイルが更新されたかどうかを判定するための (更新日時, サイズ) を返します。
+
+    ファイルがない場合（保存の途中で一時的に消える場合を含みます）は None です。
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def wait_for_change(
+    paths,
+    signatures,
+    interval=WATCH_INTERVAL_SECONDS,
+    debounce=DEFAULT_DEBOUNCE_SECONDS,
+    clock=time.monotonic,
+    sleep=time.sleep,
+):
+    """
+    いずれかのファイルが更新され、その後 debounce 秒変わらなくなるまで待ちます。
+
+    Args:
+        paths (list[str]): 監視するファイル
+        signatures (dict): 前回の {パス: file_signature の値}
+        interval (float): 更新を確認する間隔（秒）
+        debounce (float): 更新後、ファイルが変わらなくなるまで待つ秒数
+        clock: 現在時刻（秒）を返す関数（テストで差し替えます）
+        sleep: 待つための関数（テストで差し替えます）
+
+    Returns:
+        dict: 今回の {パス: file_signature の値}
+    """
+    current = {path: file_signature(path) for path in paths}
+    while current == signatures:
+        sleep(interval)
+        current = {path: file_signature(path) for path in paths}
+
+    # 書き込みが続いている間は待ちます
+    stable_since = clock()
+    while clock() - stable_since < debounce:
+        sleep(min(interval, debounce))
+        latest = {path: file_signature(path) for path in paths}
+        if latest != current:
+            current = latest
+            stable_since = clock()
+    return current
+
+
+def read_tasks(input_file):
+    """
+    タスク一覧を読み込みます（列名の救済措置は progress_tracker と同じです）。
+
+    監視中はファイルが変わるたびに読み込むため、行の読み込みには解析結果の
+    キャッシュを使いません（毎回作り直しになり、保存の分だけ遅くなるためです）。
+
+    Raises:
+        ValueError: 必要な列がなく、列の数も足りない場合
+    """
+    columns = read_header(input_file)
+    source_columns = fallback_columns(columns, REQUIRED_COLUMNS)
+    optional_columns = optional_columns_in(columns, source_columns)
+    df = read_columns(input_file, source_columns + optional_columns)
+    df.columns = REQUIRED_COLUMNS + optional_columns
+    return df
+
+
+def _index_by_name(df):
+    """
+    Task Name を行の名前にした表を返します。
+
+    Task Name が空欄または重複している場合は、行を一意に特定できないため
+    None を返します（その場合は全件を数え直します）。
+    """
+    names = df["Task Name"]
+    if names.isna().any() or names.duplicated().any():
+        return None
+    return df.set_index("Task Name")
+
+
+def diff_rows(previous, current):
+    """
+    Task Name をキーにして、前回から追加・削除・変更された行を求めます。
+
+    Args:
+        previous (pd.DataFrame): 前回の表（Task Name を行の名前にした表）
+        current (pd.DataFrame): 今回の表（同上）
+
+    Returns:
+        RowDiff: 追加・削除・変更された行の Task Name
+    """
+    added = current.index.difference(previous.index, sort=False)
+    removed = previous.index.difference(current.index, sort=False)
+    common = current.index.intersection(previous.index, sort=False)
+
+    columns = current.columns.union(previous.columns, sort=False)
+    old = previous.reindex(index=common, columns=columns)
+    new = current.reindex(index=common, columns=columns)
+    # 空欄同士は等しいとみなします
+    differs = (old.ne(new) & ~(old.isna() & new.isna())).any(axis=1)
+    return RowDiff(added, removed, common[differs.to_numpy()])
+
+
+class IncrementalProgress:
+    """
+    1つの入力ファイルの件数と集計を、前回との差分だけで更新するクラスです。
+
+    使用例:
+        progress = IncrementalProgress()
+        diff = progress.update(df)   # 初回と数え直した場合は None
+        counts = progress.counts()   # progress_tracker.count_statuses と同じ形
+    """
+
+    def __init__(self):
+        # 前回の表（Task Name を行の名前にした表。数え直した場合は None）
+        self.tasks = None
+        # 最後に読み込んだタスク一覧（詳細一覧と履歴に使います）
+        self.frame = None
+        self.total = 0
+        # ステータス -> 件数（空欄は数えません）
+        self.status_counts = Counter()
+        # 担当者別・週別・月別の件数（count_breakdowns の戻り値の形）
+        self.breakdowns = {}
+        # ファイルにあった任意の列（Assignee など）
+        self.columns = []
+        # 期限超過を判定した基準日
+        self.today = None
+
+    def update(self, df, today=None):
+        """
+        今回のタスク一覧で件数と集計を更新します。
+
+        Args:
+            df (pd.DataFrame): 今回のタスク一覧
+            today (pd.Timestamp | None): 期限超過の判定に使う基準日
+                （省略時は今日）
+
+        Returns:
+            RowDiff | None: 前回との差分（全件を数え直した場合は None）
+        """
+        today = resolve_today(today)
+        current = _index_by_name(df)
+        self.frame = df
+        self.columns = [c for c in OPTIONAL_COLUMNS if c in df.columns]
+        if self.tasks is None or current is None or today != self.today:
+            self._recount(df, today)
+            self.tasks = current
+            return None
+
+        diff = diff_rows(self.tasks, current)
+        self._add(self.tasks.loc[diff.removed.append(diff.changed)], -1)
+        self._add(current.loc[diff.added.append(diff.changed)], 1)
+        self.total = len(current)
+        self.tasks = current
+        return diff
+
+    def invalidate(self):
+        """
+        前回の表を捨てて、次の update で全件を数え直すようにします。
+
+        B.xlsx の書き込みに失敗した場合に呼び出します（前回の表のままだと、
+        次の保存で行が変わっていなければ B.xlsx が古いまま残るためです）。
+        """
+        self.tasks = None
+
+    def _recount(self, df, today):
+        """
+        全件を数え直します。
+        """
+        self.total = len(df)
+        self.status_counts = Counter(df["Status"].value_counts().to_dict())
+        # 担当者などの列がないファイルも空欄として数えておき、
+        # ほかのファイルと合計できるようにします
+        self.breakdowns = count_breakdowns(df, today, BREAKDOWN_COLUMNS)
+        self.today = today
+
+    def _add(self, rows, sign):
+        """
+        rows の分だけ件数と集計を増やします（sign が -1 の場合は減らします）。
+        """
+        if rows.empty:
+            return
+        for status, count in rows["Status"].value_counts().items():
+            self.status_counts[status] += sign * int(count)
+        self.breakdowns = add_breakdowns(
+            self.breakdowns,
+            count_breakdowns(rows, self.today, BREAKDOWN_COLUMNS),
+            sign,
+        )
+
+    def counts(self):
+        """
+        progress_tracker.count_statuses と同じ形の件数と進捗率を返します。
+        """
+        completed = self.status_counts["完了"]
+        total = self.total
+        return {
+            "total": total,
+            "completed": completed,
+            "in_progress": self.status_counts["対応中"],
+            "not_started": self.status_counts["未着手"],
+            "progress_rate": (completed / total) * 100 if total > 0 else 0,
+        }
+
+
+def combine_frames(progresses):
+    """
+    各ファイルのタスク一覧を、詳細一覧と履歴に使う1つの表にまとめます。
+
+    ファイルが複数の場合は、どのファイルの行かがわかるよう
+    「ファイル」の列を先頭に付けます。
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: まとめた表と、詳細一覧の表
+    """
+    if len(progresses) == 1:
+        (progress,) = progresses.values()
+        return progress.frame, progress.frame[["Task Name", "Status"]]
+
+    combined = pd.concat(
+        [
+            progress.frame.assign(**{"ファイル": path})
+            for path, progress in progresses.items()
+        ],
+        ignore_index=True,
+    )
+    return combined, combined[["ファイル", "Task Name", "Status"]]
+
+
+def write_progress(progresses, output_file, history_path=None):
+    """
+    各ファイルの件数と集計を合計して、B.xlsx に書き出します。
+
+    担当者別などの集計は、差分で更新した件数の表を足し合わせるだけで作り、
+    タスク一覧の全行を集計し直すことはしません。
+
+    Returns:
+        dict: 合計した件数と進捗率（count_statuses と同じ形）
+    """
+    counts = add_counts(
+        [progress.counts() for progress in progresses.values()]
+    )
+    breakdowns = {}
+    columns = set()
+    for progress in progresses.values():
+        breakdowns = add_breakdowns(breakdowns, progress.breakdowns)
+        columns.update(progress.columns)
+    breakdown_sheets = format_breakdowns(breakdowns, columns)
+
+    df, detail_df = combine_frames(progresses)
+    if history_path:
+        breakdown_sheets.update(record_history(df, history_path))
+    batch_runner.call_with_retry(
+        write_report,
+        output_file,
+        make_summary(counts),
+        detail_df,
+        breakdown_sheets,
+    )
+    return counts
+
+
+def describe_changes(diffs):
+    """
+    読み直したファイルの差分を、画面に表示する文に変換します。
+    """
+    if any(diff is None for diff in diffs.values()):
+        return "全件を集計"
+    added, removed, changed = (
+        sum(len(names) for names in column) for column in zip(*diffs.values())
+    )
+    return f"追加{added}件, 削除{removed}件, 変更{changed}件"
+
+
+def refresh(progresses, input_files, output_file, history_path=None):
+    """
+    更新された入力ファイルを読み直し、変更があれば B.xlsx を書き直します。
+
+    読み直すのは input_files だけで、ほかのファイルは前回の件数と集計を
+    そのまま使います。B.xlsx の書き込みに失敗した場合（Excel で開かれて
+    いる・ディスクがいっぱいなど）は、次の保存で行が変わっていなくても
+    書き直します。
+
+    Args:
+        progresses (dict[str, IncrementalProgress]): 入力ファイルごとの件数と
+            集計（初めて読むファイルは追加します）。B.xlsx にはここにある
+            すべてのファイルの合計を出力します
+        input_files (list[str]): 読み直すファイル
+        output_file (str): 出力ファイルのパス
+        history_path (str | None): 履歴データベースのパス（None は記録しない）
+
+    Returns:
+        dict[str, RowDiff | None]: 読み直したファイルごとの前回との差分
+            （初回と数え直した場合は None）
+    """
+    diffs = {}
+    today = resolve_today()
+    try:
+        for path in input_files:
+            df = batch_runner.call_with_retry(read_tasks, path)
+            progress = progresses.setdefault(path, IncrementalProgress())
+            diffs[path] = progress.update(df, today)
+        # 日付が変わった場合は、読み直さないファイルも期限超過を数え直します
+        for progress in progresses.values():
+            if progress.today != today:
+                progress.update(progress.frame, today)
+        if all(
+            diff is not None and not any(len(names) for names in diff)
+            for diff in diffs.values()
+        ):
+            print("変更された行はありません。B.xlsx はそのままです。")
+            return diffs
+        counts = write_progress(progresses, output_file, history_path)
+    except Exception:
+        for progress in progresses.values():
+            progress.invalidate()
+        raise
+
+    print(
+        f"更新: {describe_changes(diffs)} / 全{counts['total']}件, "
+        f"完了{counts['completed']}件, 進捗率{counts['progress_rate']:.1f}% "
+        f"-> '{output_file}'"
+    )
+    return diffs
+
+
+def changed_files(paths, previous, current):
+    """
+    前回から更新された（読み直す）ファイルを返します。
+
+    見つからないファイル（保存の途中で一時的に消えた場合を含みます）は
+    警告を表示し、読み直しません。
+
+    Args:
+        paths (list[str]): 監視しているファイル
+        previous (dict): 前回の {パス: file_signature の値}
+        current (dict): 今回の {パス: file_signature の値}
+    """
+    changed = []
+    for path in paths:
+        if current[path] is None:
+            print(f"警告: '{path}' が見つかりません。")
+        elif current[path] != previous.get(path):
+            changed.append(path)
+    return changed
+
+
+def watch(
+    input_files="A.xlsx",
+    output_file="B.xlsx",
+    history_path=None,
+    debounce=DEFAULT_DEBOUNCE_SECONDS,
+    max_runs=None,
+):
+    """
+    入力ファイルを監視し、更新されるたびに B.xlsx を作り直します。
+
+    Ctrl+C で終了します。読み込みに失敗した場合（保存の途中で壊れた
+    ファイルを読んだ場合など）は警告を表示して監視を続けます。
+
+    Args:
+        input_files (str | list[str]): 監視する入力ファイルのパス
+        output_file (str): 出力ファイルのパス
+        history_path (str | None): 履歴データベースのパス（None は記録しない）
+        debounce (float): 更新後、ファイルが変わらなくなるまで待つ秒数
+        max_runs (int | None): 集計する最大回数（テスト用。None は無制限）
+    """
+    if isinstance(input_files, str):
+        input_files = [input_files]
+    utils.log_start("progress watch")
+    progresses = {}
+    signatures = {}
+    runs = 0
+    print(f"監視を開始します: {', '.join(input_files)}（Ctrl+C で終了）")
+    try:
+        while max_runs is None or runs < max_runs:
+            previous = signatures
+            signatures = wait_for_change(
+                input_files, signatures, debounce=debounce
+            )
+            runs += 1
+            changed = changed_files(input_files, previous, signatures)
+            if not changed:
+                continue
+            try:
+                refresh(progresses, changed, output_file, history_path)
+            except Exception as e:
+                utils.log_warning(
+                    f"集計に失敗しました: {', '.join(changed)}: {e}"
+                )
+                print(
+                    f"警告: 集計に失敗しました（次の保存で再試行します）: {e}"
+                )
+    except KeyboardInterrupt:
+        print("\n監視を終了します。")
+    utils.log_end("progress watch")
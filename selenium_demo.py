@@ -1,41 +1,48 @@
-import time
+import functools
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
+from browser_pool import BrowserPool, create_headless_chrome
 
 import utils
 
+# 動作確認で開くページ
+DEMO_URLS = ["https://www.python.org"]
 
-def main():
-    utils.log_start("Selenium Demo")
-    print("Seleniumの動作確認を開始します...")
 
-    try:
-        # Chromeドライバのセットアップ（初回はダウンロードが発生します）
-        service = ChromeService(ChromeDriverManager().install())
+def get_title(session, url):
+    """
+    ページを開き、見出しが表示されるのを待ってからタイトルを返します。
+    """
+    print(f"URLにアクセス中: {url}")
+    # 決め打ちの時間を待つ代わりに、見出しの表示を待ちます
+    session.open(url, ready_locator=("css selector", "h1"))
+    return session.driver.title
 
-        # ブラウザの起動オプション
-        options = webdriver.ChromeOptions()
-        # options.add_argument("--headless") # 画面を出したくない場合は有効化
-
-        print("ブラウザを起動しています...")
-        driver = webdriver.Chrome(service=service, options=options)
 
-        # Python.orgにアクセス
-        url = "https://www.python.org"
-        print(f"URLにアクセス中: {url}")
-        driver.get(url)
+def main(urls=None, allow_download=None):
+    """
+    ページを開いてタイトルを表示します。
 
-        # タイトルを取得して表示
-        title = driver.title
-        print(f"ページタイトル: {title}")
+    Args:
+        urls (list[str] | None): 開くページ（省略時は DEMO_URLS）
+        allow_download (bool | None): chromedriver が見つからない場合に
+            ダウンロードを許可するか（None は環境変数の設定に従います）
+    """
+    utils.log_start("Selenium Demo")
+    print("Seleniumの動作確認を開始します...")
 
-        # 少し待機（動作確認のため）
-        time.sleep(3)
+    try:
+        # ヘッドレスモードのブラウザを使い回します
+        # （chromedriver はキャッシュから解決し、通常は通信しません）
+        print("ブラウザを起動しています...")
+        factory = functools.partial(
+            create_headless_chrome, allow_download=allow_download
+        )
+        with BrowserPool(size=1, driver_factory=factory) as pool:
+            for result in pool.run_tasks(get_title, urls or DEMO_URLS):
+                if result.error is not None:
+                    raise result.error
+                print(f"ページタイトル: {result.value}")
 
-        # ブラウザを閉じる
-        driver.quit()
         print("ブラウザを正常に閉じました。")
         utils.log_end("Selenium Demo")
 
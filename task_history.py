@@ -0,0 +1,326 @@
+"""
+進捗集計の履歴を SQLite データベースに記録し、推移を集計するモジュールです。
+
+progress_tracker.py は実行のたびに、その時点のタスク一覧を B.xlsx に
+上書きします。ここでは実行ごとのステータス件数と、前回から変わった
+タスクの行だけをデータベースに記録しておき、バーンダウン（残りタスク数の
+推移）・ステータスの遷移・担当者ごとの完了数をデータベースへの問い合わせ
+だけで求めます。過去の Excel ファイルを読み直す必要はありません。
+
+テーブル:
+    runs           実行ごとの日時と全タスク数
+    status_counts  実行ごとのステータス別の件数
+    task_versions  タスクの状態が変わった（追加・削除を含む）実行ごとの行
+    task_current   各タスクの最新の状態（変更の判定に使います）
+    transitions    ステータスが変わったタスクの「変更前 → 変更後」
+
+使用例:
+    with task_history.open_history("data/task_history.db") as conn:
+        task_history.record_run(conn, df)
+        sheets = task_history.trend_sheets(conn)
+"""
+
+import os
+import sqlite3
+from contextlib import closing, contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+# 履歴データベースの既定の保存先
+DEFAULT_HISTORY_PATH = "data/task_history.db"
+
+# 「完了」を表すステータス
+COMPLETED_STATUS = "完了"
+
+# 新しく追加されたタスクの「変更前」に表示する名前
+NEW_TASK_LABEL = "(新規)"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    run_at TEXT NOT NULL,
+    total INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_run_at ON runs(run_at);
+CREATE TABLE IF NOT EXISTS status_counts (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (run_id, status)
+);
+CREATE TABLE IF NOT EXISTS task_versions (
+    task_name TEXT NOT NULL,
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    status TEXT,
+    assignee TEXT,
+    end_date TEXT,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (task_name, run_id)
+);
+CREATE INDEX IF NOT EXISTS task_versions_run ON task_versions(run_id);
+CREATE TABLE IF NOT EXISTS task_current (
+    task_name TEXT PRIMARY KEY,
+    status TEXT,
+    assignee TEXT,
+    end_date TEXT
+);
+CREATE TABLE IF NOT EXISTS transitions (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    task_name TEXT NOT NULL,
+    from_status TEXT,
+    to_status TEXT,
+    assignee TEXT
+);
+CREATE INDEX IF NOT EXISTS transitions_run ON transitions(run_id);
+CREATE INDEX IF NOT EXISTS transitions_to_status
+    ON transitions(to_status, assignee);
+"""
+
+
+@contextmanager
+def open_history(path=DEFAULT_HISTORY_PATH):
+    """
+    履歴データベースを開きます（なければ作成します）。
+
+    with 文を抜けると自動的に閉じます。
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with closing(sqlite3.connect(path)) as conn:
+        conn.executescript(SCHEMA)
+        yield conn
+
+
+def _text_or_none(series):
+    """
+    列の値を文字列に変換します（空欄は None）。
+    """
+    return (
+        series.astype(object)
+        .where(series.notna(), None)
+        .map(lambda value: None if value is None else str(value))
+    )
+
+
+def snapshot_tasks(df):
+    """
+    タスク一覧を、履歴に記録する形（Task Name ごとに1行）に整えます。
+
+    同じ Task Name の行が複数ある場合は、最後の行を使います。
+    日付は "2025-01-31" の形式に揃えます。
+
+    Returns:
+        pd.DataFrame: task_name・status・assignee・end_date 列を持つ表
+    """
+    snapshot = pd.DataFrame({"task_name": _text_or_none(df["Task Name"])})
+    snapshot["status"] = _text_or_none(df["Status"])
+    snapshot["assignee"] = (
+        _text_or_none(df["Assignee"]) if "Assignee" in df.columns else None
+    )
+    if "End Date" in df.columns:
+        dates = pd.to_datetime(df["End Date"], errors="coerce")
+        snapshot["end_date"] = _text_or_none(dates.dt.strftime("%Y-%m-%d"))
+    else:
+        snapshot["end_date"] = None
+    snapshot = snapshot[snapshot["task_name"].notna()]
+    return snapshot.drop_duplicates("task_name", keep="last")
+
+
+def _changed_rows(snapshot, current):
+    """
+    前回の状態と比べて、追加・変更・削除されたタスクを求めます。
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: (追加・変更された行,
+            削除されたタスクの前回の行)。どちらも previous_status 列を持ちます
+    """
+    merged = snapshot.merge(
+        current,
+        on="task_name",
+        how="outer",
+        suffixes=("", "_previous"),
+        indicator=True,
+    )
+    # 空欄同士を等しいとみなすため、比較の前に同じ目印で埋めます
+    differs = pd.Series(False, index=merged.index)
+    for column in ["status", "assignee", "end_date"]:
+        differs |= merged[column].fillna("\0") != merged[
+            f"{column}_previous"
+        ].fillna("\0")
+
+    changed = merged[(merged["_merge"] != "right_only") & differs]
+    deleted = merged[merged["_merge"] == "right_only"]
+    return (
+        changed.rename(columns={"status_previous": "previous_status"}),
+        deleted.rename(columns={"status_previous": "previous_status"}),
+    )
+
+
+def _records(df, columns):
+    """
+    executemany に渡すため、表の行をタプルのリストにします（空欄は None）。
+    """
+    values = df[columns].astype(object).where(df[columns].notna(), None)
+    return list(values.itertuples(index=False, name=None))
+
+
+def _insert_run(conn, df, run_at):
+    """
+    実行の記録とステータス別の件数を追加し、run_id を返します。
+    """
+    cursor = conn.execute(
+        "INSERT INTO runs (run_at, total) VALUES (?, ?)", (run_at, len(df))
+    )
+    run_id = cursor.lastrowid
+    counts = df["Status"].fillna("(空欄)").astype(str).value_counts()
+    conn.executemany(
+        "INSERT INTO status_counts (run_id, status, count) VALUES (?, ?, ?)",
+        [(run_id, status, int(count)) for status, count in counts.items()],
+    )
+    return run_id
+
+
+def record_run(conn, df, run_at=None):
+    """
+    今回のタスク一覧を履歴に記録します。
+
+    ステータス別の件数は毎回記録しますが、タスクの行は前回から
+    変わったもの（追加・変更・削除）だけを記録します。
+
+    Args:
+        conn (sqlite3.Connection): 履歴データベース
+        df (pd.DataFrame): 'Task Name' と 'Status' 列を含むタスク一覧
+        run_at (datetime | str | None): 実行日時（省略時は現在時刻）
+
+    Returns:
+        int: 今回記録したタスクの行数（変更がなければ 0）
+    """
+    if run_at is None:
+        run_at = datetime.now()
+    run_at = pd.Timestamp(run_at).isoformat(timespec="seconds")
+
+    snapshot = snapshot_tasks(df)
+    current = pd.read_sql_query(
+        "SELECT task_name, status, assignee, end_date FROM task_current",
+        conn,
+    )
+    changed, deleted = _changed_rows(snapshot, current)
+    columns = ["task_name", "status", "assignee", "end_date"]
+
+    with conn:
+        run_id = _insert_run(conn, df, run_at)
+        conn.executemany(
+            "INSERT INTO task_versions"
+            " (task_name, status, assignee, end_date, run_id)"
+            " VALUES (?, ?, ?, ?, ?)",
+            [row + (run_id,) for row in _records(changed, columns)],
+        )
+        conn.executemany(
+            "INSERT INTO task_versions (task_name, run_id, deleted)"
+            " VALUES (?, ?, 1)",
+            [(name, run_id) for name in deleted["task_name"]],
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO task_current"
+            " (task_name, status, assignee, end_date) VALUES (?, ?, ?, ?)",
+            _records(changed, columns),
+        )
+        conn.executemany(
+            "DELETE FROM task_current WHERE task_name = ?",
+            [(name,) for name in deleted["task_name"]],
+        )
+
+        moved = changed[
+            changed["status"].fillna("\0")
+            != changed["previous_status"].fillna("\0")
+        ]
+        conn.executemany(
+            "INSERT INTO transitions"
+            " (task_name, from_status, to_status, assignee, run_id)"
+            " VALUES (?, ?, ?, ?, ?)",
+            [
+                row + (run_id,)
+                for row in _records(
+                    moved,
+                    ["task_name", "previous_status", "status", "assignee"],
+                )
+            ],
+        )
+    return len(changed) + len(deleted)
+
+
+def burn_down(conn):
+    """
+    実行ごとの全タスク数・完了数・残りタスク数を返します。
+    """
+    return pd.read_sql_query(
+        """
+        SELECT r.run_at AS 実行日時,
+               r.total AS 全タスク数,
+               COALESCE(c.count, 0) AS 完了,
+               r.total - COALESCE(c.count, 0) AS 残り
+        FROM runs r
+        LEFT JOIN status_counts c
+            ON c.run_id = r.run_id AND c.status = ?
+        ORDER BY r.run_at
+        """,
+        conn,
+        params=(COMPLETED_STATUS,),
+    )
+
+
+def status_transitions(conn):
+    """
+    ステータスの「変更前 → 変更後」ごとの件数を返します。
+
+    新しく追加されたタスクは、変更前を「(新規)」として数えます。
+    """
+    return pd.read_sql_query(
+        """
+        SELECT COALESCE(from_status, ?) AS 変更前,
+               COALESCE(to_status, '(空欄)') AS 変更後,
+               COUNT(*) AS 件数
+        FROM transitions
+        GROUP BY 変更前, 変更後
+        ORDER BY 件数 DESC, 変更前, 変更後
+        """,
+        conn,
+        params=(NEW_TASK_LABEL,),
+    )
+
+
+def assignee_throughput(conn):
+    """
+    担当者ごと・週ごとに「完了」になったタスクの件数を返します。
+
+    週は月曜日始まりとし、その週の月曜日の日付で表します。
+    追加された時点で既に完了していたタスクは数えません。
+    """
+    return pd.read_sql_query(
+        """
+        SELECT COALESCE(t.assignee, '(未設定)') AS 担当者,
+               date(r.run_at, '-6 days', 'weekday 1') AS 週,
+               COUNT(*) AS 完了件数
+        FROM transitions t
+        JOIN runs r ON r.run_id = t.run_id
+        WHERE t.to_status = ? AND t.from_status IS NOT NULL
+        GROUP BY 担当者, 週
+        ORDER BY 週, 担当者
+        """,
+        conn,
+        params=(COMPLETED_STATUS,),
+    )
+
+
+def trend_sheets(conn):
+    """
+    B.xlsx に追加する推移のシートを作成します。
+
+    Returns:
+        dict[str, pd.DataFrame]: シート名と集計結果の辞書
+    """
+    return {
+        "推移(バーンダウン)": burn_down(conn),
+        "ステータス遷移": status_transitions(conn),
+        "担当者別完了数": assignee_throughput(conn),
+    }
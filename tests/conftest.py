@@ -0,0 +1,28 @@
+import functools
+import http.server
+import threading
+from pathlib import Path
+
+import pytest
+
+# テスト用のページ（tests/fixtures/pages）
+PAGES_DIR = Path(__file__).parent / "fixtures" / "pages"
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    """アクセスログを表示しないハンドラーです"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="session")
+def page_server():
+    """テスト用のページを配信するローカル HTTP サーバーを起動します"""
+    handler = functools.partial(QuietHandler, directory=str(PAGES_DIR))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
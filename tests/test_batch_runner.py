@@ -0,0 +1,102 @@
+import errno
+
+import pandas as pd
+import pytest
+
+import batch_runner
+
+
+class FakeClock:
+    """sleep を呼ぶと時刻が進む、テスト用の時計です"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_errors_are_classified():
+    """ロックやタイムアウトは一時的、ファイルなし・不正な値は恒久的とされること"""
+    assert batch_runner.is_transient(PermissionError("locked"))
+    assert batch_runner.is_transient(TimeoutError())
+    assert batch_runner.is_transient(OSError(errno.EBUSY, "busy"))
+    assert not batch_runner.is_transient(FileNotFoundError("missing"))
+    assert not batch_runner.is_transient(OSError(errno.ENOSPC, "full"))
+    assert not batch_runner.is_transient(ValueError("bad"))
+    assert not batch_runner.is_transient(None)
+
+
+def test_call_with_retry_retries_transient_errors():
+    """一時的なエラーは待ち時間を延ばしながら再試行されること"""
+    calls = []
+    waits = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise PermissionError("locked")
+        return "ok"
+
+    result = batch_runner.call_with_retry(
+        flaky, attempts=3, base_delay=1, sleep=waits.append
+    )
+    assert result == "ok"
+    assert waits == [1, 2]
+
+
+def test_call_with_retry_raises_permanent_errors_immediately():
+    """恒久的なエラーと、最大回数まで失敗したエラーはそのまま送出されること"""
+    waits = []
+
+    def missing():
+        raise FileNotFoundError("missing")
+
+    def locked():
+        raise PermissionError("locked")
+
+    with pytest.raises(FileNotFoundError):
+        batch_runner.call_with_retry(missing, sleep=waits.append)
+    assert waits == []
+
+    with pytest.raises(PermissionError):
+        batch_runner.call_with_retry(locked, attempts=2, sleep=waits.append)
+    assert len(waits) == 1
+
+
+def test_retry_queue_returns_due_items_in_order():
+    """待ち時間が過ぎたものだけを取り出し、最後に残りをすべて取り出すこと"""
+    clock = FakeClock()
+    retry_queue = batch_runner.RetryQueue(
+        attempts=3, base_delay=1, clock=clock, sleep=clock.sleep
+    )
+    retry_queue.add("a", 1)  # 1 秒後
+    retry_queue.add("b", 2)  # 2 秒後
+    assert retry_queue.pop_due() == []
+
+    clock.now = 1.5
+    assert retry_queue.pop_due() == [("a", 1)]
+    assert [item for item, _ in retry_queue.drain()] == ["b"]
+    assert clock.now == 2
+    assert len(retry_queue) == 0
+
+
+def test_write_failures(tmp_path):
+    """失敗した行が Excel に出力され、失敗がなければ前回のファイルが消えること"""
+    path = str(tmp_path / "failed_rows.xlsx")
+    failures = [
+        batch_runner.FailedItem(
+            3, "Contract_a.docx", "保存", True, 3, "locked"
+        )
+    ]
+    assert batch_runner.write_failures(failures, path) == path
+
+    df = pd.read_excel(path)
+    assert list(df.columns) == batch_runner.FAILURE_COLUMNS
+    assert df.iloc[0]["分類"] == "一時的"
+
+    assert batch_runner.write_failures([], path) is None
+    assert not (tmp_path / "failed_rows.xlsx").exists()
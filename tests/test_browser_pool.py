@@ -0,0 +1,223 @@
+import re
+import shutil
+import threading
+import time
+import urllib.request
+
+import pytest
+from selenium.common.exceptions import (
+    NoSuchElementException,
+    WebDriverException,
+)
+
+import browser_pool
+
+
+class FakeElement:
+    def is_displayed(self):
+        return True
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.current_window = handle
+
+
+class FakeDriver:
+    """
+    ページを HTTP で取得するだけの WebDriver の代わりです（Chrome 不要）
+    """
+
+    def __init__(self):
+        self.html = ""
+        self.cookies = []
+        self.window_handles = ["main"]
+        self.current_window = "main"
+        self.switch_to = FakeSwitchTo(self)
+        self.quit_called = False
+        self.crashed = False
+
+    def get(self, url):
+        if self.crashed:
+            raise WebDriverException("chrome not reachable")
+        if url == "about:blank":
+            self.html = ""
+            return
+        with urllib.request.urlopen(url) as response:
+            self.html = response.read().decode("utf-8")
+        if "document.cookie" in self.html:
+            self.cookies.append({"name": "visited", "value": "1"})
+
+    @property
+    def title(self):
+        match = re.search(r"<title>(.*?)</title>", self.html)
+        return match.group(1) if match else ""
+
+    def find_element(self, by, value):
+        if f"<{value}>" not in self.html:
+            raise NoSuchElementException(value)
+        return FakeElement()
+
+    def execute_script(self, script):
+        if "readyState" in script:
+            return "complete"
+        return None
+
+    def delete_all_cookies(self):
+        self.cookies.clear()
+
+    def close(self):
+        self.window_handles.remove(self.current_window)
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def drivers():
+    """作成した FakeDriver を記録する driver_factory を返します"""
+    created = []
+
+    def factory():
+        driver = FakeDriver()
+        created.append(driver)
+        return driver
+
+    factory.created = created
+    return factory
+
+
+def get_title(session, url):
+    session.open(url, ready_locator=("css selector", "h1"))
+    return session.driver.title
+
+
+def test_sessions_are_reused_and_reset(page_server, drivers):
+    """返却されたブラウザは状態を消して再利用されること"""
+    with browser_pool.BrowserPool(size=1, driver_factory=drivers) as pool:
+        with pool.lease() as session:
+            session.open(f"{page_server}/delayed.html")
+            session.driver.window_handles.append("popup")
+            assert session.driver.cookies
+        with pool.lease() as again:
+            assert again is session
+            assert again.driver.cookies == []
+            assert again.driver.window_handles == ["main"]
+            assert again.driver.html == ""
+
+    assert pool.started_count == 1
+    assert drivers.created[0].quit_called
+
+
+def test_sessions_are_recycled_after_max_uses(page_server, drivers):
+    """決まった回数使ったブラウザは終了し、新しいブラウザが起動すること"""
+    urls = [f"{page_server}/index.html"] * 5
+    pool = browser_pool.BrowserPool(size=1, max_uses=2, driver_factory=drivers)
+    with pool:
+        results = list(pool.run_tasks(get_title, urls))
+
+    assert [r.value for r in results] == ["テスト用トップページ"] * 5
+    assert pool.started_count == 3
+    assert all(driver.quit_called for driver in drivers.created)
+
+
+def test_crashed_session_is_replaced(page_server, drivers):
+    """応答しなくなったブラウザは作り直され、他の処理は続くこと"""
+
+    def crash_on_first(session, url):
+        if not drivers.created[1:]:
+            session.driver.crashed = True
+            del session.driver.window_handles
+        return get_title(session, url)
+
+    pool = browser_pool.BrowserPool(size=1, driver_factory=drivers)
+    with pool:
+        results = list(
+            pool.run_tasks(crash_on_first, [f"{page_server}/index.html"] * 2)
+        )
+
+    assert isinstance(results[0].error, WebDriverException)
+    assert results[1].value == "テスト用トップページ"
+    assert pool.started_count == 2
+    assert drivers.created[0].quit_called
+
+
+def test_tasks_run_concurrently(drivers):
+    """プールの大きさの数だけ処理が同時に実行されること"""
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow_task(session, item):
+        with lock:
+            running.append(item)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(item)
+        return item * 2
+
+    with browser_pool.BrowserPool(size=3, driver_factory=drivers) as pool:
+        results = list(pool.run_tasks(slow_task, range(6)))
+
+    assert [r.value for r in results] == [0, 2, 4, 6, 8, 10]
+    assert max(peak) == 3
+    assert pool.started_count == 3
+
+
+def test_lease_times_out_when_pool_is_busy(drivers):
+    """空きがないまま待ち時間を過ぎると TimeoutError になること"""
+    with browser_pool.BrowserPool(size=1, driver_factory=drivers) as pool:
+        with pool.lease():
+            with pytest.raises(TimeoutError):
+                with pool.lease(timeout=0.05):
+                    pass
+
+
+def test_waiting_lease_starts_new_session_after_recycle(drivers):
+    """待っている間にブラウザが終了しても、新しく起動して貸し出されること"""
+    pool = browser_pool.BrowserPool(size=1, max_uses=1, driver_factory=drivers)
+    leased = []
+    first_taken = threading.Event()
+
+    def use():
+        with pool.lease() as session:
+            leased.append(session)
+            first_taken.set()
+            time.sleep(0.05)
+
+    with pool:
+        threads = [threading.Thread(target=use, daemon=True) for _ in range(2)]
+        threads[0].start()
+        first_taken.wait(1)
+        threads[1].start()
+        for thread in threads:
+            thread.join(2)
+        assert not any(thread.is_alive() for thread in threads)
+
+    assert len(leased) == 2 and leased[0] is not leased[1]
+    assert pool.started_count == 2
+
+
+def find_chrome():
+    for name in ("google-chrome", "chromium", "chromium-browser", "chrome"):
+        if shutil.which(name):
+            return name
+    return None
+
+
+@pytest.mark.skipif(find_chrome() is None, reason="Chrome がありません")
+def test_real_headless_chrome(page_server):
+    """実際のヘッドレス Chrome で、遅れて描画される要素を待てること"""
+    urls = [f"{page_server}/delayed.html", f"{page_server}/index.html"]
+    with browser_pool.BrowserPool(size=2, max_uses=1) as pool:
+        results = list(pool.run_tasks(get_title, urls))
+
+    assert [r.error for r in results] == [None, None]
+    assert [r.value for r in results] == [
+        "遅れて表示されるページ",
+        "テスト用トップページ",
+    ]
@@ -0,0 +1,102 @@
+from contract_manifest import ContractManifest
+
+
+def key_func(row):
+    """行データから出力ファイル名を作成します"""
+    return f"{row['name']}.docx"
+
+
+def run_batch(output_dir, template_path, rows, close=True, full=False):
+    """生成処理の代わりに空ファイルを作成し、処理した行番号を返します"""
+    manifest = ContractManifest(str(output_dir), str(template_path))
+    if full:
+        manifest.reset()
+    processed = []
+    for index, row in manifest.filter_rows(
+        rows, key_func, lambda key: (output_dir / key).exists()
+    ):
+        (output_dir / key_func(row)).write_bytes(b"")
+        processed.append(index)
+        manifest.record_result(True)
+    if close:
+        manifest.close()
+    return processed
+
+
+def make_rows(values):
+    """テスト用の (行番号, 行データ) を作成します"""
+    return [
+        (i, {"name": f"物件{i}", "value": v}) for i, v in enumerate(values)
+    ]
+
+
+def test_unchanged_rows_are_skipped(tmp_path):
+    """変更のない行は再生成されず、変更された行だけが生成されること"""
+    template_path = tmp_path / "template.docx"
+    template_path.write_bytes(b"v1")
+
+    assert run_batch(tmp_path, template_path, make_rows([1, 2, 3])) == [
+        0,
+        1,
+        2,
+    ]
+    assert run_batch(tmp_path, template_path, make_rows([1, 9, 3])) == [1]
+
+
+def test_template_change_invalidates_all_rows(tmp_path):
+    """テンプレートが変わった場合は全件が生成し直されること"""
+    template_path = tmp_path / "template.docx"
+    template_path.write_bytes(b"v1")
+    run_batch(tmp_path, template_path, make_rows([1, 2]))
+
+    template_path.write_bytes(b"v2")
+    assert run_batch(tmp_path, template_path, make_rows([1, 2])) == [0, 1]
+
+
+def test_interrupted_batch_resumes(tmp_path):
+    """close されずに中断された場合も、記録済みの行は再生成されないこと"""
+    template_path = tmp_path / "template.docx"
+    template_path.write_bytes(b"v1")
+    run_batch(tmp_path, template_path, make_rows([1, 2]), close=False)
+
+    assert run_batch(tmp_path, template_path, make_rows([1, 2, 3])) == [2]
+
+
+def test_row_template_change_invalidates_only_its_rows(tmp_path):
+    """行ごとのテンプレートが変わった場合は、そのテンプレートの行だけが生成し直されること"""
+    default_path = tmp_path / "template.docx"
+    default_path.write_bytes(b"v1")
+    parking_path = tmp_path / "parking.docx"
+    parking_path.write_bytes(b"p1")
+    rows = make_rows([1, 2, 3])
+    rows[1][1]["template"] = str(parking_path)
+
+    def run(rows):
+        manifest = ContractManifest(str(tmp_path), str(default_path))
+        processed = []
+        for index, row in manifest.filter_rows(
+            rows,
+            key_func,
+            lambda key: (tmp_path / key).exists(),
+            template_func=lambda row: row.get("template"),
+        ):
+            (tmp_path / key_func(row)).write_bytes(b"")
+            processed.append(index)
+            manifest.record_result(True)
+        manifest.close()
+        return processed
+
+    assert run(rows) == [0, 1, 2]
+    parking_path.write_bytes(b"p2")
+    assert run(rows) == [1]
+
+
+def test_reset_regenerates_all_rows(tmp_path):
+    """reset した場合は変更のない行も生成し直され、記録も作り直されること"""
+    template_path = tmp_path / "template.docx"
+    template_path.write_bytes(b"v1")
+    rows = make_rows([1, 2])
+    run_batch(tmp_path, template_path, rows)
+
+    assert run_batch(tmp_path, template_path, rows, full=True) == [0, 1]
+    assert run_batch(tmp_path, template_path, rows) == []
@@ -0,0 +1,149 @@
+import csv
+
+import pandas as pd
+import pytest
+
+import contract_output
+from contract_output import (
+    DirectoryOutput,
+    ZipArchiveOutput,
+    read_index,
+    sanitize_filename,
+    sanitize_filenames,
+    shard_path,
+)
+
+
+def test_sanitize_filenames():
+    """使えない文字・予約名・末尾の空白とピリオド・長すぎる名前が直されること"""
+    names = pd.Series(
+        ['A/B:C*?"<>|', "CON", "nul.txt", "物件. ", "", "x" * 30]
+    )
+    assert list(sanitize_filenames(names, max_length=20)) == [
+        "A_B_C______",
+        "_CON",
+        "_nul.txt",
+        "物件",
+        "_",
+        "x" * 20,
+    ]
+    # 結合文字の濁点は1文字にそろえます
+    assert sanitize_filename("ハ\u3099イツ") == "バイツ"
+
+
+def test_shard_path_layouts():
+    """レイアウトごとに決まったサブディレクトリが返ること"""
+    assert shard_path("Contract_A.docx", "flat") == "Contract_A.docx"
+    hashed = shard_path("Contract_A.docx", "hash")
+    assert hashed == shard_path("Contract_A.docx", "hash")
+    assert hashed.count("/") == 2 and hashed.endswith("/Contract_A.docx")
+    date = pd.Timestamp("2025-01-31").timetuple()
+    assert shard_path("A.docx", "date", date) == "2025/01/31/A.docx"
+
+
+def test_directory_output_records_sharded_paths(tmp_path):
+    """サブディレクトリに保存し、索引から次回も同じ場所を参照できること"""
+    output = DirectoryOutput(str(tmp_path), layout="hash")
+    saved_path = output.save(0, "Contract_A.docx", b"data")
+    output.close()
+
+    with open(tmp_path / "contracts_index.csv", encoding="utf-8") as f:
+        entry = next(csv.DictReader(f))
+    assert entry["archive"] == ""
+    assert (tmp_path / entry["entry"]).read_bytes() == b"data"
+    assert saved_path == str(tmp_path / entry["entry"])
+
+    # レイアウトを変えても、保存済みの契約書は前回の場所で見つかります
+    reopened = DirectoryOutput(str(tmp_path), layout="date")
+    assert reopened.exists("Contract_A.docx")
+    assert reopened.path_of("Contract_A.docx") == entry["entry"]
+    assert not reopened.exists("Contract_B.docx")
+
+
+def test_index_is_appended_before_close(tmp_path):
+    """close の前に中断しても、"date" レイアウトの保存先は索引に残ること"""
+    output = DirectoryOutput(str(tmp_path), layout="date")
+    output.save(0, "Contract_A.docx", b"data")
+    # close せずに中断した場合を想定し、書きかけの行も追記しておきます
+    index_path = tmp_path / "contracts_index.csv"
+    with open(index_path, "a", encoding="utf-8") as f:
+        f.write("Contract_B.docx,1")
+
+    entries = read_index(str(index_path))
+    assert list(entries) == ["Contract_A.docx"]
+    reopened = DirectoryOutput(str(tmp_path), layout="date")
+    assert reopened.exists("Contract_A.docx")
+
+    # 次の実行では書きかけの行を取り除いてから追記します
+    reopened.save(1, "Contract_B.docx", b"data")
+    assert list(read_index(str(index_path))) == [
+        "Contract_A.docx",
+        "Contract_B.docx",
+    ]
+
+
+def test_index_rows_are_buffered_for_fixed_layouts(tmp_path, monkeypatch):
+    """保存先が変わらないレイアウトでは、索引を件数ごとにまとめて書き出すこと"""
+    monkeypatch.setattr(contract_output, "INDEX_FLUSH_ROWS", 2)
+    index_path = str(tmp_path / "contracts_index.csv")
+    output = DirectoryOutput(str(tmp_path), layout="flat")
+
+    output.save(0, "Contract_A.docx", b"data")
+    assert read_index(index_path) == {}
+    output.save(1, "Contract_B.docx", b"data")
+    assert list(read_index(index_path)) == [
+        "Contract_A.docx",
+        "Contract_B.docx",
+    ]
+    output.save(2, "Contract_C.docx", b"data")
+    output.close()
+    assert len(read_index(index_path)) == 3
+
+
+def test_zip_index_is_appended_when_archive_rolls(tmp_path):
+    """アーカイブを切り替えたとき、閉じたアーカイブの分が索引に残ること"""
+    output = ZipArchiveOutput(str(tmp_path), max_bytes=1)
+    output.save(0, "Contract_A.docx", b"data")
+    index_path = str(tmp_path / "contracts_index.csv")
+    assert read_index(index_path) == {}
+
+    output.save(1, "Contract_B.docx", b"data")
+    entries = read_index(index_path)
+    assert list(entries) == ["Contract_A.docx"]
+    assert ZipArchiveOutput(str(tmp_path), 1).exists("Contract_A.docx")
+    output.close()
+    assert list(read_index(index_path)) == [
+        "Contract_A.docx",
+        "Contract_B.docx",
+    ]
+
+
+def test_date_layout_rerun_after_crash_reuses_location(tmp_path):
+    """中断後に別の日に再実行しても、前回と同じ日付のディレクトリを使うこと"""
+    output = DirectoryOutput(str(tmp_path), layout="date")
+    output._date = pd.Timestamp("2025-01-31").timetuple()
+    # ファイルの書き込み中に中断し、翌日に再実行します
+    with pytest.raises(TypeError):
+        output.save(0, "Contract_A.docx", None)
+
+    rerun = DirectoryOutput(str(tmp_path), layout="date")
+    rerun._date = pd.Timestamp("2025-02-01").timetuple()
+    assert rerun.path_of("Contract_A.docx") == "2025/01/31/Contract_A.docx"
+    rerun.save(0, "Contract_A.docx", b"new")
+    rerun.close()
+
+    saved = [p for p in tmp_path.rglob("*.docx")]
+    assert saved == [tmp_path / "2025/01/31/Contract_A.docx"]
+    assert saved[0].read_bytes() == b"new"
+
+
+def test_zip_output_creates_missing_output_dir(tmp_path):
+    """出力ディレクトリがない場合も、ZIP 出力が作成して保存できること"""
+    output_dir = tmp_path / "out"
+    output = ZipArchiveOutput(str(output_dir), max_bytes=1024)
+    output.save(0, "Contract_A.docx", b"data")
+    output.close()
+
+    entries = read_index(str(output_dir / "contracts_index.csv"))
+    assert list(entries) == ["Contract_A.docx"]
+    assert (output_dir / entries["Contract_A.docx"]["archive"]).exists()
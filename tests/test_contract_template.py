@@ -0,0 +1,145 @@
+from docx import Document
+
+from contract_template import CompiledTemplate, TemplateCache
+
+
+def make_template(path):
+    """テスト用のテンプレートを作成します"""
+    doc = Document()
+    p = doc.add_paragraph()
+    p.add_run("物件名: ").bold = True
+    p.add_run("{{property_name}}")
+    doc.add_paragraph("賃料: 金 {{amount}} 円")
+    doc.save(path)
+
+
+def test_compiled_template_finds_placeholders(tmp_path):
+    """テンプレート内のプレースホルダーが検出されること"""
+    template_path = tmp_path / "template.docx"
+    make_template(template_path)
+
+    template = CompiledTemplate(str(template_path))
+    assert template.placeholders == {"property_name", "amount"}
+
+
+def test_compiled_template_renders_values(tmp_path):
+    """置換後の文書が python-docx で読み込めて、書式が保たれること"""
+    template_path = tmp_path / "template.docx"
+    output_path = tmp_path / "output.docx"
+    make_template(template_path)
+
+    template = CompiledTemplate(str(template_path))
+    template.save(
+        {"property_name": "A&B <ハイツ>", "amount": "100,000"},
+        str(output_path),
+    )
+
+    doc = Document(str(output_path))
+    assert doc.paragraphs[0].text == "物件名: A&B <ハイツ>"
+    assert doc.paragraphs[0].runs[0].bold
+    assert doc.paragraphs[1].text == "賃料: 金 100,000 円"
+
+
+def test_compiled_template_merges_split_runs(tmp_path):
+    """run に分割されたプレースホルダーも、最初の run の書式で置換されること"""
+    template_path = tmp_path / "template.docx"
+    output_path = tmp_path / "output.docx"
+    doc = Document()
+    p = doc.add_paragraph("物件名: ")
+    p.add_run("{{prop").bold = True
+    p.add_run("erty_")
+    p.add_run("name}} 様").italic = True
+    doc.save(template_path)
+
+    template = CompiledTemplate(str(template_path))
+    assert template.placeholders == {"property_name"}
+    template.save({"property_name": "サニーハイツ"}, str(output_path))
+
+    runs = Document(str(output_path)).paragraphs[0].runs
+    assert "".join(run.text for run in runs) == "物件名: サニーハイツ 様"
+    assert runs[1].text == "サニーハイツ"
+    assert runs[1].bold
+    assert runs[3].text == " 様"
+    assert runs[3].italic
+
+
+def test_compiled_template_fills_tables_headers_and_footers(tmp_path):
+    """表のセル・ヘッダー・フッターのプレースホルダーも置換されること"""
+    template_path = tmp_path / "template.docx"
+    output_path = tmp_path / "output.docx"
+    doc = Document()
+    table = doc.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = "住所"
+    table.cell(0, 1).paragraphs[0].add_run("{{add")
+    table.cell(0, 1).paragraphs[0].add_run("ress}}")
+    section = doc.sections[0]
+    section.header.paragraphs[0].text = "契約番号 {{contract_id}}"
+    section.footer.paragraphs[0].text = "{{property_name}} 御中"
+    doc.save(template_path)
+
+    template = CompiledTemplate(str(template_path))
+    assert template.placeholders == {"address", "contract_id", "property_name"}
+    template.save(
+        {
+            "address": "東京都",
+            "contract_id": "C-001",
+            "property_name": "物件A",
+        },
+        str(output_path),
+    )
+
+    result = Document(str(output_path))
+    assert result.tables[0].cell(0, 1).text == "東京都"
+    assert result.sections[0].header.paragraphs[0].text == "契約番号 C-001"
+    assert result.sections[0].footer.paragraphs[0].text == "物件A 御中"
+
+
+def test_template_cache_evicts_least_recently_used(tmp_path):
+    """上限を超えると、最も長く使われていないテンプレートが取り除かれること"""
+    paths = []
+    for name in ["a", "b", "c"]:
+        path = str(tmp_path / f"{name}.docx")
+        make_template(path)
+        paths.append(path)
+
+    cache = TemplateCache(max_entries=2)
+    first = cache.get(paths[0])
+    cache.get(paths[1])
+    assert cache.get(paths[0]) is first  # a を最近使ったことにします
+    cache.get(paths[2])  # b が取り除かれます
+
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 3, 1)
+    assert cache.get(paths[0]) is first
+    cache.get(paths[1])
+    assert cache.misses == 4
+
+
+def test_template_cache_limits_total_size(tmp_path):
+    """合計サイズの上限を超えた場合も取り除かれ、最低1件は保持されること"""
+    paths = []
+    for name in ["a", "b"]:
+        path = str(tmp_path / f"{name}.docx")
+        make_template(path)
+        paths.append(path)
+
+    cache = TemplateCache(max_bytes=1)
+    cache.get(paths[0])
+    cache.get(paths[1])
+    assert len(cache) == 1
+    assert cache.nbytes > 1
+
+
+def test_template_cache_reloads_changed_file(tmp_path):
+    """ファイルが更新された場合は読み込み直すこと"""
+    path = tmp_path / "template.docx"
+    make_template(path)
+    cache = TemplateCache()
+    first = cache.get(str(path))
+
+    doc = Document()
+    doc.add_paragraph("{{address}} の追加条項です。")
+    doc.save(path)
+    second = cache.get(str(path))
+    assert second is not first
+    assert second.placeholders == {"address"}
@@ -0,0 +1,92 @@
+import pandas as pd
+
+from contract_validation import prepare_contracts, write_rejection_report
+
+
+def make_frame():
+    """テスト用の契約データを作成します"""
+    return pd.DataFrame(
+        {
+            "property_name": [
+                "サニーハイツ",
+                "グランドコート",
+                None,
+                "サニーハイツ",
+                "A/B棟",
+                "パークヒルズ",
+            ],
+            "address": ["東京都", "大阪府", "愛知県", "福岡県", "北海道", " "],
+            "amount": [100000, 85000.5, 90000, 70000, 60000, 50000],
+        }
+    )
+
+
+def test_prepare_contracts_formats_valid_rows():
+    """正常な行は差し込み用の文字列に変換されること"""
+    prepared = prepare_contracts(make_frame())
+    assert prepared.rows.to_dict("records") == [
+        {
+            "property_name": "サニーハイツ",
+            "address": "東京都",
+            "amount": "100,000",
+        },
+        {
+            "property_name": "グランドコート",
+            "address": "大阪府",
+            "amount": "85,000.5",
+        },
+        {
+            "property_name": "サニーハイツ",
+            "address": "福岡県",
+            "amount": "70,000",
+        },
+        {
+            "property_name": "A/B棟",
+            "address": "北海道",
+            "amount": "60,000",
+        },
+    ]
+    assert list(prepared.rows.index) == [0, 1, 3, 4]
+
+
+def test_prepare_contracts_reports_rejected_rows():
+    """問題のある行が理由とともに除外されること（重複と記号は除外しない）"""
+    df = make_frame()
+    df["amount"] = df["amount"].astype(object)
+    df.loc[1, "amount"] = "八万円"
+    rejected = prepare_contracts(df).rejected
+    reasons = dict(zip(rejected["行番号"], rejected["理由"]))
+    assert reasons == {
+        3: "amount が数値ではありません",
+        4: "property_name が空欄です",
+        7: "address が空欄です",
+    }
+
+
+def test_write_rejection_report(tmp_path):
+    """除外した行があればレポートを作成し、なければ削除すること"""
+    rejected = prepare_contracts(make_frame()).rejected
+    path = write_rejection_report(rejected, str(tmp_path))
+    report = pd.read_excel(path)
+    assert list(report.columns) == ["行番号", "property_name", "理由"]
+    assert len(report) == 2
+
+    assert write_rejection_report(rejected.iloc[0:0], str(tmp_path)) is None
+    assert not (tmp_path / "rejected_rows.xlsx").exists()
+
+
+def test_prepare_contracts_rejects_non_finite_and_huge_amounts():
+    """inf や桁があふれる金額は、処理を止めずにその行だけ除外されること"""
+    df = pd.DataFrame(
+        {
+            "property_name": ["A", "B", "C", "D"],
+            "address": ["東京都"] * 4,
+            "amount": [float("inf"), 1e30, "-inf", 10**15],
+        }
+    )
+    prepared = prepare_contracts(df)
+    assert list(prepared.rejected["行番号"]) == [2, 3, 4]
+    assert set(prepared.rejected["理由"]) == {
+        "amount が大きすぎるか有限の値ではありません"
+    }
+    assert prepared.rows["amount"].tolist() == ["1,000,000,000,000,000"]
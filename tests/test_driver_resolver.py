@@ -0,0 +1,161 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+import driver_resolver
+
+
+def make_executable(path, output):
+    """--version で決まった文字列を表示する実行ファイルを作成します"""
+    path.write_text(f'#!/bin/sh\necho "{output}"\n')
+    path.chmod(0o755)
+    return str(path)
+
+
+@pytest.fixture
+def installed(tmp_path, monkeypatch):
+    """Chrome 120 とドライバ 119・120 がある環境を用意します"""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    browser = make_executable(
+        bin_dir / "google-chrome", "Google Chrome 120.0.6099.109"
+    )
+    old_driver = make_executable(
+        tmp_path / "chromedriver-119", "ChromeDriver 119.0.6045.105 (abc)"
+    )
+    new_driver = make_executable(
+        tmp_path / "chromedriver-120", "ChromeDriver 120.0.6099.109 (def)"
+    )
+    for name in (
+        "TEAM_PJ_CHROMEDRIVER",
+        "TEAM_PJ_CHROME_BINARY",
+        "TEAM_PJ_ALLOW_DRIVER_DOWNLOAD",
+    ):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("PATH", str(bin_dir))
+    monkeypatch.setattr(
+        driver_resolver,
+        "DOWNLOADED_DRIVER_PATTERNS",
+        (str(tmp_path / "chromedriver-*"),),
+    )
+
+    def no_download(version):
+        raise AssertionError("ダウンロードしてはいけません")
+
+    monkeypatch.setattr(driver_resolver, "_download_driver", no_download)
+    return {
+        "browser": browser,
+        "old_driver": old_driver,
+        "new_driver": new_driver,
+        "cache": str(tmp_path / "cache" / "chromedriver.json"),
+    }
+
+
+def test_resolves_driver_matching_browser_version(installed):
+    """Chrome とメジャーバージョンが一致するドライバが選ばれること"""
+    resolved = driver_resolver.resolve_chromedriver(
+        cache_path=installed["cache"]
+    )
+
+    assert resolved.driver_path == installed["new_driver"]
+    assert resolved.driver_version == "120.0.6099.109"
+    assert resolved.browser_path == installed["browser"]
+    assert resolved.browser_version == "120.0.6099.109"
+    assert os.path.exists(installed["cache"])
+
+
+def test_cached_result_skips_version_checks(installed, monkeypatch):
+    """キャッシュが有効な間は実行ファイルを起動せずに結果を返すこと"""
+    first = driver_resolver.resolve_chromedriver(cache_path=installed["cache"])
+
+    def fail(executable):
+        raise AssertionError("バージョンを確認してはいけません")
+
+    monkeypatch.setattr(driver_resolver, "read_version", fail)
+    assert (
+        driver_resolver.resolve_chromedriver(cache_path=installed["cache"])
+        == first
+    )
+
+
+def test_cache_expires_after_ttl_and_on_browser_update(installed):
+    """期限切れや Chrome の更新があると解決し直すこと"""
+    driver_resolver.resolve_chromedriver(cache_path=installed["cache"])
+    os.remove(installed["new_driver"])
+
+    # 期限内でも、記録したドライバが消えていれば探し直します
+    with pytest.raises(FileNotFoundError):
+        driver_resolver.resolve_chromedriver(cache_path=installed["cache"])
+
+    # Chrome を 119 に更新すると、119 のドライバが選ばれます
+    make_executable(
+        Path(installed["browser"]),
+        "Google Chrome 119.0.6045.123",
+    )
+    resolved = driver_resolver.resolve_chromedriver(
+        cache_path=installed["cache"], ttl=0
+    )
+    assert resolved.driver_path == installed["old_driver"]
+
+
+def test_configured_driver_is_used(installed, monkeypatch):
+    """環境変数で指定したドライバが使われること"""
+    monkeypatch.setenv("TEAM_PJ_CHROMEDRIVER", installed["new_driver"])
+    os.remove(installed["old_driver"])
+
+    resolved = driver_resolver.resolve_chromedriver(
+        cache_path=installed["cache"]
+    )
+
+    assert resolved.driver_path == installed["new_driver"]
+
+
+def test_changed_env_override_bypasses_cache(installed, monkeypatch):
+    """環境変数の指定を変えると、キャッシュを使わずに探し直すこと"""
+    first = driver_resolver.resolve_chromedriver(cache_path=installed["cache"])
+    assert first.driver_path == installed["new_driver"]
+
+    # 119 のドライバを指定しても Chrome 120 と合わないため、見つかりません
+    monkeypatch.setenv("TEAM_PJ_CHROMEDRIVER", installed["old_driver"])
+    with pytest.raises(FileNotFoundError):
+        driver_resolver.resolve_chromedriver(cache_path=installed["cache"])
+
+    monkeypatch.setenv("TEAM_PJ_CHROMEDRIVER", installed["new_driver"])
+    monkeypatch.setenv("TEAM_PJ_CHROME_BINARY", installed["browser"])
+    resolved = driver_resolver.resolve_chromedriver(
+        cache_path=installed["cache"]
+    )
+    assert resolved.driver_path == installed["new_driver"]
+    # 一時ファイルは残りません
+    assert os.listdir(os.path.dirname(installed["cache"])) == [
+        "chromedriver.json"
+    ]
+
+
+def test_download_only_when_allowed(installed, monkeypatch, tmp_path):
+    """合うドライバがない場合、許可されたときだけダウンロードすること"""
+    os.remove(installed["new_driver"])
+    with pytest.raises(FileNotFoundError, match="120.0.6099.109"):
+        driver_resolver.resolve_chromedriver(cache_path=installed["cache"])
+
+    downloaded = make_executable(
+        tmp_path / "downloaded", "ChromeDriver 120.0.6099.109 (ghi)"
+    )
+    requested = []
+
+    def download(version):
+        requested.append(version)
+        return downloaded
+
+    monkeypatch.setattr(driver_resolver, "_download_driver", download)
+    monkeypatch.setenv("TEAM_PJ_ALLOW_DRIVER_DOWNLOAD", "1")
+    start = time.time()
+    resolved = driver_resolver.resolve_chromedriver(
+        cache_path=installed["cache"]
+    )
+
+    assert requested == ["120.0.6099.109"]
+    assert resolved.driver_path == downloaded
+    assert time.time() - start < 5
@@ -0,0 +1,69 @@
+import os
+
+from openpyxl import Workbook
+
+import excel_reader
+import utils
+from excel_reader import ExcelRowReader, iter_rows_cached, read_columns
+
+
+def make_workbook(path):
+    """テスト用のExcelファイルを作成します（3行目は空行）"""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["ID", "Task Name", "Status"])
+    sheet.append([1, "要件定義", "完了"])
+    sheet.append([None, None, None])
+    sheet.append([3, "実装", "未着手"])
+    workbook.save(path)
+
+
+def test_reader_reads_header_and_rows(tmp_path):
+    """ヘッダーと行データが1行ずつ読み込めること"""
+    path = str(tmp_path / "tasks.xlsx")
+    make_workbook(path)
+
+    reader = ExcelRowReader(path)
+    assert reader.columns == ["ID", "Task Name", "Status"]
+    assert list(reader) == [
+        (0, {"ID": 1, "Task Name": "要件定義", "Status": "完了"}),
+        (2, {"ID": 3, "Task Name": "実装", "Status": "未着手"}),
+    ]
+
+
+def test_read_columns_keeps_only_selected_columns(tmp_path):
+    """指定した列だけの DataFrame が作成されること"""
+    path = str(tmp_path / "tasks.xlsx")
+    make_workbook(path)
+
+    df = read_columns(path, ["Status"])
+    assert list(df.columns) == ["Status"]
+    assert df["Status"].tolist() == ["完了", "未着手"]
+
+
+def test_iter_rows_cached_writes_cache_chunk_by_chunk(tmp_path, monkeypatch):
+    """1行ずつキャッシュに追記し、最後まで読んだ場合だけ保存されること"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(excel_reader, "CACHE_CHUNK_ROWS", 1)
+    path = str(tmp_path / "tasks.xlsx")
+    make_workbook(path)
+    variant = excel_reader._columns_variant(["ID", "Status"], None)
+
+    # 途中で読むのをやめた場合は、書きかけのキャッシュを残しません
+    rows = iter_rows_cached(path, ["ID", "Status"])
+    next(rows)
+    next(rows)  # 1行目のチャンクを書き込んだ後で止めます
+    rows.close()
+    assert utils.get_cached_frame(path, variant) is None
+    assert not [
+        name for name in os.listdir(utils.CACHE_DIR) if name.endswith(".tmp")
+    ]
+
+    expected = [
+        (0, {"ID": 1, "Status": "完了"}),
+        (2, {"ID": 3, "Status": "未着手"}),
+    ]
+    assert list(iter_rows_cached(path, ["ID", "Status"])) == expected
+    cached = utils.get_cached_frame(path, variant)
+    assert cached.index.tolist() == [0, 2]
+    assert list(iter_rows_cached(path, ["ID", "Status"])) == expected
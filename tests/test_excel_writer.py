@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from excel_writer import HEADER_STYLE_NAME, StreamingExcelWriter
+
+
+def test_write_frame_splits_sheets_at_row_limit(tmp_path):
+    """行数の上限を超えるとシートが分割され、各シートにヘッダーが付くこと"""
+    path = str(tmp_path / "out.xlsx")
+    df = pd.DataFrame(
+        {"Task Name": list("ABCDE"), "Status": ["完了", None, "", "", ""]}
+    )
+
+    writer = StreamingExcelWriter(path, max_rows=3)
+    sheet_names = writer.write_frame("詳細一覧", df)
+    writer.save()
+
+    assert sheet_names == ["詳細一覧", "詳細一覧_2", "詳細一覧_3"]
+    workbook = load_workbook(path)
+    assert workbook.sheetnames == sheet_names
+
+    first = [[c.value for c in row] for row in workbook["詳細一覧"].rows]
+    assert first == [["Task Name", "Status"], ["A", "完了"], ["B", None]]
+    last = [[c.value for c in row] for row in workbook["詳細一覧_3"].rows]
+    assert last == [["Task Name", "Status"], ["E", None]]
+    assert workbook["詳細一覧_2"]["A1"].style == HEADER_STYLE_NAME
+
+
+def test_save_keeps_previous_file_when_interrupted(tmp_path, monkeypatch):
+    """保存に失敗した場合は前回のファイルが残り、一時ファイルも残らないこと"""
+    path = tmp_path / "B.xlsx"
+    path.write_bytes(b"previous")
+
+    writer = StreamingExcelWriter(str(path))
+
+    def broken_save(filename):
+        with open(filename, "wb") as f:
+            f.write(b"half")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(writer.workbook, "save", broken_save)
+    with pytest.raises(OSError):
+        writer.save()
+    assert path.read_bytes() == b"previous"
+    assert not (tmp_path / "B.xlsx.tmp").exists()
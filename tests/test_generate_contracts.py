@@ -0,0 +1,353 @@
+import csv
+import io
+import time
+import zipfile
+
+import pandas as pd
+import pytest
+from docx import Document
+
+import batch_runner
+import generate_contracts
+from contract_manifest import ContractManifest
+from contract_output import ZipArchiveOutput
+from contract_template import CompiledTemplate
+
+
+def make_template(path):
+    """テスト用のテンプレートを作成します"""
+    doc = Document()
+    doc.add_paragraph("物件名: {{property_name}}")
+    doc.add_paragraph("住所: {{address}}")
+    doc.add_paragraph("賃料: 金 {{amount}} 円")
+    doc.save(path)
+
+
+def make_rows(count):
+    """テスト用の (行番号, 行データ) を作成します（5件目は住所が欠けた不正データ）"""
+    rows = []
+    for i in range(count):
+        row = {
+            "property_name": f"物件{i}",
+            "address": f"住所{i}",
+            "amount": f"{1000 * i:,}",
+        }
+        if i == 4:
+            del row["address"]
+        rows.append((i, row))
+    return rows
+
+
+def test_parallel_results_match_serial(tmp_path):
+    """並列実行の結果が逐次実行と同じ順序・内容になること"""
+    template_path = str(tmp_path / "template.docx")
+    make_template(template_path)
+    rows = make_rows(20)
+
+    template = CompiledTemplate(template_path)
+    serial = [
+        generate_contracts.render_single_contract(index, row, template)
+        for index, row in rows
+    ]
+    parallel = list(
+        generate_contracts.run_parallel(
+            rows, template_path, workers=2, chunk_size=3
+        )
+    )
+
+    # .docx のバイト列は生成時刻を含むため、ファイル名と結果だけを比較します
+    def summarize(results):
+        return [
+            (r.index, r.filename, r.data is not None, r.error) for r in results
+        ]
+
+    assert summarize(parallel) == summarize(serial)
+    assert [r.error is not None for r in parallel].count(True) == 1
+
+
+def test_parallel_reports_broken_worker_pool(tmp_path, capsys):
+    """ワーカーがテンプレートを読み込めない場合、エラーを報告して終了すること"""
+    rows = make_rows(3)
+    with pytest.raises(SystemExit) as excinfo:
+        list(
+            generate_contracts.run_parallel(
+                rows, str(tmp_path / "missing.docx"), workers=2
+            )
+        )
+    assert excinfo.value.code == 1
+    assert "BrokenProcessPool" in capsys.readouterr().out
+
+
+def test_zip_output_writes_archive_and_index(tmp_path):
+    """ZIP 出力で契約書がアーカイブに格納され、索引が作成されること"""
+    template_path = str(tmp_path / "template.docx")
+    make_template(template_path)
+    template = CompiledTemplate(template_path)
+
+    output = ZipArchiveOutput(str(tmp_path), max_bytes=1)
+    for index, row in make_rows(3):
+        assert generate_contracts.process_single_contract(
+            index, row, template, output
+        )
+    output.close()
+
+    # 上限が小さいため、1件ごとに別のアーカイブになります
+    with open(tmp_path / "contracts_index.csv", encoding="utf-8") as f:
+        index_rows = list(csv.DictReader(f))
+    assert len({row["archive"] for row in index_rows}) == 3
+
+    entry = index_rows[1]
+    with zipfile.ZipFile(tmp_path / entry["archive"]) as archive:
+        data = archive.read(entry["entry"])
+    doc = Document(io.BytesIO(data))
+    assert doc.paragraphs[0].text == "物件名: 物件1"
+
+
+def test_rows_select_their_own_template(tmp_path):
+    """template 列で行ごとにテンプレートを選び、見つからない行は除外されること"""
+    templates_dir = tmp_path / "templates"
+    templates_dir.mkdir()
+    make_template(str(templates_dir / "contract_template.docx"))
+    doc = Document()
+    doc.add_paragraph("駐車場: {{property_name}}")
+    doc.save(templates_dir / "parking.docx")
+
+    excel_path = tmp_path / "contract_data.xlsx"
+    pd.DataFrame(
+        {
+            "property_name": ["A棟", "B区画", "C棟", "D区画"],
+            "address": ["東京都", "大阪府", "京都府", "福岡県"],
+            "amount": [1000, 2000, 3000, 4000],
+            "template": [None, "parking", "missing", "../parking"],
+        }
+    ).to_excel(excel_path, index=False)
+
+    output_dir = tmp_path / "output"
+    generate_contracts.generate_contracts(
+        excel_path=str(excel_path),
+        template_path=str(templates_dir / "contract_template.docx"),
+        output_dir=str(output_dir),
+    )
+
+    def first_line(name):
+        return Document(output_dir / name).paragraphs[0].text
+
+    assert first_line("Contract_A棟.docx") == "物件名: A棟"
+    assert first_line("Contract_B区画.docx") == "駐車場: B区画"
+    assert not (output_dir / "Contract_C棟.docx").exists()
+    assert not (output_dir / "Contract_D区画.docx").exists()
+    rejected = pd.read_excel(output_dir / "rejected_rows.xlsx")
+    assert len(rejected) == 2
+
+
+class SlowOutput:
+    """保存に時間がかかり、指定したファイル名では失敗する出力先です"""
+
+    max_writers = None
+
+    def __init__(self, delay, fail_name=None):
+        self.delay = delay
+        self.fail_name = fail_name
+        self.saved = []
+
+    def save(self, index, filename, data):
+        time.sleep(self.delay)
+        if filename == self.fail_name:
+            raise OSError("ディスクがいっぱいです")
+        self.saved.append(filename)
+        return filename
+
+
+def slow_renders(count, delay):
+    """生成に時間がかかる RenderedContract を順に返します"""
+    for i in range(count):
+        time.sleep(delay)
+        yield generate_contracts.RenderedContract(
+            i, f"Contract_{i}.docx", b"data", None, delay
+        )
+
+
+def test_saving_overlaps_rendering_and_keeps_order(tmp_path):
+    """保存が生成と並行して行われ、結果は入力順に返ること"""
+    output = SlowOutput(delay=0.02, fail_name="Contract_3.docx")
+    start = time.perf_counter()
+    results = list(
+        generate_contracts.iter_saved(
+            slow_renders(10, 0.02), output, writers=2, queue_size=4
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    # 生成と保存を交互に行うと 0.4 秒かかります
+    assert elapsed < 0.35
+    assert [rendered.index for rendered, _, _, _ in results] == list(range(10))
+    assert [success for _, success, _, _ in results].count(False) == 1
+    assert "Contract_3.docx" in results[3][2]
+    assert len(output.saved) == 9
+
+
+def test_zip_output_is_saved_by_one_thread(tmp_path):
+    """ZIP 出力では保存するスレッドが1つに制限されること"""
+    output = ZipArchiveOutput(str(tmp_path), max_bytes=1024 * 1024)
+    results = list(
+        generate_contracts.iter_saved(slow_renders(5, 0), output, writers=4)
+    )
+    output.close()
+
+    assert all(success for _, success, _, _ in results)
+    archive_name = output.entries["Contract_0.docx"]["archive"]
+    with zipfile.ZipFile(tmp_path / archive_name) as archive:
+        assert len(archive.namelist()) == 5
+
+
+class FlakyOutput:
+    """指定した回数だけ一時的なエラーで保存に失敗する出力先です"""
+
+    max_writers = None
+
+    def __init__(self, failures):
+        self.failures = dict(failures)
+        self.saved = []
+
+    def save(self, index, filename, data):
+        if self.failures.get(filename, 0) > 0:
+            self.failures[filename] -= 1
+            raise PermissionError("ファイルが他のプログラムで開かれています")
+        if filename == "Contract_bad.docx":
+            raise FileNotFoundError("保存先がありません")
+        self.saved.append(filename)
+        return filename
+
+    def exists(self, filename):
+        return False
+
+
+def test_transient_save_errors_are_retried_later(tmp_path):
+    """一時的なエラーの行は後回しにして再試行し、他の行の保存は止まらないこと"""
+    template_path = tmp_path / "template.docx"
+    template_path.write_bytes(b"v1")
+    names = ["a", "flaky", "b", "bad", "locked"]
+    rows = [(i, {"name": name}) for i, name in enumerate(names)]
+    rendered = [
+        generate_contracts.RenderedContract(
+            i, f"Contract_{name}.docx", b"data", None, 0.0
+        )
+        for i, name in enumerate(names)
+    ]
+    # flaky は1回だけ、locked は何度やっても失敗します
+    output = FlakyOutput({"Contract_flaky.docx": 1, "Contract_locked.docx": 9})
+    manifest = ContractManifest(str(tmp_path), str(template_path))
+    list(
+        manifest.filter_rows(
+            rows, lambda row: f"Contract_{row['name']}.docx", output.exists
+        )
+    )
+
+    success_count, failures = generate_contracts.save_all(
+        rendered,
+        output,
+        manifest,
+        writers=0,
+        retry_queue=batch_runner.RetryQueue(attempts=3, base_delay=0),
+    )
+    manifest.close()
+
+    assert success_count == 3
+    # 後回しにした flaky は、後続の行より後に保存されます
+    assert output.saved == [
+        "Contract_a.docx",
+        "Contract_b.docx",
+        "Contract_flaky.docx",
+    ]
+    assert [(f.name, f.stage, f.transient, f.attempts) for f in failures] == [
+        ("Contract_bad.docx", "保存", False, 1),
+        ("Contract_locked.docx", "保存", True, 3),
+    ]
+    # 再試行で成功した行もマニフェストに記録されます
+    assert set(manifest.entries) == {
+        "Contract_a.docx",
+        "Contract_b.docx",
+        "Contract_flaky.docx",
+    }
+
+
+def test_assign_output_names_disambiguates_duplicates():
+    """同じ物件名には入力順に番号が付き、既存の名前とも重ならないこと"""
+    names = generate_contracts.assign_output_names(
+        pd.Series(["A棟", "a棟", "A棟_2", "A棟", "B棟"])
+    )
+    assert list(names) == [
+        "Contract_A棟.docx",
+        "Contract_a棟_3.docx",
+        "Contract_A棟_2.docx",
+        "Contract_A棟_4.docx",
+        "Contract_B棟.docx",
+    ]
+
+
+def test_prepared_rows_are_validated_chunk_by_chunk(tmp_path):
+    """少しずつ検証しても、チャンクをまたいだ重複と除外が正しく扱われること"""
+    excel_path = tmp_path / "contract_data.xlsx"
+    pd.DataFrame(
+        {
+            "property_name": ["A棟", "B棟", "A棟", None, "a棟"],
+            "address": ["東京都", "大阪府", "京都府", "愛知県", "福岡県"],
+            "amount": [1000, 2000, 3000, 4000, 5000],
+        }
+    ).to_excel(excel_path, index=False)
+
+    rows = generate_contracts.PreparedRows(
+        str(excel_path), str(tmp_path), chunk_size=2
+    )
+    names = {index: row["output_name"] for index, row in rows}
+    assert names == {
+        0: "Contract_A棟.docx",
+        1: "Contract_B棟.docx",
+        2: "Contract_A棟_2.docx",
+        4: "Contract_a棟_3.docx",
+    }
+    assert rows.rejected_count == 1
+    report = pd.read_excel(tmp_path / "rejected_rows.xlsx")
+    assert list(report["行番号"]) == [5]
+
+
+def test_duplicate_names_are_kept_in_sharded_layout(tmp_path):
+    """重複した物件名も上書きされず、索引から全件を参照できること"""
+    template_path = tmp_path / "contract_template.docx"
+    make_template(str(template_path))
+    excel_path = tmp_path / "contract_data.xlsx"
+    pd.DataFrame(
+        {
+            "property_name": ["A棟", "A棟", "B棟"],
+            "address": ["東京都", "大阪府", "京都府"],
+            "amount": [1000, 2000, 3000],
+        }
+    ).to_excel(excel_path, index=False)
+    output_dir = tmp_path / "output"
+
+    def run():
+        generate_contracts.generate_contracts(
+            excel_path=str(excel_path),
+            template_path=str(template_path),
+            output_dir=str(output_dir),
+            layout="hash",
+        )
+        with open(output_dir / "contracts_index.csv", encoding="utf-8") as f:
+            return {row["filename"]: row for row in csv.DictReader(f)}
+
+    index = run()
+    assert sorted(index) == [
+        "Contract_A棟.docx",
+        "Contract_A棟_2.docx",
+        "Contract_B棟.docx",
+    ]
+    second = Document(output_dir / index["Contract_A棟_2.docx"]["entry"])
+    assert second.paragraphs[1].text == "住所: 大阪府"
+    assert not list(output_dir.glob("*.docx"))
+
+    # 2回目は変更がないため、同じ場所のまま生成を省略します
+    written_at = (output_dir / index["Contract_B棟.docx"]["entry"]).stat()
+    assert run() == index
+    assert (
+        output_dir / index["Contract_B棟.docx"]["entry"]
+    ).stat().st_mtime_ns == written_at.st_mtime_ns
@@ -0,0 +1,91 @@
+import json
+import os
+
+import pandas as pd
+
+import utils
+
+
+def test_cached_frame_is_reused_until_source_changes(tmp_path):
+    """元ファイルが変わるまではキャッシュが使われ、変わると再作成されること"""
+    source = tmp_path / "input.xlsx"
+    source.write_bytes(b"v1")
+    cache_dir = str(tmp_path / "cache")
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return pd.DataFrame({"Status": ["完了", "未着手"]}, index=[0, 2])
+
+    first = utils.load_cached_frame(str(source), loader, cache_dir=cache_dir)
+    second = utils.load_cached_frame(str(source), loader, cache_dir=cache_dir)
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+
+    # 内容が同じまま更新日時だけが変わった場合は、キャッシュを使い続けます
+    os.utime(source, ns=(0, 0))
+    utils.load_cached_frame(str(source), loader, cache_dir=cache_dir)
+    assert len(calls) == 1
+
+    source.write_bytes(b"v2")
+    utils.load_cached_frame(str(source), loader, cache_dir=cache_dir)
+    assert len(calls) == 2
+
+
+def test_source_changed_while_loading_is_not_cached(tmp_path):
+    """読み込み中に元ファイルが更新された場合、キャッシュに保存されないこと"""
+    source = tmp_path / "input.xlsx"
+    source.write_bytes(b"v1")
+    cache_dir = str(tmp_path / "cache")
+
+    def loader():
+        df = pd.DataFrame({"Status": ["完了"]})
+        # 読み込み終えた直後に、別のプロセスがファイルを書き換えた場合です
+        source.write_bytes(b"v2 (updated)")
+        return df
+
+    utils.load_cached_frame(str(source), loader, cache_dir=cache_dir)
+    assert utils.get_cached_frame(str(source), "", cache_dir) is None
+
+
+def test_evict_stale_cache(tmp_path):
+    """元ファイルがないキャッシュと、上限を超えた古いキャッシュが削除されること"""
+    cache_dir = str(tmp_path / "cache")
+    df = pd.DataFrame({"Status": ["完了"]})
+    for name in ["a", "b", "c"]:
+        source = tmp_path / f"{name}.xlsx"
+        source.write_bytes(name.encode())
+        utils.store_cached_frame(str(source), df, cache_dir=cache_dir)
+
+    os.remove(tmp_path / "a.xlsx")
+    utils.evict_stale_cache(cache_dir, max_entries=1)
+
+    assert (
+        utils.get_cached_frame(str(tmp_path / "b.xlsx"), "", cache_dir) is None
+    )
+    assert (
+        utils.get_cached_frame(str(tmp_path / "c.xlsx"), "", cache_dir)
+        is not None
+    )
+
+
+def test_pickle_cache_is_never_loaded(tmp_path):
+    """pickle 形式のキャッシュは読み込まずに削除し、元のファイルを読み込むこと"""
+    source = tmp_path / "input.xlsx"
+    source.write_bytes(b"v1")
+    cache_dir = str(tmp_path / "cache")
+    df = pd.DataFrame({"Status": ["完了"]})
+    utils.store_cached_frame(str(source), df, cache_dir=cache_dir)
+
+    # 以前の形式（pickle）で保存されたキャッシュに書き換えます
+    meta_path, data_path = utils._cache_paths(str(source), "", cache_dir)
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["format"] = "pickle"
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    df.to_pickle(data_path)
+    utils._memory_cache.clear()
+
+    assert utils.get_cached_frame(str(source), "", cache_dir) is None
+    assert not os.path.exists(data_path)
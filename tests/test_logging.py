@@ -0,0 +1,118 @@
+import io
+import json
+import logging
+
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def fresh_logging():
+    """テストごとにロギングの設定をやり直します"""
+    utils.shutdown_logging()
+    yield
+    utils.shutdown_logging()
+
+
+def make_row_record(level=logging.INFO):
+    """log_row で出力したものと同じ形式のログを作成します"""
+    return logging.makeLogRecord(
+        {"levelno": level, "levelname": "INFO", "per_row": True}
+    )
+
+
+def test_row_log_filter_samples_and_rate_limits():
+    """1件ごとのログだけが割合と1秒あたりの上限に従って間引かれること"""
+    sampled = utils.RowLogFilter({logging.INFO: 0.25}, rate_limit=0)
+    kept = [sampled.filter(make_row_record()) for _ in range(8)]
+    assert kept == [True, False, False, False, True, False, False, False]
+    assert sampled.take_suppressed() == 6
+    assert sampled.take_suppressed() == 0
+
+    limited = utils.RowLogFilter(rate_limit=3)
+    kept = [limited.filter(make_row_record()) for _ in range(5)]
+    assert kept.count(True) == 3
+    # log_row 以外のログは間引きません
+    assert limited.filter(logging.makeLogRecord({"levelno": logging.INFO}))
+
+
+def test_row_log_filter_keeps_errors_during_bursts():
+    """INFO が上限を使い切っても、1件ごとのエラーは間引かれないこと"""
+    row_filter = utils.RowLogFilter({logging.ERROR: 0.1}, rate_limit=3)
+    for _ in range(10):
+        row_filter.filter(make_row_record())
+    errors = [
+        row_filter.filter(make_row_record(logging.ERROR)) for _ in range(5)
+    ]
+    assert errors == [True] * 5
+    assert row_filter.take_suppressed() == 7
+
+
+def test_json_lines_output_to_file(fresh_logging, tmp_path):
+    """JSON Lines 形式でファイルに出力され、省略件数も記録されること"""
+    log_file = tmp_path / "app.log"
+    utils.configure_logging(
+        json_lines=True, log_file=str(log_file), rate_limit=2
+    )
+    utils.log_start("job")
+    for i in range(5):
+        utils.log_row(f"行 {i}")
+    utils.log_error("失敗しました")
+    utils.log_end("job")
+    utils.shutdown_logging()
+
+    entries = [
+        json.loads(line) for line in log_file.read_text("utf-8").splitlines()
+    ]
+    messages = [entry["message"] for entry in entries]
+    assert messages[0] == "START: job を開始します。"
+    assert messages[1:3] == ["行 0", "行 1"]
+    assert "ERROR: 失敗しました" in messages
+    assert (
+        "1件ごとのログを 3 件省略しました（サンプリング・流量制限）"
+        in messages
+    )
+    assert entries[-1]["level"] == "INFO"
+
+
+def _log_from_worker(log_queue):
+    """ワーカープロセスの代わりにログを出力します"""
+    utils.configure_worker_logging(log_queue)
+    logging.info("ワーカーからのログ")
+
+
+def test_worker_process_logs_are_collected(fresh_logging, tmp_path):
+    """ワーカープロセスのログが親プロセスの出力先に書き込まれること"""
+    log_file = tmp_path / "app.log"
+    utils.configure_logging(log_file=str(log_file))
+    log_queue = utils.get_process_log_queue()
+
+    process = utils.process_pool_context().Process(
+        target=_log_from_worker, args=(log_queue,)
+    )
+    process.start()
+    process.join()
+    utils.stop_process_logging(log_queue)
+    utils.shutdown_logging()
+
+    assert "INFO: ワーカーからのログ" in log_file.read_text("utf-8")
+
+
+def test_worker_process_logs_are_captured_per_job(fresh_logging):
+    """capture_logs の中で作成したキューのログは、その書き込み先に記録されること"""
+    buffer = io.StringIO()
+    with utils.capture_logs(buffer):
+        log_queue = utils.get_process_log_queue()
+    other_queue = utils.get_process_log_queue()
+
+    process = utils.process_pool_context().Process(
+        target=_log_from_worker, args=(log_queue,)
+    )
+    process.start()
+    process.join()
+    # 別のジョブのキューを止めても、このキューの受け取りは続きます
+    utils.stop_process_logging(other_queue)
+    utils.stop_process_logging(log_queue)
+
+    assert "INFO: ワーカーからのログ" in buffer.getvalue()
@@ -0,0 +1,55 @@
+import subprocess
+import sys
+
+import pytest
+
+import main
+
+# --help の表示だけでは読み込まれてはいけないライブラリ
+HEAVY_MODULES = ["pandas", "openpyxl", "docx", "selenium", "bs4", "dotenv"]
+
+
+def test_help_does_not_import_heavy_libraries():
+    """--help の表示では重いライブラリを読み込まないこと"""
+    code = (
+        "import sys, main\n"
+        "try:\n"
+        "    main.main(['--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_unknown_arguments_are_rejected(capsys):
+    """contracts 以外のサブコマンドでは未知の引数をエラーにすること"""
+    with pytest.raises(SystemExit):
+        main.main(["progress", "--zip"])
+    assert "認識できない引数です" in capsys.readouterr().err
+
+
+def test_contracts_passes_options_through(monkeypatch):
+    """contracts の引数が generate_contracts.main にそのまま渡されること"""
+    import generate_contracts
+
+    received = []
+    monkeypatch.setattr(generate_contracts, "main", received.append)
+    main.main(["contracts", "--workers", "2", "--zip"])
+    assert received == [["--workers", "2", "--zip"]]
+
+
+def test_crawl_passes_arguments_through(monkeypatch):
+    """crawl の引数が web_scraper.main にそのまま渡されること"""
+    import web_scraper
+
+    received = []
+    monkeypatch.setattr(web_scraper, "main", received.append)
+    main.main(["crawl", "spec.json", "https://example.com", "--no-browser"])
+    assert received == [["spec.json", "https://example.com", "--no-browser"]]
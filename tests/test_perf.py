@@ -0,0 +1,67 @@
+import json
+import time
+import tracemalloc
+
+import perf
+
+
+def test_latency_histogram_percentiles():
+    """パーセンタイルが区間の上限値で近似されること"""
+    histogram = perf.LatencyHistogram()
+    for _ in range(90):
+        histogram.add(0.0008)
+    for _ in range(10):
+        histogram.add(0.2)
+
+    assert histogram.count == 100
+    assert histogram.percentile(0.5) == 0.001
+    assert histogram.percentile(0.99) == 0.2
+    assert histogram.to_dict()["histogram"]["<=1ms"] == 90
+
+
+def test_run_writes_report_with_stages(tmp_path):
+    """実行の終了時に段階ごとの計測結果を含むレポートが出力されること"""
+    recorder = perf.PerfRecorder()
+    recorder.report_path = str(tmp_path / "report.json")
+
+    recorder.start_run("job")
+    # 対応する終了がない開始は、外側の実行の終了時に読み捨てられます
+    recorder.start_run("ログ出力のみ")
+    with recorder.span("read"):
+        pass
+    with recorder.span("read"):
+        pass
+    recorder.record_latency("render", 0.003)
+    assert recorder.end_run("job") is not None
+
+    with open(recorder.report_path, encoding="utf-8") as f:
+        report = json.load(f)
+    assert report["run"] == "job"
+    assert report["stages"][0]["name"] == "read"
+    assert report["stages"][0]["calls"] == 2
+    # RSS はプロセス全体の最大値として、実行全体の項目にだけ出力します
+    assert "process_peak_rss_mb" in report
+    assert report["stages"][0]["peak_traced_mb"] is None
+    assert report["latencies"]["render"]["count"] == 1
+
+
+def test_nested_spans_are_recorded_as_separate_stages():
+    """内側の span の時間とメモリ使用量は、外側の段階に含まれないこと"""
+    recorder = perf.PerfRecorder()
+    recorder.trace_memory = True
+
+    recorder.start_run("job")
+    with recorder.span("contracts"):
+        with recorder.span("read"):
+            time.sleep(0.05)
+            data = bytearray(8 * 1024 * 1024)
+            del data
+    recorder.end_run("job")
+
+    contracts = recorder.stages["contracts"]
+    read = recorder.stages["read"]
+    assert read["wall_seconds"] >= 0.05
+    assert contracts["wall_seconds"] < 0.05
+    assert read["peak_traced_mb"] >= 8
+    assert contracts["peak_traced_mb"] < 8
+    assert not tracemalloc.is_tracing()
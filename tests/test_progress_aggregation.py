@@ -0,0 +1,53 @@
+import pandas as pd
+
+from progress_aggregation import aggregate_progress
+
+
+def make_tasks():
+    """テスト用のタスク一覧を作成します"""
+    return pd.DataFrame(
+        {
+            "Task Name": ["A", "B", "C", "D", "E"],
+            "Status": ["完了", "対応中", "未着手", "保留", "完了"],
+            "Assignee": ["田中", "田中", "佐藤", None, "佐藤"],
+            "End Date": [
+                "2025-01-06",
+                "2025-01-07",
+                "2025-01-20",
+                "2025-02-03",
+                "不明",
+            ],
+        }
+    )
+
+
+def test_aggregate_by_assignee():
+    """担当者別にステータス件数・完了率・期限超過が集計されること"""
+    sheets = aggregate_progress(make_tasks(), today="2025-01-15")
+    table = sheets["担当者別"].set_index("担当者")
+
+    assert table.loc["田中", "完了"] == 1
+    assert table.loc["田中", "対応中"] == 1
+    assert table.loc["田中", "完了率(%)"] == 50.0
+    assert table.loc["田中", "期限超過"] == 1
+    assert table.loc["(未設定)", "その他"] == 1
+    assert table["合計"].sum() == 5
+
+
+def test_aggregate_by_week_and_month():
+    """期限の週別・月別に集計され、日付が不正な行は除外されること"""
+    sheets = aggregate_progress(make_tasks(), today="2025-01-15")
+
+    weeks = sheets["週別(期限)"]
+    assert weeks["週"].tolist() == ["2025-01-06", "2025-01-20", "2025-02-03"]
+    assert weeks["合計"].tolist() == [2, 1, 1]
+
+    months = sheets["月別(期限)"].set_index("月")
+    assert months.loc["2025-01", "合計"] == 3
+    assert months.loc["2025-02", "期限超過"] == 0
+
+
+def test_aggregate_without_optional_columns():
+    """任意の列がない場合は追加の集計を作成しないこと"""
+    df = make_tasks()[["Task Name", "Status"]]
+    assert aggregate_progress(df) == {}
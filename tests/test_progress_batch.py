@@ -0,0 +1,140 @@
+import pandas as pd
+import pytest
+
+import progress_batch
+
+
+@pytest.fixture
+def team_dir(tmp_path):
+    """チームごとのタスク一覧（正常・列名なし・不正）を用意します"""
+    teams = tmp_path / "teams"
+    (teams / "sales" / "2025").mkdir(parents=True)
+    (teams / "dev").mkdir()
+
+    pd.DataFrame(
+        {
+            "Task Name": ["要件定義", "設計", "実装"],
+            "Status": ["完了", "対応中", "未着手"],
+            "Assignee": ["田中", "佐藤", "田中"],
+        }
+    ).to_excel(teams / "dev" / "A.xlsx", index=False)
+
+    # 列名がないため、2列目と6列目を Task Name と Status とみなします
+    pd.DataFrame(
+        [
+            [1, "見積", "x", "x", "x", "完了"],
+            [2, "提案", "x", "x", "x", "完了"],
+        ],
+        columns=["No", "件名", "c", "d", "e", "状態"],
+    ).to_excel(teams / "sales" / "2025" / "tasks.xlsx", index=False)
+
+    # 列が足りないファイルと、Excel として読めないファイル
+    pd.DataFrame({"メモ": ["a"]}).to_excel(teams / "memo.xlsx", index=False)
+    (teams / "broken.xlsx").write_text("not an excel file")
+    # Excel の一時ファイルは読み込みません
+    (teams / "~$A.xlsx").write_text("lock")
+    return teams
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_merges_workbooks_and_reports_errors(
+    team_dir, tmp_path, workers
+):
+    """複数のファイルをまとめて集計し、不正なファイルはエラーとして記録すること"""
+    output = tmp_path / "B.xlsx"
+
+    progress_batch.main(str(team_dir), str(output), workers=workers)
+
+    sheets = pd.read_excel(output, sheet_name=None)
+    summary = dict(zip(sheets["サマリー"]["項目"], sheets["サマリー"]["値"]))
+    assert summary["全タスク数"] == 5
+    assert summary["完了"] == 3
+    assert summary["ファイル数"] == 4
+    assert summary["読み込みエラー"] == 2
+
+    sources = sheets["ファイル別"].set_index("ファイル")
+    assert list(sources.index) == [
+        "broken.xlsx",
+        "dev/A.xlsx",
+        "memo.xlsx",
+        "sales/2025/tasks.xlsx",
+    ]
+    assert sources.loc["dev/A.xlsx", "全タスク数"] == 3
+    assert sources.loc["sales/2025/tasks.xlsx", "進捗率(%)"] == 100.0
+    assert sources.loc["sales/2025/tasks.xlsx", "備考"] == (
+        progress_batch.FALLBACK_NOTE
+    )
+    assert "列数が不足" in sources.loc["memo.xlsx", "エラー"]
+    assert pd.notna(sources.loc["broken.xlsx", "エラー"])
+
+    detail = sheets["詳細一覧"]
+    assert list(detail.columns) == ["ファイル", "Task Name", "Status"]
+    assert set(detail["Task Name"]) == {
+        "要件定義",
+        "設計",
+        "実装",
+        "見積",
+        "提案",
+    }
+
+    # 担当者別は担当者の列があるファイルだけの値になります
+    by_assignee = sheets["担当者別"].set_index("担当者")
+    assert by_assignee.loc["田中", "合計"] == 2
+    assert by_assignee.loc["(未設定)", "合計"] == 2
+
+
+def test_glob_pattern_selects_files(team_dir):
+    """glob パターンで読み込むファイルを絞り込めること"""
+    paths = progress_batch.find_workbooks(
+        str(team_dir / "**" / "A.xlsx"), exclude=[team_dir / "B.xlsx"]
+    )
+
+    assert paths == [str(team_dir / "dev" / "A.xlsx")]
+
+
+def test_worker_sends_back_counts_and_detail_columns_only(tmp_path):
+    """ワーカーの結果は件数と集計、詳細一覧の2列だけであること"""
+    path = tmp_path / "A.xlsx"
+    pd.DataFrame(
+        {
+            "Task Name": ["設計", "実装"],
+            "Status": ["完了", "未着手"],
+            "Assignee": ["田中", "田中"],
+            "End Date": ["2025-01-06", "2025-01-07"],
+        }
+    ).to_excel(path, index=False)
+
+    result = progress_batch.read_workbook(str(path), today="2025-01-15")
+
+    assert list(result.tasks.columns) == ["Task Name", "Status"]
+    assert result.columns == ["Assignee", "End Date"]
+    assert result.breakdowns["担当者別"].loc["田中", "完了"] == 1
+    assert result.breakdowns["週別(期限)"]["期限超過"].sum() == 1
+
+
+# 子プロセスはすぐに終了するため、fork の警告は表示しません
+@pytest.mark.filterwarnings("ignore:This process .* is multi-threaded")
+def test_broken_worker_pool_is_reported_per_file(
+    team_dir, tmp_path, monkeypatch
+):
+    """ワーカープロセスが異常終了しても、ファイルごとのエラーとして記録すること"""
+    import multiprocessing
+    import os
+
+    # fork で起動し、差し替えた初期化処理でワーカーを異常終了させます
+    monkeypatch.setattr(
+        progress_batch.utils,
+        "process_pool_context",
+        lambda: multiprocessing.get_context("fork"),
+    )
+    monkeypatch.setattr(progress_batch, "_init_worker", lambda q: os._exit(1))
+    output = tmp_path / "B.xlsx"
+
+    progress_batch.main(str(team_dir), str(output), workers=2)
+
+    sheets = pd.read_excel(output, sheet_name=None)
+    summary = dict(zip(sheets["サマリー"]["項目"], sheets["サマリー"]["値"]))
+    assert summary["読み込みエラー"] == 4
+    assert summary["全タスク数"] == 0
+    errors = sheets["ファイル別"]["エラー"]
+    assert errors.str.startswith("BrokenProcessPool").all()
@@ -0,0 +1,211 @@
+import errno
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+import progress_aggregation
+import progress_watch
+from progress_aggregation import aggregate_progress
+from progress_tracker import count_statuses
+
+
+def make_tasks(rows):
+    """(Task Name, Status, Assignee) の組からタスク一覧を作成します"""
+    return pd.DataFrame(rows, columns=["Task Name", "Status", "Assignee"])
+
+
+def summary_values(path):
+    """B.xlsx のサマリーシートの {項目: 値} を返します"""
+    sheet = load_workbook(path)["サマリー"]
+    return {row[0]: row[1] for row in sheet.iter_rows(2, values_only=True)}
+
+
+def test_diff_rows_finds_added_removed_and_changed():
+    """Task Name をキーに追加・削除・変更された行が求められること"""
+    previous = make_tasks(
+        [
+            ("設計", "完了", "田中"),
+            ("実装", "対応中", "佐藤"),
+            ("試験", None, None),
+        ]
+    ).set_index("Task Name")
+    current = make_tasks(
+        [
+            ("設計", "完了", "鈴木"),
+            ("試験", None, None),
+            ("公開", "未着手", None),
+        ]
+    ).set_index("Task Name")
+
+    diff = progress_watch.diff_rows(previous, current)
+    assert list(diff.added) == ["公開"]
+    assert list(diff.removed) == ["実装"]
+    assert list(diff.changed) == ["設計"]
+
+
+def test_incremental_counts_match_full_recount():
+    """差分で更新した件数が、全件を数え直した結果と一致すること"""
+    progress = progress_watch.IncrementalProgress()
+    first = make_tasks(
+        [("A", "完了", None), ("B", "対応中", None), ("C", "未着手", None)]
+    )
+    assert progress.update(first) is None
+
+    second = make_tasks(
+        [("A", "完了", None), ("B", "完了", None), ("D", None, None)]
+    )
+    diff = progress.update(second)
+    assert (len(diff.added), len(diff.removed), len(diff.changed)) == (1, 1, 1)
+    assert progress.counts() == count_statuses(second["Status"])
+
+    # Task Name が重複している場合は全件を数え直します
+    third = make_tasks([("A", "完了", None), ("A", "未着手", None)])
+    assert progress.update(third) is None
+    assert progress.counts() == count_statuses(third["Status"])
+
+
+def test_incremental_breakdowns_match_full_aggregate():
+    """差分で更新した担当者別・週別・月別の集計が、全件の集計と一致すること"""
+    progress = progress_watch.IncrementalProgress()
+    first = make_tasks(
+        [("A", "完了", "田中"), ("B", "対応中", "佐藤"), ("C", "未着手", None)]
+    ).assign(**{"End Date": ["2025-01-06", "2025-01-07", "2025-02-03"]})
+    progress.update(first, today="2025-01-15")
+
+    # 担当者の変更・ステータスの変更・行の削除と追加で、
+    # 佐藤さんのグループと 2025-02 のグループがなくなります
+    second = make_tasks(
+        [("A", "完了", "田中"), ("B", "完了", "田中"), ("D", "保留", None)]
+    ).assign(**{"End Date": ["2025-01-06", "2025-01-07", "2025-01-20"]})
+    diff = progress.update(second, today="2025-01-15")
+    assert diff is not None
+
+    expected = aggregate_progress(second, today="2025-01-15")
+    actual = progress_aggregation.format_breakdowns(
+        progress.breakdowns, progress.columns
+    )
+    assert list(actual) == list(expected)
+    for sheet_name, table in expected.items():
+        pd.testing.assert_frame_equal(actual[sheet_name], table)
+
+
+def test_refresh_rereads_only_changed_files(tmp_path, monkeypatch):
+    """複数のファイルを合計し、読み直すのは更新されたファイルだけであること"""
+    first = str(tmp_path / "a.xlsx")
+    second = str(tmp_path / "b.xlsx")
+    output_file = tmp_path / "B.xlsx"
+    make_tasks([("A", "完了", "田中"), ("B", "未着手", "佐藤")]).to_excel(
+        first, index=False
+    )
+    pd.DataFrame({"Task Name": ["C"], "Status": ["未着手"]}).to_excel(
+        second, index=False
+    )
+    progresses = {}
+    progress_watch.refresh(progresses, [first, second], str(output_file))
+
+    read = []
+    read_tasks = progress_watch.read_tasks
+
+    def counting_read_tasks(path):
+        read.append(path)
+        return read_tasks(path)
+
+    monkeypatch.setattr(progress_watch, "read_tasks", counting_read_tasks)
+    pd.DataFrame({"Task Name": ["C"], "Status": ["完了"]}).to_excel(
+        second, index=False
+    )
+    progress_watch.refresh(progresses, [second], str(output_file))
+    assert read == [second]
+
+    assert summary_values(output_file)["完了"] == 2
+    sheets = pd.read_excel(output_file, sheet_name=None)
+    assert list(sheets["詳細一覧"]["ファイル"]) == [first, first, second]
+    # 担当者の列がないファイルの行は (未設定) として数えます
+    by_assignee = sheets["担当者別"].set_index("担当者")
+    assert by_assignee.loc["(未設定)", "完了"] == 1
+    assert by_assignee["合計"].sum() == 3
+
+
+def test_wait_for_change_debounces_rapid_saves(tmp_path):
+    """保存が続いている間は待ち、変わらなくなってから戻ること"""
+    path = tmp_path / "A.xlsx"
+    path.write_bytes(b"v1")
+    signatures = {str(path): progress_watch.file_signature(str(path))}
+
+    now = [0.0]
+    writes = [b"v2", b"v22", b"v222"]
+
+    def sleep(seconds):
+        now[0] += seconds
+        # 最初の3回の待ち時間ごとに、ファイルが書き換えられます
+        if writes:
+            path.write_bytes(writes.pop(0))
+
+    current = progress_watch.wait_for_change(
+        [str(path)],
+        signatures,
+        interval=0.1,
+        debounce=0.3,
+        clock=lambda: now[0],
+        sleep=sleep,
+    )
+    assert not writes
+    assert current[str(path)][1] == len(b"v222")
+    assert now[0] >= 0.3 + 0.2
+
+
+def test_refresh_rewrites_output_only_when_rows_change(tmp_path):
+    """行が変わった場合だけ B.xlsx が書き直され、件数が更新されること"""
+    input_file = str(tmp_path / "A.xlsx")
+    output_file = tmp_path / "B.xlsx"
+    progresses = {}
+
+    make_tasks([("A", "完了", "田中"), ("B", "未着手", "佐藤")]).to_excel(
+        input_file, index=False
+    )
+    diffs = progress_watch.refresh(progresses, [input_file], str(output_file))
+    assert diffs == {input_file: None}
+    assert summary_values(output_file)["進捗率"] == "50.0%"
+
+    # 内容を変えずに保存し直した場合は書き直しません
+    make_tasks([("A", "完了", "田中"), ("B", "未着手", "佐藤")]).to_excel(
+        input_file, index=False
+    )
+    written_at = output_file.stat().st_mtime_ns
+    progress_watch.refresh(progresses, [input_file], str(output_file))
+    assert output_file.stat().st_mtime_ns == written_at
+
+    make_tasks([("A", "完了", "田中"), ("B", "完了", "佐藤")]).to_excel(
+        input_file, index=False
+    )
+    diffs = progress_watch.refresh(progresses, [input_file], str(output_file))
+    assert list(diffs[input_file].changed) == ["B"]
+    assert summary_values(output_file)["進捗率"] == "100.0%"
+    assert not (tmp_path / "B.xlsx.tmp").exists()
+
+
+def test_refresh_rewrites_output_after_failed_write(tmp_path, monkeypatch):
+    """B.xlsx の書き込みに失敗したら、次の保存で行が同じでも書き直すこと"""
+    input_file = str(tmp_path / "A.xlsx")
+    output_file = tmp_path / "B.xlsx"
+    progresses = {}
+    make_tasks([("A", "未着手", "田中")]).to_excel(input_file, index=False)
+    progress_watch.refresh(progresses, [input_file], str(output_file))
+
+    write_report = progress_watch.write_report
+
+    def disk_full(*args):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    make_tasks([("A", "完了", "田中")]).to_excel(input_file, index=False)
+    monkeypatch.setattr(progress_watch, "write_report", disk_full)
+    with pytest.raises(OSError):
+        progress_watch.refresh(progresses, [input_file], str(output_file))
+    assert summary_values(output_file)["完了"] == 0
+
+    # 内容を変えずに保存し直すと、今度は書き込めて完了が反映されます
+    monkeypatch.setattr(progress_watch, "write_report", write_report)
+    make_tasks([("A", "完了", "田中")]).to_excel(input_file, index=False)
+    progress_watch.refresh(progresses, [input_file], str(output_file))
+    assert summary_values(output_file)["完了"] == 1
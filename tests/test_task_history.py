@@ -0,0 +1,93 @@
+import pandas as pd
+
+import progress_tracker
+import task_history
+
+
+def make_tasks(statuses, assignees=None):
+    """Task Name が A, B, C... のタスク一覧を作成します"""
+    names = [chr(ord("A") + i) for i in range(len(statuses))]
+    return pd.DataFrame(
+        {
+            "Task Name": names,
+            "Status": statuses,
+            "Assignee": assignees or ["田中"] * len(statuses),
+            "End Date": ["2025-01-31"] * len(statuses),
+        }
+    )
+
+
+def test_only_changed_rows_are_recorded(tmp_path):
+    """2回目以降は、追加・変更・削除されたタスクだけが記録されること"""
+    with task_history.open_history(tmp_path / "history.db") as conn:
+        first = make_tasks(["未着手", "未着手", "対応中"])
+        assert task_history.record_run(conn, first, "2025-01-06") == 3
+        assert task_history.record_run(conn, first, "2025-01-07") == 0
+
+        # B を完了にし、C を削除して D を追加します
+        third = make_tasks(["未着手", "完了", "対応中", "未着手"]).drop(2)
+        assert task_history.record_run(conn, third, "2025-01-08") == 3
+
+        versions = conn.execute(
+            "SELECT task_name, deleted FROM task_versions WHERE run_id = 3"
+            " ORDER BY task_name"
+        ).fetchall()
+        current = conn.execute(
+            "SELECT task_name FROM task_current ORDER BY task_name"
+        ).fetchall()
+
+    assert versions == [("B", 0), ("C", 1), ("D", 0)]
+    assert current == [("A",), ("B",), ("D",)]
+
+
+def test_trend_queries(tmp_path):
+    """バーンダウン・ステータス遷移・担当者別完了数を集計できること"""
+    assignees = ["田中", "佐藤", "佐藤"]
+    runs = [
+        ("2025-01-06 09:00", ["完了", "未着手", "未着手"]),
+        ("2025-01-08 09:00", ["完了", "対応中", "未着手"]),
+        ("2025-01-13 09:00", ["完了", "完了", "完了"]),
+    ]
+    with task_history.open_history(tmp_path / "history.db") as conn:
+        for run_at, statuses in runs:
+            task_history.record_run(
+                conn, make_tasks(statuses, assignees), run_at
+            )
+        sheets = task_history.trend_sheets(conn)
+
+    burn_down = sheets["推移(バーンダウン)"]
+    assert list(burn_down["残り"]) == [2, 2, 0]
+    assert burn_down["実行日時"].iloc[0] == "2025-01-06T09:00:00"
+
+    transitions = sheets["ステータス遷移"].set_index(["変更前", "変更後"])
+    assert transitions.loc[("(新規)", "未着手"), "件数"] == 2
+    assert transitions.loc[("対応中", "完了"), "件数"] == 1
+    assert transitions.loc[("未着手", "完了"), "件数"] == 1
+
+    # 最初から完了していた A は数えず、B と C は 1/13 の週に数えます
+    throughput = sheets["担当者別完了数"]
+    assert throughput.to_dict("records") == [
+        {"担当者": "佐藤", "週": "2025-01-13", "完了件数": 2}
+    ]
+
+
+def test_progress_tracker_adds_trend_sheets(tmp_path):
+    """集計のたびに履歴が記録され、B.xlsx に推移のシートが追加されること"""
+    input_file = tmp_path / "A.xlsx"
+    output_file = tmp_path / "B.xlsx"
+    history = tmp_path / "data" / "history.db"
+
+    make_tasks(["未着手", "対応中"]).to_excel(input_file, index=False)
+    progress_tracker.main(str(input_file), str(output_file), str(history))
+    make_tasks(["完了", "対応中"]).to_excel(input_file, index=False)
+    progress_tracker.main(str(input_file), str(output_file), str(history))
+
+    sheets = pd.read_excel(output_file, sheet_name=None)
+    assert list(sheets["推移(バーンダウン)"]["完了"]) == [0, 1]
+    assert "ステータス遷移" in sheets
+    assert "担当者別完了数" in sheets
+
+    progress_tracker.main(str(input_file), str(output_file), None)
+    assert "推移(バーンダウン)" not in pd.read_excel(
+        output_file, sheet_name=None
+    )
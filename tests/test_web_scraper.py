@@ -0,0 +1,207 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import browser_pool
+import web_scraper
+
+PRODUCT_SPEC = {
+    "rows": {"css": "li.product"},
+    "fields": {
+        "name": "h2",
+        "price": {"xpath": ".//span[@class='price']"},
+        "link": {"css": "a", "attr": "href"},
+    },
+    "browser_ready": {"css": "li.product"},
+}
+
+PAGES_DIR = Path(__file__).parent / "fixtures" / "pages"
+
+CSS_SPEC = {
+    "rows": "li.product",
+    "fields": {"name": "h2", "price": "span.price"},
+}
+
+
+class RenderingDriver:
+    """
+    JavaScript を実行した後の HTML を返す WebDriver の代わりです
+    """
+
+    rendered = (
+        '<ul id="app"><li class="product"><h2>もも</h2>'
+        '<span class="price">300円</span></li></ul>'
+    )
+
+    def __init__(self):
+        self.page_source = ""
+        self.window_handles = ["main"]
+        self.switch_to = self
+
+    def get(self, url):
+        self.page_source = self.rendered if url.endswith("app.html") else ""
+
+    def find_element(self, by, value):
+        return self
+
+    def is_displayed(self):
+        return True
+
+    def execute_script(self, script):
+        return "complete"
+
+    def window(self, handle):
+        pass
+
+    def delete_all_cookies(self):
+        pass
+
+    def quit(self):
+        pass
+
+
+def test_extract_rows_with_css_and_xpath(page_server):
+    """CSS・XPath・属性で値を取り出し、相対リンクを絶対 URL にすること"""
+    url = f"{page_server}/products.html"
+    html = (PAGES_DIR / "products.html").read_text(encoding="utf-8")
+
+    rows = web_scraper.extract(html, PRODUCT_SPEC, url)
+
+    assert rows == [
+        {
+            "name": "りんご",
+            "price": "120円",
+            "link": f"{page_server}/items/apple.html",
+        },
+        {
+            "name": "みかん",
+            "price": "80円",
+            "link": f"{page_server}/items/orange.html",
+        },
+        {"name": "ぶどう", "price": None, "link": "https://example.com/grape"},
+    ]
+
+
+def test_css_only_spec_and_page_without_rows():
+    """CSS だけの定義でも取り出せ、該当しないページは空になること"""
+    html = (PAGES_DIR / "products.html").read_text(encoding="utf-8")
+
+    rows = web_scraper.extract(html, CSS_SPEC)
+
+    assert [row["name"] for row in rows] == ["りんご", "みかん", "ぶどう"]
+    assert web_scraper.extract("<html><body></body></html>", CSS_SPEC) == []
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        {},
+        {"fields": {"name": {"attr": "href"}}},
+        {"fields": {"name": {"css": "h2", "xpath": "//h2"}}},
+    ],
+)
+def test_invalid_spec_is_rejected(spec):
+    """形式が正しくない抽出定義は ValueError になること"""
+    with pytest.raises(ValueError):
+        web_scraper.compile_spec(spec)
+
+
+def test_scrape_fetches_pages_concurrently(page_server):
+    """多数のページを取得し、URL の順番どおりに行を返すこと"""
+    urls = [f"{page_server}/products.html?page={i}" for i in range(30)]
+
+    rows = web_scraper.scrape(urls, PRODUCT_SPEC, concurrency=8)
+
+    assert len(rows) == 90
+    assert [row["url"] for row in rows[::3]] == urls
+    assert {row["source"] for row in rows} == {"http"}
+    assert all(row["error"] is None for row in rows)
+
+
+def test_http_errors_are_reported_per_page(page_server):
+    """取得に失敗したページはエラーとして記録され、他のページは続くこと"""
+    urls = [f"{page_server}/missing.html", f"{page_server}/products.html"]
+
+    rows = web_scraper.scrape(urls, PRODUCT_SPEC, use_browser=False)
+
+    assert rows[0]["url"] == urls[0]
+    assert rows[0]["error"] == "HTTP 404"
+    assert [row["name"] for row in rows[1:]] == ["りんご", "みかん", "ぶどう"]
+
+
+def test_javascript_pages_fall_back_to_browser(page_server):
+    """HTML から取り出せないページだけをブラウザで開き直すこと"""
+    urls = [f"{page_server}/app.html", f"{page_server}/products.html"]
+    pool = browser_pool.BrowserPool(size=1, driver_factory=RenderingDriver)
+
+    with pool:
+        rows = web_scraper.scrape(urls, PRODUCT_SPEC, pool=pool)
+
+    assert rows[0]["source"] == "browser"
+    assert (rows[0]["name"], rows[0]["price"]) == ("もも", "300円")
+    assert {row["source"] for row in rows[1:]} == {"http"}
+    assert pool.started_count == 1
+
+    rows = web_scraper.scrape(urls[:1], PRODUCT_SPEC, use_browser=False)
+    assert rows[0]["error"] == "値を取り出せませんでした"
+
+
+def test_main_writes_excel(page_server, tmp_path):
+    """コマンドラインから実行すると、結果が Excel に書き出されること"""
+    spec_path = tmp_path / "spec.json"
+    spec_path.write_text(
+        '{"rows": "li.product", "fields": {"name": "h2"}}', encoding="utf-8"
+    )
+    urls_path = tmp_path / "urls.txt"
+    urls_path.write_text(
+        f"# 商品一覧\n{page_server}/products.html\n\n", encoding="utf-8"
+    )
+    output = tmp_path / "out" / "scraped.xlsx"
+
+    web_scraper.main(
+        [
+            str(spec_path),
+            "--urls-file",
+            str(urls_path),
+            "--output",
+            str(output),
+            "--no-browser",
+        ]
+    )
+
+    df = pd.read_excel(output)
+    assert list(df.columns) == ["url", "name", "source", "error"]
+    assert list(df["name"]) == ["りんご", "みかん", "ぶどう"]
+
+
+@pytest.mark.parametrize(
+    "selector, html, expected",
+    [
+        ("ul > li.product h2", "<ul><li class='product x'><h2>A</h2>", "A"),
+        ("#main [data-id='7']", "<div id='main'><p data-id='7'>B</p>", "B"),
+        ("p[title]", "<p>x</p><p title='t'>C</p>", "C"),
+        ('a[title="it\'s"]', '<a title="it\'s">D</a><a>x</a>', "D"),
+        (
+            "p[data-x='say \"hi\"']",
+            "<p data-x='x'>x</p><p data-x='say \"hi\"'>E</p>",
+            "E",
+        ),
+    ],
+)
+def test_css_selectors_are_translated(selector, html, expected):
+    """よく使う CSS セレクタが XPath に変換されて使えること"""
+    rows = web_scraper.extract(html, {"fields": {"value": selector}})
+
+    assert rows == [{"value": expected}]
+
+
+def test_xpath_literal_quotes_any_value():
+    """' と " を含む値も、XPath の文字列としてそのまま比較できること"""
+    value = 'it\'s "A"'
+    html = "<p title='x'>x</p><p title='it&#39;s &quot;A&quot;'>F</p>"
+    xpath = f"//p[@title={web_scraper.xpath_literal(value)}]"
+
+    rows = web_scraper.extract(html, {"fields": {"value": {"xpath": xpath}}})
+
+    assert rows == [{"value": "F"}]
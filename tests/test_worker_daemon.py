@@ -0,0 +1,203 @@
+import json
+import threading
+import time
+import urllib.request
+
+import pandas as pd
+import pytest
+
+import perf
+import utils
+import worker_daemon
+
+# テスト用のトークン
+TOKEN = "test-token"
+
+
+@pytest.fixture
+def server():
+    """ポート番号を自動で割り当てた常駐プロセスを起動します"""
+
+    def start(service):
+        service.start()
+        server = worker_daemon.WorkerServer(("127.0.0.1", 0), service, TOKEN)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        started.append((server, service))
+        return server.server_port
+
+    started = []
+    yield start
+    for server, service in started:
+        server.shutdown()
+        server.server_close()
+        service.stop()
+
+
+def test_progress_job_runs_in_daemon(server, tmp_path):
+    """登録した進捗集計ジョブが実行され、画面出力が返されること"""
+    pd.DataFrame(
+        {
+            "ID": [1, 2],
+            "Task Name": ["要件定義", "実装"],
+            "Status": ["完了", "未着手"],
+        }
+    ).to_excel(tmp_path / "A.xlsx", index=False)
+    port = server(worker_daemon.WorkerService(root=tmp_path))
+
+    result = worker_daemon.submit_job(
+        "progress", cwd=tmp_path, port=port, token=TOKEN
+    )
+
+    assert result["status"] == "succeeded"
+    assert result["exit_code"] == 0
+    assert "全2件, 完了1件" in result["output"]
+    assert (tmp_path / "B.xlsx").exists()
+    assert worker_daemon.get_job(result["id"], port=port, token=TOKEN)[
+        "status"
+    ] == ("succeeded")
+
+
+def test_failed_job_does_not_stop_daemon(server, tmp_path):
+    """sys.exit で終了したジョブは失敗として記録され、常駐プロセスは続くこと"""
+    port = server(worker_daemon.WorkerService(root=tmp_path))
+
+    # A.xlsx がないため、progress_tracker.main は sys.exit(1) で終了します
+    failed = worker_daemon.submit_job(
+        "progress", cwd=tmp_path, port=port, token=TOKEN
+    )
+    assert failed["status"] == "failed"
+    assert failed["exit_code"] == 1
+    assert "見つかりません" in failed["output"]
+
+    unknown = worker_daemon.submit_job(
+        "unknown", cwd=tmp_path, port=port, token=TOKEN
+    )
+    assert "不明なジョブの種類です" in unknown["error"]
+
+
+def test_full_queue_rejects_jobs(server, tmp_path):
+    """待ち行列がいっぱいの場合はジョブを受け付けないこと"""
+    release = threading.Event()
+    runners = {"wait": lambda args, cwd: release.wait(5)}
+    service = worker_daemon.WorkerService(
+        workers=1, queue_size=1, runners=runners, root=tmp_path
+    )
+    port = server(service)
+
+    running = worker_daemon.submit_job(
+        "wait", cwd=tmp_path, port=port, wait=False, token=TOKEN
+    )
+    # 1件目が実行中になるのを待ってから、待ち行列を埋めます
+    while service.status()["running"] == 0:
+        time.sleep(0.01)
+    queued = worker_daemon.submit_job(
+        "wait", cwd=tmp_path, port=port, wait=False, token=TOKEN
+    )
+    rejected = worker_daemon.submit_job(
+        "wait", cwd=tmp_path, port=port, wait=False, token=TOKEN
+    )
+    release.set()
+
+    assert running["status"] in ("queued", "running")
+    assert queued["status"] == "queued"
+    assert rejected == {"error": "待ち行列がいっぱいです"}
+
+
+def test_small_job_is_not_blocked_by_long_job(server, tmp_path):
+    """長いジョブの実行中も別のジョブが実行され、出力とログが混ざらないこと"""
+    release = threading.Event()
+
+    def long_job(args, cwd):
+        print("長いジョブ")
+        release.wait(5)
+        with perf.span("long"):
+            utils.log_row("長いジョブの1件")
+
+    def small_job(args, cwd):
+        print("小さなジョブ")
+        with perf.span("small"):
+            utils.log_row("小さなジョブの1件")
+
+    runners = {"long": long_job, "small": small_job}
+    service = worker_daemon.WorkerService(
+        workers=2, runners=runners, root=tmp_path
+    )
+    port = server(service)
+
+    long = worker_daemon.submit_job(
+        "long", cwd=tmp_path, port=port, wait=False, token=TOKEN
+    )
+    small = worker_daemon.submit_job(
+        "small", cwd=tmp_path, port=port, token=TOKEN
+    )
+    assert small["status"] == "succeeded"
+    assert "小さなジョブ" in small["output"]
+    assert "INFO: 小さなジョブの1件" in small["output"]
+    assert "長いジョブ" not in small["output"]
+
+    release.set()
+    service.get(long["id"]).done.wait(5)
+    long = worker_daemon.get_job(long["id"], port=port, token=TOKEN)
+    assert "INFO: 長いジョブの1件" in long["output"]
+    assert "小さなジョブ" not in long["output"]
+    # 計測結果はジョブごとに記録され、共有の recorder には残りません
+    assert "small" not in perf.recorder.stages
+    assert "long" not in perf.recorder.stages
+
+
+def post(port, body, headers):
+    """常駐プロセスに任意のヘッダーで POST し、(ステータス, 応答) を返します"""
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/jobs",
+        data=body,
+        headers=headers,
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        with e:
+            return e.code, json.load(e)
+
+
+def test_untrusted_requests_are_rejected(server, tmp_path):
+    """トークンのない・ブラウザからの・JSON でないリクエストは拒否されること"""
+    port = server(worker_daemon.WorkerService(root=tmp_path))
+    body = json.dumps({"command": "progress", "cwd": str(tmp_path)}).encode()
+    auth = {"Authorization": f"Bearer {TOKEN}"}
+    json_type = {"Content-Type": "application/json"}
+
+    bad_token = {**json_type, "Authorization": "Bearer x"}
+    from_browser = {**auth, **json_type, "Origin": "http://example.com"}
+    text_plain = {**auth, "Content-Type": "text/plain"}
+
+    assert post(port, body, json_type)[0] == 401
+    assert post(port, body, bad_token)[0] == 401
+    assert post(port, body, from_browser)[0] == 403
+    assert post(port, body, text_plain)[0] == 415
+    assert post(port, body, {**auth, **json_type})[0] == 202
+
+
+def test_paths_are_restricted_to_root(server, tmp_path):
+    """root の外の cwd と、cwd の外を指す引数のパスは使えないこと"""
+    root = tmp_path / "root"
+    root.mkdir()
+    port = server(worker_daemon.WorkerService(root=root))
+
+    outside = worker_daemon.submit_job(
+        "progress", cwd=tmp_path, port=port, token=TOKEN
+    )
+    assert "外は指定できません" in outside["error"]
+
+    escaped = worker_daemon.submit_job(
+        "progress",
+        {"output_file": "../B.xlsx"},
+        cwd=root,
+        port=port,
+        token=TOKEN,
+    )
+    assert escaped["status"] == "failed"
+    assert "作業ディレクトリの外" in escaped["error"]
+    assert not (tmp_path / "B.xlsx").exists()
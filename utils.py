@@ -1,20 +1,426 @@
+import atexit
+import contextvars
+import hashlib
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+import tempfile
+import threading
+import time
 import traceback
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import perf  # 処理時間などの計測用
 
 # Windows環境での文字化け対策
 if sys.platform == "win32":
     sys.stdout.reconfigure(encoding="utf-8")
     sys.stderr.reconfigure(encoding="utf-8")
 
-# ロギングの設定
-# INFOレベル以上のログを出力するように設定します。
-# フォーマットは [日時] レベル: メッセージ とします。
-logging.basicConfig(
-    level=logging.INFO,
-    format="[%(asctime)s] %(levelname)s: %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+# --- ログ出力 ---
+# ログは呼び出し元のスレッドでは書き出さず、キューに入れるだけにします。
+# 実際の画面・ファイルへの書き出しは QueueListener の専用スレッドが行うため、
+# 契約書の生成ループなどがログの I/O を待つことはありません。
+#
+# 環境変数で次の設定を変更できます。
+#   TEAM_PJ_LOG_LEVEL       出力するレベル（既定: INFO）
+#   TEAM_PJ_LOG_FORMAT      "json" を指定すると JSON Lines 形式で出力
+#   TEAM_PJ_LOG_FILE        画面に加えてログを書き込むファイル
+#   TEAM_PJ_LOG_SAMPLE      1件ごとのログを残す割合（例: "INFO:0.01"）
+#   TEAM_PJ_LOG_RATE_LIMIT  1件ごとのログの1秒あたりの上限（0 は無制限）
+#   （1件ごとのログでも WARNING 以上は間引きません）
+LOG_FORMAT = "[%(asctime)s] %(levelname)s: %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 1件ごとのログ (log_row) の1秒あたりの上限の既定値
+ROW_LOG_RATE_LIMIT = 100
+
+# ログのレベルごとの接頭辞（log_warning / log_error と同じ形式にします）
+_LEVEL_PREFIXES = {logging.WARNING: "WARNING: ", logging.ERROR: "ERROR: "}
+
+_logging_configured = False
+_queue_handler = None
+_log_listener = None
+_row_log_filter = None
+# get_process_log_queue で作成したキュー -> 受け取り用の QueueListener
+_process_log_listeners = {}
+_process_log_lock = threading.Lock()
+
+# capture_logs で指定したログの書き込み先（None の場合は記録しません）
+_log_capture = contextvars.ContextVar("log_capture", default=None)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    ログを1行1件の JSON 形式に変換するフォーマッターです。
+
+    ログ収集ツールなどで機械的に読み込む場合に使います。
+    """
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, LOG_DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RowLogFilter(logging.Filter):
+    """
+    1件ごとのログ (log_row で出力したもの) を間引くフィルターです。
+
+    sample_rates でレベルごとに残す割合を指定すると、一定の間隔で
+    間引きます（0.1 なら10件に1件）。さらに1秒あたりの件数が rate_limit を
+    超えた分は出力しません。省略した件数は log_end の時点でまとめて出力します。
+    log_row 以外のログ（開始・終了・警告など）と、WARNING 以上のログ
+    （失敗した行のエラーなど）は間引かず、1秒あたりの件数にも数えません。
+    """
+
+    def __init__(self, sample_rates=None, rate_limit=ROW_LOG_RATE_LIMIT):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+        self.rate_limit = rate_limit
+        self.suppressed = 0
+        self._counts = {}
+        self._window = None
+        self._window_count = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not getattr(record, "per_row", False):
+            return True
+        if record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            if self._sampled_out(record.levelno) or self._rate_limited():
+                self.suppressed += 1
+                return False
+        return True
+
+    def _sampled_out(self, levelno):
+        """
+        サンプリングで間引く対象かどうかを返します。
+        """
+        rate = self.sample_rates.get(levelno)
+        if rate is None or rate >= 1:
+            return False
+        if rate <= 0:
+            return True
+        count = self._counts.get(levelno, 0)
+        self._counts[levelno] = count + 1
+        return count % max(1, round(1 / rate)) != 0
+
+    def _rate_limited(self):
+        """
+        1秒あたりの上限を超えたかどうかを返します。
+        """
+        if not self.rate_limit:
+            return False
+        window = int(time.monotonic())
+        if window != self._window:
+            self._window = window
+            self._window_count = 0
+        self._window_count += 1
+        return self._window_count > self.rate_limit
+
+    def take_suppressed(self):
+        """
+        省略した件数を返し、0 に戻します。
+        """
+        with self._lock:
+            count = self.suppressed
+            self.suppressed = 0
+        return count
+
+
+class LogCaptureHandler(logging.Handler):
+    """
+    capture_logs の中で出力したログを、指定したバッファにも書き込むハンドラーです。
+
+    stream を省略した場合は、ログを出力したスレッドの capture_logs の
+    書き込み先を使います（capture_logs の外のログは記録しません）。
+    """
+
+    def __init__(self, stream=None):
+        super().__init__()
+        self.stream = stream
+        self.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
+
+    def emit(self, record):
+        stream = self.stream
+        if stream is None:
+            stream = _log_capture.get()
+        if stream is not None:
+            stream.write(self.format(record) + "\n")
+
+
+# ルートロガーに追加する、capture_logs の書き込み先に記録するハンドラー
+_capture_handler = LogCaptureHandler()
+
+
+@contextmanager
+def capture_logs(stream):
+    """
+    with 文の中で出力したログを stream にも書き込みます。
+
+    画面やファイルへの出力はそのまま行います。常駐プロセス
+    (worker_daemon.py) で、ジョブのログをジョブの結果に含めるために使います。
+    contextvars で切り替えるため、他のスレッドのジョブには影響しません。
+    """
+    configure_logging()
+    token = _log_capture.set(stream)
+    try:
+        yield stream
+    finally:
+        _log_capture.reset(token)
+
+
+def context_initializer():
+    """
+    現在の contextvars（ジョブのログの書き込み先や計測用オブジェクト）を
+    ThreadPoolExecutor のスレッドに引き継ぐための initializer を返します。
+
+    ThreadPoolExecutor のスレッドは呼び出し元の contextvars を
+    引き継がないため、保存用のスレッドのログや計測結果が
+    ジョブのものとして記録されなくなるのを防ぎます。
+
+    使用例:
+        ThreadPoolExecutor(4, initializer=utils.context_initializer())
+    """
+    context = contextvars.copy_context()
+
+    def initializer():
+        for var, value in context.items():
+            var.set(value)
+
+    return initializer
+
+
+def _parse_sample_rates(text):
+    """
+    "DEBUG:0.1,INFO:0.01" の形式の文字列を {レベル: 割合} に変換します。
+    """
+    rates = {}
+    for item in text.split(","):
+        if ":" not in item:
+            continue
+        name, rate = item.split(":", 1)
+        level = logging.getLevelName(name.strip().upper())
+        if isinstance(level, int):
+            rates[level] = float(rate)
+    return rates
+
+
+def configure_logging(
+    json_lines=None,
+    log_file=None,
+    level=None,
+    sample_rates=None,
+    rate_limit=None,
+):
+    """
+    ロギングを設定します（2回目以降の呼び出しでは何もしません）。
+
+    フォーマットは [日時] レベル: メッセージ とします（json_lines=True の
+    場合は JSON Lines 形式）。import しただけでは設定せず、最初にログを
+    出力するときに設定するため、ログを使わない処理（--help の表示など）の
+    起動が速くなります。省略した引数は環境変数の値を使います。
+
+    Args:
+        json_lines (bool | None): True の場合は JSON Lines 形式で出力
+        log_file (str | None): 画面に加えてログを書き込むファイル
+        level (str | int | None): 出力するレベル（既定: INFO）
+        sample_rates (dict | None): 1件ごとのログのレベルごとの残す割合
+        rate_limit (int | None): 1件ごとのログの1秒あたりの上限
+    """
+    global _logging_configured, _queue_handler, _log_listener
+    global _row_log_filter
+    if _logging_configured:
+        return
+
+    if json_lines is None:
+        json_lines = os.environ.get("TEAM_PJ_LOG_FORMAT") == "json"
+    if log_file is None:
+        log_file = os.environ.get("TEAM_PJ_LOG_FILE")
+    if level is None:
+        level = os.environ.get("TEAM_PJ_LOG_LEVEL", "INFO").upper()
+    if sample_rates is None:
+        sample_rates = _parse_sample_rates(
+            os.environ.get("TEAM_PJ_LOG_SAMPLE", "")
+        )
+    if rate_limit is None:
+        rate_limit = int(
+            os.environ.get("TEAM_PJ_LOG_RATE_LIMIT", ROW_LOG_RATE_LIMIT)
+        )
+
+    if json_lines:
+        formatter = JsonLinesFormatter()
+    else:
+        formatter = logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    _row_log_filter = RowLogFilter(sample_rates, rate_limit)
+    _queue_handler.addFilter(_row_log_filter)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_queue_handler)
+    root.addHandler(_capture_handler)
+
+    _log_listener = logging.handlers.QueueListener(log_queue, *handlers)
+    _log_listener.start()
+    _logging_configured = True
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """
+    キューに残っているログをすべて書き出してから、ロギングを終了します。
+
+    プログラムの終了時に自動で呼び出されます。
+    """
+    global _logging_configured, _queue_handler, _log_listener
+    if not _logging_configured:
+        return
+    _report_suppressed_rows()
+
+    stop_process_logging()
+
+    root = logging.getLogger()
+    root.removeHandler(_capture_handler)
+    if _queue_handler is not None:
+        root.removeHandler(_queue_handler)
+        _queue_handler = None
+    if _log_listener is not None:
+        _log_listener.stop()
+        for handler in _log_listener.handlers:
+            handler.close()
+        _log_listener = None
+    _logging_configured = False
+
+
+def process_pool_context():
+    """
+    ProcessPoolExecutor でワーカープロセスを起動する方法を返します。
+
+    fork（Linux の既定）は親プロセスのスレッドの状態をそのまま複製するため、
+    ログの書き出し用スレッドや常駐プロセスのジョブのスレッドが動いている
+    プロセスから使うと、ロックを持ったまま止まることがあります。
+    ここではスレッドを持たない専用のプロセスから起動する forkserver を使い、
+    使えない環境（Windows・macOS の一部）では spawn を使います。
+
+    Returns:
+        multiprocessing.context.BaseContext: ProcessPoolExecutor の mp_context
+    """
+    import multiprocessing
+
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def get_process_log_queue():
+    """
+    ワーカープロセスのログを受け取るためのキューを作成します。
+
+    ProcessPoolExecutor の initializer で configure_worker_logging に
+    このキューを渡すと、ワーカープロセスのログが親プロセスに集められ、
+    親プロセスのログと同じ出力先に1件ずつ書き出されます
+    （複数のプロセスの出力が1行の途中で混ざることはありません）。
+    capture_logs の中で作成した場合は、その書き込み先にも記録します。
+
+    呼び出すたびに別のキューを作成するため、常駐プロセスで複数のジョブが
+    同時にワーカープロセスを使っても、互いのログの受け取りを止めません。
+    使い終わったら stop_process_logging にキューを渡してください。
+
+    Returns:
+        multiprocessing.Queue: ログを受け取るキュー
+    """
+    configure_logging()
+    log_queue = process_pool_context().Queue()
+    # 受け取ったログは親プロセスのキューに入れ直し、間引きも適用します
+    handlers = [_queue_handler]
+    capture = _log_capture.get()
+    if capture is not None:
+        handlers.append(LogCaptureHandler(capture))
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    with _process_log_lock:
+        _process_log_listeners[log_queue] = listener
+    return log_queue
+
+
+def stop_process_logging(log_queue=None):
+    """
+    ワーカープロセスから届いたログをすべて書き出し、受け取りを終了します。
+
+    ワーカープロセスをすべて終了させた後に呼び出してください。
+
+    Args:
+        log_queue: get_process_log_queue で作成したキュー
+            （省略時はすべてのキュー）
+    """
+    with _process_log_lock:
+        if log_queue is None:
+            stopping = list(_process_log_listeners.items())
+            _process_log_listeners.clear()
+        elif log_queue in _process_log_listeners:
+            stopping = [(log_queue, _process_log_listeners.pop(log_queue))]
+        else:
+            stopping = []
+    for stopped_queue, listener in stopping:
+        try:
+            listener.stop()
+        except RuntimeError:
+            # プログラムの終了処理中はキューの送信スレッドを起動できないため、
+            # 受け取り用のスレッドの終了を待たずに閉じます
+            pass
+        stopped_queue.close()
+
+
+def configure_worker_logging(log_queue):
+    """
+    ワーカープロセスのログを、親プロセスへ送るように設定します。
+
+    Args:
+        log_queue: get_process_log_queue で作成したキュー
+    """
+    global _logging_configured
+    root = logging.getLogger()
+    # 親プロセスから引き継いだ設定があっても使わずに置き換えます
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+    _logging_configured = True
+
+
+def _report_suppressed_rows():
+    """
+    間引いた1件ごとのログの件数を出力します。
+    """
+    if _row_log_filter is None:
+        return
+    count = _row_log_filter.take_suppressed()
+    if count:
+        logging.info(
+            f"1件ごとのログを {count} 件省略しました（サンプリング・流量制限）"
+        )
 
 
 def log_start(func_name):
@@ -25,17 +431,27 @@ def log_start(func_name):
     Args:
         func_name (str): 開始する処理や関数の名前
     """
+    configure_logging()
     logging.info(f"START: {func_name} を開始します。")
+    # 所要時間の計測を開始します（終了は log_end で記録されます）
+    perf.current().start_run(func_name)
 
 
 def log_end(func_name):
     """
     処理の終了をログ出力します（INFOレベル）。
+    log_start からの所要時間もあわせて出力します。
 
     Args:
         func_name (str): 終了する処理や関数の名前
     """
-    logging.info(f"END:   {func_name} を終了しました。")
+    configure_logging()
+    _report_suppressed_rows()
+    elapsed = perf.current().end_run(func_name)
+    if elapsed is None:
+        logging.info(f"END:   {func_name} を終了しました。")
+    else:
+        logging.info(f"END:   {func_name} を終了しました。（{elapsed:.2f}秒）")
 
 
 def log_warning(message):
@@ -46,6 +462,7 @@ def log_warning(message):
     Args:
         message (str): 警告メッセージ
     """
+    configure_logging()
     logging.warning(f"WARNING: {message}")
 
 
@@ -57,9 +474,30 @@ def log_error(message):
     Args:
         message (str): エラーメッセージ
     """
+    configure_logging()
     logging.error(f"ERROR: {message}")
 
 
+def log_row(message, level=logging.INFO):
+    """
+    1件ごとの処理結果をログ出力します。
+
+    契約書1件ごとの成功・失敗のように、件数に比例して出力されるログに
+    使ってください。件数が多い場合は設定に従って間引かれます
+    （RowLogFilter を参照）。
+
+    Args:
+        message (str): メッセージ
+        level (int): ログのレベル（logging.INFO や logging.ERROR）
+    """
+    configure_logging()
+    logging.log(
+        level,
+        _LEVEL_PREFIXES.get(level, "") + message,
+        extra={"per_row": True},
+    )
+
+
 def handle_error(e):
     """
     エラー発生時に簡潔な情報を出力して終了します。
@@ -86,3 +524,423 @@ def handle_error(e):
     # システムを異常終了させます
     # exit(1) は「何か問題があって終了した」ことをOSに伝えます（0なら正常終了）。
     sys.exit(1)
+
+
+# --- 入力ファイルのキャッシュ ---
+# Excelファイルの解析は時間がかかるため、読み込んだ結果を列指向の形式
+# （Feather）で保存しておき、元のファイルが変わっていなければそちらを
+# 読み込みます。pickle は読み込むだけでプログラムを実行できてしまうため、
+# キャッシュには使いません（以前の pickle のキャッシュは削除して作り直します）。
+CACHE_DIR = ".cache/inputs"
+
+# キャッシュとして残しておく最大件数（古いものから削除します）
+CACHE_MAX_ENTRIES = 16
+
+# キャッシュのデータファイルの形式（メタ情報の format に記録します）
+CACHE_FORMAT = "feather"
+
+# この秒数より前の書きかけの一時ファイルは、中断されて残ったものとして削除します
+CACHE_TEMP_MAX_AGE = 24 * 60 * 60
+
+
+# 直近に使ったキャッシュはメモリ上にも保持する件数です。
+# 常駐プロセス (worker_daemon.py) で同じファイルを繰り返し読み込む場合に、
+# ディスクからの読み込みも省略できます。
+MEMORY_CACHE_MAX_ENTRIES = 8
+
+# メタ情報ファイルのパス -> (更新日時, サイズ, DataFrame)
+_memory_cache = OrderedDict()
+_memory_cache_lock = threading.Lock()
+
+
+def _remember_frame(meta_path, stat, df):
+    """
+    DataFrame をメモリ上のキャッシュに保持します（古いものから削除します）。
+    """
+    with _memory_cache_lock:
+        _memory_cache[meta_path] = (stat.st_mtime_ns, stat.st_size, df)
+        _memory_cache.move_to_end(meta_path)
+        while len(_memory_cache) > MEMORY_CACHE_MAX_ENTRIES:
+            _memory_cache.popitem(last=False)
+
+
+def _recall_frame(meta_path, stat):
+    """
+    メモリ上のキャッシュを返します（ないか、元ファイルが変わった場合は None）。
+
+    呼び出し元が列名を変更しても保持している DataFrame に影響しないよう、
+    浅いコピーを返します。
+    """
+    with _memory_cache_lock:
+        entry = _memory_cache.get(meta_path)
+        if entry is None or entry[:2] != (stat.st_mtime_ns, stat.st_size):
+            return None
+        _memory_cache.move_to_end(meta_path)
+    return entry[2].copy(deep=False)
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """
+    ファイルの内容から SHA-256 ハッシュ値を計算します。
+
+    Args:
+        path (str): ファイルのパス
+        chunk_size (int): 一度に読み込むバイト数
+
+    Returns:
+        str: 16進数のハッシュ値
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_paths(path, variant, cache_dir):
+    """
+    キャッシュのメタ情報ファイルとデータファイルのパスを返します。
+
+    キャッシュ名は「元ファイルの絶対パス + 読み込み方（variant）」から
+    作るため、同じファイルを異なる列で読み込んだ結果は別々に保存されます。
+    """
+    key = hashlib.sha1(
+        f"{os.path.abspath(path)}|{variant}".encode("utf-8")
+    ).hexdigest()
+    base = os.path.join(cache_dir, key)
+    return base + ".json", base + ".data"
+
+
+def _read_cache_meta(meta_path):
+    """
+    キャッシュのメタ情報を読み込みます。読めない場合は None を返します。
+    """
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache_meta(meta_path, meta):
+    """
+    キャッシュのメタ情報を一時ファイル経由で書き込みます。
+    """
+    temp_path = meta_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(temp_path, meta_path)
+
+
+def _remove_cache_entry(meta_path, data_path):
+    """
+    キャッシュのメタ情報とデータを削除します。
+    """
+    with _memory_cache_lock:
+        _memory_cache.pop(meta_path, None)
+    for cache_path in (meta_path, data_path):
+        try:
+            os.remove(cache_path)
+        except FileNotFoundError:
+            pass
+
+
+def get_cached_frame(path, variant="", cache_dir=CACHE_DIR):
+    """
+    元ファイルが変わっていなければ、キャッシュした DataFrame を返します。
+
+    更新日時とサイズが一致すればそのまま使います。一致しない場合は
+    ファイルのハッシュ値を比べ、内容が同じならキャッシュを使い続けます。
+    内容が変わっていた場合は古いキャッシュを削除して None を返します。
+
+    Args:
+        path (str): 元のファイルのパス
+        variant (str): 読み込み方の識別子（読み込んだ列名など）
+        cache_dir (str): キャッシュの保存先ディレクトリ
+
+    Returns:
+        pd.DataFrame | None: キャッシュした DataFrame（ない場合は None）
+    """
+    meta_path, data_path = _cache_paths(path, variant, cache_dir)
+    meta = _read_cache_meta(meta_path)
+    if meta is None or not os.path.exists(data_path):
+        return None
+
+    stat = os.stat(path)
+    df = _recall_frame(meta_path, stat)
+    if df is not None:
+        return df
+
+    if (meta["mtime_ns"], meta["size"]) != (stat.st_mtime_ns, stat.st_size):
+        if meta["sha256"] != hash_file(path):
+            # 元のファイルが変わったので、古いキャッシュは削除します
+            _remove_cache_entry(meta_path, data_path)
+            return None
+        meta["mtime_ns"], meta["size"] = stat.st_mtime_ns, stat.st_size
+
+    import pandas as pd
+
+    try:
+        if meta.get("format") != CACHE_FORMAT:
+            raise ValueError(f"対応していない形式です: {meta.get('format')}")
+        df = pd.read_feather(data_path).set_index("__index__")
+        df.index.name = None
+    except Exception as e:
+        log_warning(f"キャッシュを読み込めないため再作成します: {e}")
+        _remove_cache_entry(meta_path, data_path)
+        return None
+
+    meta["last_used"] = time.time()
+    _write_cache_meta(meta_path, meta)
+    _remember_frame(meta_path, stat, df)
+    return df.copy(deep=False)
+
+
+def source_signature(path):
+    """
+    元ファイルの更新日時・サイズ・ハッシュ値を返します。
+
+    読み込みを始める前に取得し、store_cached_frame に渡してください。
+    読み込み後に取得すると、読み込み中に更新されたファイルの署名と
+    更新前の内容が組み合わさったキャッシュができてしまいます。
+    """
+    stat = os.stat(path)
+    return {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": hash_file(path),
+    }
+
+
+class CachedFrameWriter:
+    """
+    DataFrame をチャンクごとにキャッシュへ書き込むクラスです。
+
+    Feather (Arrow IPC) のファイルにチャンクを順に追記するため、
+    すべての行をメモリ上に集めなくてもキャッシュを作成できます。
+    commit するまでは一時ファイルに書き込み、途中で中断した場合
+    （abort を呼んだ場合）は一時ファイルを削除します。
+
+    使用例:
+        writer = utils.CachedFrameWriter(path, variant, signature=signature)
+        for chunk in chunks:
+            writer.append(chunk)
+        writer.commit()
+    """
+
+    def __init__(self, path, variant="", cache_dir=CACHE_DIR, signature=None):
+        """
+        Args:
+            path (str): 元のファイルのパス
+            variant (str): 読み込み方の識別子（読み込んだ列名など）
+            cache_dir (str): キャッシュの保存先ディレクトリ
+            signature (dict | None): 読み込む前に source_signature で取得した
+                署名（省略時はここで取得します）
+        """
+        self.path = path
+        self.variant = variant
+        self.cache_dir = cache_dir
+        self.signature = signature or source_signature(path)
+        self.meta_path, self.data_path = _cache_paths(path, variant, cache_dir)
+        self._temp_path = None
+        self._schema = None
+        self._writer = None
+
+    def append(self, df):
+        """
+        チャンクを1つ書き込みます。
+
+        Raises:
+            pyarrow.ArrowException: 最初のチャンクと列の型が合わない場合など
+                （数値と文字列が混ざった列は Feather で保存できません）
+        """
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(
+            df.rename_axis("__index__").reset_index(),
+            schema=self._schema,
+            preserve_index=False,
+        )
+        if self._writer is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # 同じファイルを同時に読み込んでも壊れないよう、一時ファイルは
+            # 書き込みごとに別の名前にします
+            fd, self._temp_path = tempfile.mkstemp(
+                dir=self.cache_dir, suffix=".tmp"
+            )
+            os.close(fd)
+            self._schema = table.schema
+            compression = "lz4" if pa.Codec.is_available("lz4") else None
+            self._writer = pa.ipc.new_file(
+                self._temp_path,
+                table.schema,
+                options=pa.ipc.IpcWriteOptions(compression=compression),
+            )
+        self._writer.write_table(table)
+
+    def commit(self):
+        """
+        書き込んだチャンクをキャッシュとして保存します。
+
+        読み込み中に元のファイルが更新された場合（署名と現在の更新日時・
+        サイズが異なる場合）は、内容が食い違うため保存しません。
+
+        Returns:
+            bool: 保存した場合は True
+        """
+        self._writer.close()
+        self._writer = None
+        stat = os.stat(self.path)
+        if (stat.st_mtime_ns, stat.st_size) != (
+            self.signature["mtime_ns"],
+            self.signature["size"],
+        ):
+            log_warning(
+                "読み込み中に更新されたため、キャッシュを保存しません: "
+                f"{self.path}"
+            )
+            self.abort()
+            return False
+
+        os.replace(self._temp_path, self.data_path)
+        self._temp_path = None
+        _write_cache_meta(
+            self.meta_path,
+            {
+                "source": os.path.abspath(self.path),
+                "variant": self.variant,
+                **self.signature,
+                "format": CACHE_FORMAT,
+                "last_used": time.time(),
+            },
+        )
+        evict_stale_cache(self.cache_dir)
+        return True
+
+    def abort(self):
+        """
+        書き込みを中止し、一時ファイルを削除します。
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._temp_path is not None:
+            try:
+                os.remove(self._temp_path)
+            except FileNotFoundError:
+                pass
+            self._temp_path = None
+
+
+def store_cached_frame(
+    path, df, variant="", cache_dir=CACHE_DIR, signature=None
+):
+    """
+    読み込んだ DataFrame をキャッシュとして保存します（CachedFrameWriter を参照）。
+
+    数値と文字列が混ざった列のように Feather で保存できない場合は
+    例外が発生します（呼び出し元はキャッシュせずに読み込みを続けます）。
+
+    Args:
+        path (str): 元のファイルのパス
+        df (pd.DataFrame): 保存する DataFrame
+        variant (str): 読み込み方の識別子（読み込んだ列名など）
+        cache_dir (str): キャッシュの保存先ディレクトリ
+        signature (dict | None): 読み込む前に source_signature で取得した
+            署名（省略時はここで取得します）
+    """
+    writer = CachedFrameWriter(path, variant, cache_dir, signature)
+    try:
+        writer.append(df)
+    except Exception:
+        writer.abort()
+        raise
+    if writer.commit():
+        _remember_frame(writer.meta_path, os.stat(path), df.copy(deep=False))
+
+
+def load_cached_frame(path, loader, variant="", cache_dir=CACHE_DIR):
+    """
+    キャッシュがあればそれを、なければ loader で読み込んだ結果を返します。
+
+    使用例:
+        df = utils.load_cached_frame(
+            "A.xlsx", lambda: pd.read_excel("A.xlsx")
+        )
+
+    Args:
+        path (str): 元のファイルのパス
+        loader: キャッシュがない場合に DataFrame を読み込む関数
+        variant (str): 読み込み方の識別子（読み込んだ列名など）
+        cache_dir (str): キャッシュの保存先ディレクトリ
+
+    Returns:
+        pd.DataFrame: 読み込んだ DataFrame
+    """
+    df = get_cached_frame(path, variant, cache_dir)
+    if df is not None:
+        return df
+
+    # 読み込み中の更新に気付けるよう、署名は読み込む前に取得します
+    signature = source_signature(path)
+    df = loader()
+    try:
+        store_cached_frame(path, df, variant, cache_dir, signature)
+    except Exception as e:
+        # キャッシュの保存に失敗しても、読み込み自体は成功しているので続行します
+        log_warning(f"キャッシュを保存できませんでした: {e}")
+    return df
+
+
+def _remove_orphan_temp(temp_path):
+    """
+    書き込み中に中断されて残った一時ファイルを削除します。
+
+    他のプロセスが書き込み中の一時ファイルを消さないよう、
+    CACHE_TEMP_MAX_AGE 秒より前に更新されたものだけを削除します。
+    """
+    try:
+        if time.time() - os.path.getmtime(temp_path) > CACHE_TEMP_MAX_AGE:
+            os.remove(temp_path)
+    except OSError:
+        pass
+
+
+def evict_stale_cache(cache_dir=CACHE_DIR, max_entries=CACHE_MAX_ENTRIES):
+    """
+    不要になったキャッシュを削除します。
+
+    元のファイルが存在しない・更新されたキャッシュを削除し、
+    残りが max_entries 件を超える場合は最後に使われた日時が古いものから
+    削除します。
+
+    Args:
+        cache_dir (str): キャッシュの保存先ディレクトリ
+        max_entries (int): 残しておく最大件数
+    """
+    if not os.path.isdir(cache_dir):
+        return
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".tmp"):
+            _remove_orphan_temp(os.path.join(cache_dir, name))
+            continue
+        if not name.endswith(".json"):
+            continue
+        meta_path = os.path.join(cache_dir, name)
+        data_path = meta_path[: -len(".json")] + ".data"
+        meta = _read_cache_meta(meta_path)
+        try:
+            stat = os.stat(meta["source"]) if meta else None
+        except OSError:
+            stat = None
+        # 元のファイルがない、またはサイズが変わったものは古いキャッシュです
+        if stat is None or stat.st_size != meta["size"]:
+            _remove_cache_entry(meta_path, data_path)
+            continue
+        entries.append((meta["last_used"], meta_path, data_path))
+
+    entries.sort(reverse=True)
+    for _, meta_path, data_path in entries[max_entries:]:
+        _remove_cache_entry(meta_path, data_path)
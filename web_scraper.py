@@ -0,0 +1,564 @@
+"""
+ブラウザを使わずに、HTTP と lxml で Web ページから情報を取り出すモジュールです。
+
+JavaScript を使わない静的なページは、Chrome を起動しなくても HTML を
+取得して解析するだけで情報を取り出せます。ここではスレッドプールで多数の
+ページを同時に取得し（接続は urllib3 のコネクションプールで使い回します）、
+lxml で解析します。JavaScript で描画されるため HTML から何も取り出せなかった
+ページだけを、browser_pool のブラウザで開き直します。
+
+取り出す内容は「抽出定義」（辞書または JSON ファイル）で指定します:
+
+    {
+        "rows": {"css": "li.product"},
+        "fields": {
+            "name": "h2",
+            "price": {"xpath": ".//span[@class='price']"},
+            "link": {"css": "a", "attr": "href"}
+        },
+        "browser_ready": {"css": "li.product"}
+    }
+
+    rows:          1ページから複数行を取り出す場合の、各行の要素（省略時は1ページ1行）
+    fields:        列名と、値を取り出す要素（文字列は CSS セレクタとして扱います）
+                   attr を指定すると要素の文字列ではなく属性の値を取り出します
+    browser_ready: ブラウザで開き直す際に、表示を待つ要素（省略可）
+
+使用例:
+    python web_scraper.py spec.json https://example.com/a https://example.com/b
+    python web_scraper.py spec.json --urls-file urls.txt --output data/out.xlsx
+"""
+
+import argparse
+import functools
+import json
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import utils  # ログ出力用
+
+# 同時に取得するページ数
+DEFAULT_CONCURRENCY = 16
+
+# 1ページの取得を待つ最大秒数
+DEFAULT_TIMEOUT = 10
+
+# 結果の出力先
+DEFAULT_OUTPUT_PATH = "data/scraped.xlsx"
+
+# リクエストに付ける User-Agent
+USER_AGENT = "team-PJ-scraper/1.0"
+
+# URL として解決し直す属性（相対パスを絶対 URL にします）
+URL_ATTRIBUTES = ("href", "src")
+
+# 抽出定義のセレクタの種類と、Selenium の By の値の対応
+SELECTOR_KINDS = {"css": "css selector", "xpath": "xpath"}
+
+# 抽出定義を解析した結果
+ScrapeSpec = namedtuple("ScrapeSpec", ["rows", "fields", "browser_ready"])
+
+# 1ページ分の取得結果（失敗した場合は error にメッセージ）
+FetchResult = namedtuple("FetchResult", ["url", "status", "body", "error"])
+
+# cssselect がない場合に対応する CSS の書き方（タグ名と .class・#id・[属性]）
+CSS_COMPOUND_PATTERN = re.compile(
+    r"(?P<tag>[A-Za-z][\w-]*|\*)?"
+    r"(?P<parts>(?:[.#][\w-]+|\[(?:\"[^\"]*\"|'[^']*'|[^\]\"'])+\])*)"
+)
+# セレクタを要素ごとの条件と ">" に分ける正規表現（[属性="値"] の中の空白は区切りません）
+CSS_TOKEN_PATTERN = re.compile(
+    r">|(?:[^\s>\[]|\[(?:\"[^\"]*\"|'[^']*'|[^\]\"'])*\])+"
+)
+CSS_PART_PATTERN = re.compile(
+    r"([.#])([\w-]+)"
+    r"|\[([\w-]+)(?:=(?:\"([^\"]*)\"|'([^']*)'|([^\]\"']*)))?\]"
+)
+
+
+def _has_cssselect():
+    try:
+        import cssselect  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def xpath_literal(value):
+    """
+    文字列を XPath の文字列リテラルにします。
+
+    ' と " の両方を含む値は、XPath では引用符をエスケープできないため
+    concat() でつなぎます（例: it's "A" -> concat('it', "'", 's "A"')）。
+    """
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    parts = value.split("'")
+    return "concat(" + ', "\'", '.join(f"'{part}'" for part in parts) + ")"
+
+
+def _compound_to_xpath(compound):
+    """
+    "li.product" や "a[href]" のような1つの要素の条件を XPath にします。
+    """
+    match = CSS_COMPOUND_PATTERN.fullmatch(compound)
+    if not match:
+        raise ValueError(
+            f"CSS セレクタ {compound!r} を使うには cssselect パッケージが"
+            "必要です。"
+        )
+    parts = match.group("parts")
+    found = list(CSS_PART_PATTERN.finditer(parts))
+    if "".join(part.group(0) for part in found) != parts:
+        raise ValueError(f"CSS セレクタ {compound!r} が正しくありません。")
+    conditions = []
+    for part in found:
+        prefix, name, attr, *values = part.groups()
+        value = next((v for v in values if v is not None), None)
+        if prefix == ".":
+            conditions.append(
+                "contains(concat(' ', normalize-space(@class), ' '), "
+                f"{xpath_literal(f' {name} ')})"
+            )
+        elif prefix == "#":
+            conditions.append(f"@id={xpath_literal(name)}")
+        elif value is not None:
+            conditions.append(f"@{attr}={xpath_literal(value)}")
+        else:
+            conditions.append(f"@{attr}")
+    tag = match.group("tag") or "*"
+    return tag + "".join(f"[{condition}]" for condition in conditions)
+
+
+@functools.lru_cache(maxsize=256)
+def css_to_xpath(selector):
+    """
+    CSS セレクタを、要素自身とその子孫を探す XPath に変換します。
+
+    cssselect パッケージがあればそれを使います。ない場合は、タグ名・
+    .class・#id・[属性]・[属性=値] と、子孫（空白）・子（>）の
+    組み合わせだけに対応します。
+
+    Raises:
+        ValueError: cssselect がなく、対応していない書き方の場合
+    """
+    if _has_cssselect():
+        from cssselect import HTMLTranslator
+
+        return HTMLTranslator().css_to_xpath(
+            selector, prefix="descendant-or-self::"
+        )
+
+    steps = []
+    axis = "descendant-or-self::"
+    for token in CSS_TOKEN_PATTERN.findall(selector):
+        if token == ">":
+            axis = "/child::"
+            continue
+        steps.append(axis + _compound_to_xpath(token))
+        axis = "/descendant::"
+    if not steps or axis == "/child::":
+        raise ValueError(f"CSS セレクタ {selector!r} が正しくありません。")
+    return "".join(steps)
+
+
+def _parse_selector(definition, name):
+    """
+    抽出定義の1項目を (種類, セレクタ, XPath, 属性) の組にします。
+    """
+    if isinstance(definition, str):
+        definition = {"css": definition}
+    kinds = [kind for kind in SELECTOR_KINDS if kind in definition]
+    if len(kinds) != 1:
+        raise ValueError(
+            f"{name} には css か xpath のどちらか1つを指定してください。"
+        )
+    kind = kinds[0]
+    if kind == "css":
+        # CSS セレクタは最初に XPath へ変換し、解析は lxml の XPath だけで行います
+        xpath = css_to_xpath(definition["css"])
+    else:
+        xpath = definition["xpath"]
+    return (kind, definition[kind], xpath, definition.get("attr"))
+
+
+def compile_spec(spec):
+    """
+    抽出定義（辞書）を確認し、ScrapeSpec に変換します。
+
+    Raises:
+        ValueError: 抽出定義の形式が正しくない場合
+    """
+    if isinstance(spec, ScrapeSpec):
+        return spec
+    if not spec.get("fields"):
+        raise ValueError("抽出定義に fields がありません。")
+
+    fields = {
+        name: _parse_selector(definition, f"fields.{name}")
+        for name, definition in spec["fields"].items()
+    }
+    rows = spec.get("rows")
+    rows = _parse_selector(rows, "rows") if rows else None
+    ready = spec.get("browser_ready")
+    ready = _parse_selector(ready, "browser_ready") if ready else None
+    return ScrapeSpec(rows, fields, ready)
+
+
+def load_spec(path):
+    """
+    JSON ファイルから抽出定義を読み込みます。
+    """
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _normalize_text(text):
+    """
+    前後の空白を取り除き、連続する空白・改行を1つの空白にまとめます。
+    """
+    if text is None:
+        return None
+    return " ".join(text.split()) or None
+
+
+def _item_text(item, attr):
+    """
+    XPath で見つかった要素（または文字列）から値を取り出します。
+    """
+    # XPath の text() や @href は文字列をそのまま返します
+    if isinstance(item, str):
+        return item
+    if attr:
+        return item.get(attr)
+    return item.text_content()
+
+
+def _field_value(node, field, url):
+    """
+    1つの列の値を取り出します（見つからない場合は None）。
+    """
+    _, _, xpath, attr = field
+    found = node.xpath(xpath)
+    if not found:
+        return None
+    value = _normalize_text(_item_text(found[0], attr))
+    if value and attr in URL_ATTRIBUTES:
+        value = urljoin(url, value)
+    return value
+
+
+def extract(body, spec, url=""):
+    """
+    HTML から抽出定義に従って行を取り出します。
+
+    Args:
+        body (str | bytes): ページの HTML
+        spec (dict | ScrapeSpec): 抽出定義
+        url (str): ページの URL（相対リンクの解決に使います）
+
+    Returns:
+        list[dict]: 列名と値の辞書のリスト（何も見つからない場合は空）
+    """
+    import lxml.html
+
+    spec = compile_spec(spec)
+    document = lxml.html.document_fromstring(body)
+    nodes = document.xpath(spec.rows[2]) if spec.rows else [document]
+
+    rows = []
+    for node in nodes:
+        row = {
+            name: _field_value(node, field, url)
+            for name, field in spec.fields.items()
+        }
+        if any(value is not None for value in row.values()):
+            rows.append(row)
+    return rows
+
+
+class HttpFetcher:
+    """
+    接続を使い回しながら、多数のページを同時に取得するクラスです。
+
+    通信は urllib3 のコネクションプールで行い、同じサーバーへの接続は
+    Keep-Alive で再利用します。複数のスレッドから呼び出すと、concurrency 件
+    まで同時に取得します（それ以上のスレッドは接続が空くまで待ちます）。
+    """
+
+    def __init__(
+        self, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT
+    ):
+        import urllib3
+
+        self.concurrency = concurrency
+        self._http = urllib3.PoolManager(
+            maxsize=concurrency,
+            block=True,
+            timeout=urllib3.Timeout(total=timeout),
+            retries=urllib3.Retry(total=2, backoff_factor=0.2),
+            headers={"User-Agent": USER_AGENT},
+        )
+
+    def fetch(self, url):
+        """
+        1ページを取得します（通信エラーは例外ではなく error に記録します）。
+        """
+        try:
+            response = self._http.request("GET", url)
+        except Exception as e:
+            return FetchResult(url, None, None, str(e))
+        if response.status >= 400:
+            return FetchResult(
+                url, response.status, None, f"HTTP {response.status}"
+            )
+        return FetchResult(url, response.status, response.data, None)
+
+    def close(self):
+        self._http.clear()
+
+
+def _row_for(url, values, source, error=None):
+    """
+    出力する1行分の辞書を作成します。
+    """
+    return {"url": url, **values, "source": source, "error": error}
+
+
+def _scrape_page(fetcher, spec, url):
+    """
+    1ページを取得して解析し、(行のリスト, ブラウザが必要か) を返します。
+    """
+    result = fetcher.fetch(url)
+    if result.error:
+        return [_row_for(url, {}, "http", result.error)], False
+    try:
+        rows = extract(result.body, spec, url)
+    except Exception as e:
+        return [_row_for(url, {}, "http", f"解析に失敗しました: {e}")], False
+    if not rows:
+        # HTML から何も取り出せない場合は、JavaScript での描画が必要とみなします
+        return [], True
+    return [_row_for(url, row, "http") for row in rows], False
+
+
+def scrape_pages_threaded(urls, spec, concurrency=DEFAULT_CONCURRENCY):
+    """
+    concurrency 個のスレッドでページを同時に取得・解析します。
+
+    urllib3 の通信は待っている間スレッドを止めるため、同時に取得できる
+    ページ数はスレッドの数（concurrency）までです。
+
+    Returns:
+        list[tuple[list[dict], bool]]: urls と同じ順序の (行, ブラウザが必要か)
+    """
+    spec = compile_spec(spec)
+    fetcher = HttpFetcher(concurrency)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(
+                executor.map(
+                    functools.partial(_scrape_page, fetcher, spec), urls
+                )
+            )
+    finally:
+        fetcher.close()
+
+
+def _render_with_browser(urls, spec, pool):
+    """
+    JavaScript が必要なページをブラウザで開いて解析します。
+
+    Returns:
+        dict[str, list[dict]]: URL ごとの行
+    """
+    ready = None
+    if spec.browser_ready:
+        kind, expression, _, _ = spec.browser_ready
+        ready = (SELECTOR_KINDS[kind], expression)
+
+    def render(session, url):
+        session.open(url, ready_locator=ready)
+        return extract(session.driver.page_source, spec, url)
+
+    rendered = {}
+    for result in pool.run_tasks(render, urls):
+        if result.error is not None:
+            rows = [_row_for(result.item, {}, "browser", str(result.error))]
+        else:
+            rows = [
+                _row_for(result.item, row, "browser") for row in result.value
+            ]
+        rendered[result.item] = rows
+    return rendered
+
+
+def _browser_fallback(urls, spec, pool):
+    """
+    ブラウザで開き直します（pool を省略した場合はここで起動します）。
+    """
+    if pool is not None:
+        return _render_with_browser(urls, spec, pool)
+
+    from browser_pool import BrowserPool
+
+    with BrowserPool(size=min(len(urls), 2)) as own_pool:
+        return _render_with_browser(urls, spec, own_pool)
+
+
+def scrape(
+    urls,
+    spec,
+    concurrency=DEFAULT_CONCURRENCY,
+    use_browser=True,
+    pool=None,
+):
+    """
+    ページを取得し、抽出定義に従って取り出した行を返します。
+
+    Args:
+        urls (list[str]): 取得するページの URL
+        spec (dict | ScrapeSpec): 抽出定義
+        concurrency (int): 同時に取得するページ数
+        use_browser (bool): HTML から何も取り出せなかったページを
+            ブラウザで開き直すか
+        pool (BrowserPool | None): ブラウザで開き直す際に使うプール
+
+    Returns:
+        list[dict]: url・各列・source（http / browser）・error を持つ行
+    """
+    spec = compile_spec(spec)
+    pages = scrape_pages_threaded(urls, spec, concurrency)
+
+    needs_browser = [url for url, (_, js) in zip(urls, pages) if js]
+    rendered = {}
+    if needs_browser and use_browser:
+        rendered = _browser_fallback(needs_browser, spec, pool)
+
+    results = []
+    for url, (rows, js) in zip(urls, pages):
+        if js:
+            rows = rendered.get(url) or [
+                _row_for(url, {}, "http", "値を取り出せませんでした")
+            ]
+        results.extend(rows)
+    return results
+
+
+def result_columns(spec):
+    """
+    出力する列名の一覧を返します。
+    """
+    return ["url", *compile_spec(spec).fields, "source", "error"]
+
+
+def scrape_to_frame(urls, spec, **options):
+    """
+    scrape の結果を DataFrame で返します。
+    """
+    import pandas as pd
+
+    rows = scrape(urls, spec, **options)
+    return pd.DataFrame(rows, columns=result_columns(spec))
+
+
+def save_results(rows, spec, output_path, sheet_name="取得結果"):
+    """
+    scrape の結果を Excel ファイルに書き出します。
+    """
+    from excel_writer import StreamingExcelWriter
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    columns = result_columns(spec)
+    writer = StreamingExcelWriter(output_path)
+    writer.write_rows(
+        sheet_name,
+        columns,
+        ([row.get(column) for column in columns] for row in rows),
+    )
+    writer.save()
+
+
+def read_urls(path):
+    """
+    1行に1つ URL を書いたファイルを読み込みます（空行と # の行は無視します）。
+    """
+    with open(path, encoding="utf-8") as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith("#")]
+
+
+def parse_args(argv=None):
+    """
+    コマンドライン引数を解析します。
+    """
+    parser = argparse.ArgumentParser(
+        description="ブラウザを使わずに Web ページから情報を取り出します。"
+    )
+    parser.add_argument("spec", help="抽出定義の JSON ファイル")
+    parser.add_argument("urls", nargs="*", help="取得するページの URL")
+    parser.add_argument("--urls-file", help="URL を1行に1つ書いたファイル")
+    parser.add_argument(
+        "--output",
+        default=DEFAULT_OUTPUT_PATH,
+        help=f"結果の出力先（既定: {DEFAULT_OUTPUT_PATH}）",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="同時に取得するページ数",
+    )
+    parser.add_argument(
+        "--no-browser",
+        action="store_true",
+        help="JavaScript が必要なページをブラウザで開き直しません",
+    )
+    args = parser.parse_args(argv)
+    if args.urls_file:
+        args.urls += read_urls(args.urls_file)
+    if not args.urls:
+        parser.error("URL を指定してください。")
+    if args.concurrency <= 0:
+        parser.error("--concurrency には 1 以上を指定してください。")
+    return args
+
+
+def main(argv=None):
+    """
+    コマンドライン引数に従ってページを取得し、Excel に書き出します。
+
+    Args:
+        argv (list[str] | None): 引数の一覧（省略時は sys.argv の値）
+    """
+    args = parse_args(argv)
+    utils.log_start("Web Scraper")
+    try:
+        spec = load_spec(args.spec)
+        rows = scrape(
+            args.urls,
+            spec,
+            concurrency=args.concurrency,
+            use_browser=not args.no_browser,
+        )
+        save_results(rows, spec, args.output)
+    except Exception as e:
+        utils.handle_error(e)
+
+    sources = [row["source"] for row in rows if not row["error"]]
+    errors = sum(1 for row in rows if row["error"])
+    print(
+        f"取得: {len(rows)}行（HTTP {sources.count('http')}行 / "
+        f"ブラウザ {sources.count('browser')}行 / エラー {errors}行）"
+    )
+    print(f"出力: {args.output}")
+    utils.log_end("Web Scraper")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,630 @@
+"""
+契約書の生成や進捗の集計を、常駐プロセスで受け付けて実行するモジュールです。
+
+毎回スクリプトを起動すると、Python の起動・pandas などの import・
+テンプレートの解析・Excel ファイルの読み込みに数秒かかります。
+常駐プロセスではライブラリを読み込んだまま待機し、解析済みのテンプレートと
+直近に読み込んだ入力データもメモリ上に保持するため、小さなジョブは
+ミリ秒単位で完了します。
+
+ジョブは localhost の HTTP (JSON) で受け付けます。
+    POST /jobs        ジョブを登録します（?wait=1 を付けると完了まで待ちます）
+                      本文: {"command": "progress", "args": {...}, "cwd": "..."}
+    GET  /jobs/<id>   ジョブの状態と結果（画面出力など）を返します
+    GET  /status      実行中・待機中のジョブの件数などを返します
+
+ジョブはファイルを読み書きするため、次のリクエストは受け付けません。
+    - Authorization ヘッダーの合言葉（トークン）が違うもの（401）
+      トークンは起動時に作り直し、本人だけが読めるファイル（0600）に
+      保存します。submit はこのファイルを読んで送ります
+    - Origin ヘッダーが付いたもの（ブラウザ上の Web ページからの送信, 403）
+    - 本文が application/json ではない POST（415）
+また、cwd は起動時に指定したディレクトリ (root) の中だけ、ジョブの引数の
+パスは cwd の中だけを指定できます。
+
+待ち行列には上限があり、いっぱいの場合は 503 を返して受け付けません。
+ジョブは workers の数のスレッドで同時に実行するため、時間のかかる契約書の
+生成ジョブの実行中でも、小さな進捗集計ジョブはすぐに実行されます。
+画面出力・ログ・処理時間の計測 (perf.use_recorder) はジョブごとに分けて
+記録します（contextvars で切り替えるため、ジョブ同士が混ざりません）。
+同じ出力先に書き込むジョブを同時に登録しないようにしてください。
+
+使用例:
+    python main.py daemon --workers 2
+    python main.py submit progress
+    python main.py submit contracts --zip
+"""
+
+import contextvars
+import hmac
+import http.server
+import io
+import json
+import logging
+import os
+import queue
+import secrets
+import sys
+import threading
+import time
+import traceback
+import urllib.error
+import urllib.request
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import parse_qs, urlparse
+
+import perf  # ジョブごとの処理時間の計測用
+import utils  # ログ出力用
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 16
+
+# 結果を保持しておく完了済みジョブの件数（古いものから削除します）
+FINISHED_JOBS_LIMIT = 100
+
+# 常駐プロセスのトークンを保存するファイル
+DEFAULT_TOKEN_PATH = os.path.join(
+    os.path.expanduser("~"), ".team_pj", "worker_daemon.token"
+)
+
+
+def create_token(path=DEFAULT_TOKEN_PATH):
+    """
+    新しいトークンを作成し、本人だけが読み書きできるファイルに保存します。
+
+    Windows ではファイルのアクセス権はホームディレクトリの設定に従います。
+
+    Returns:
+        str: 作成したトークン
+    """
+    token = secrets.token_urlsafe(32)
+    os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
+    # 以前から同じファイルがあった場合も、アクセス権を本人だけにします
+    os.chmod(path, 0o600)
+    return token
+
+
+def read_token(path=DEFAULT_TOKEN_PATH):
+    """
+    常駐プロセスが保存したトークンを読み込みます。
+
+    Raises:
+        OSError: ファイルがない場合（常駐プロセスが起動していない場合など）
+    """
+    with open(path, encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def job_path(cwd, path):
+    """
+    ジョブの引数のパスを、cwd を基準にした絶対パスにします。
+
+    Raises:
+        ValueError: cwd の外を指すパス（絶対パスや "../" を含むもの）の場合
+    """
+    cwd = os.path.realpath(cwd)
+    full = os.path.realpath(os.path.join(cwd, path))
+    if os.path.commonpath([cwd, full]) != cwd:
+        raise ValueError(f"作業ディレクトリの外のパスは指定できません: {path}")
+    return full
+
+
+def run_progress_job(args, cwd):
+    """
+    進捗の集計ジョブを実行します（パスは cwd からの相対パス）。
+    """
+    import progress_tracker
+    import task_history
+
+    history_path = args.get("history_path", task_history.DEFAULT_HISTORY_PATH)
+    progress_tracker.main(
+        input_file=job_path(cwd, args.get("input_file", "A.xlsx")),
+        output_file=job_path(cwd, args.get("output_file", "B.xlsx")),
+        history_path=history_path and job_path(cwd, history_path),
+    )
+
+
+def run_contracts_job(args, cwd):
+    """
+    契約書の生成ジョブを実行します（パスは cwd からの相対パス）。
+    """
+    import batch_runner
+    import generate_contracts
+
+    zip_max_bytes = None
+    if args.get("zip"):
+        zip_max_bytes = int(args.get("zip_max_mb", 1024)) * 1024 * 1024
+    generate_contracts.generate_contracts(
+        workers=int(args.get("workers", 1)),
+        writers=int(args.get("writers", generate_contracts.DEFAULT_WRITERS)),
+        retries=int(args.get("retries", batch_runner.DEFAULT_RETRY_ATTEMPTS)),
+        layout=args.get("layout", "flat"),
+        full=bool(args.get("full", False)),
+        zip_max_bytes=zip_max_bytes,
+        excel_path=job_path(
+            cwd, args.get("excel_path", "data/contract_data.xlsx")
+        ),
+        template_path=job_path(
+            cwd,
+            args.get("template_path", "templates/contract_template.docx"),
+        ),
+        output_dir=job_path(cwd, args.get("output_dir", "output")),
+        template_dir=args.get("template_dir")
+        and job_path(cwd, args["template_dir"]),
+    )
+
+
+# ジョブの種類と実行する関数
+JOB_RUNNERS = {
+    "progress": run_progress_job,
+    "contracts": run_contracts_job,
+}
+
+
+class ContextOutput(io.TextIOBase):
+    """
+    ジョブごとに画面出力 (print) の行き先を切り替えるためのクラスです。
+
+    sys.stdout をこのクラスに置き換えると、capture() の中で実行した
+    print の内容はそのジョブのバッファに書き込まれ、
+    それ以外は元の出力先にそのまま書き込まれます。
+    行き先は contextvars で切り替えるため、ジョブが
+    utils.context_initializer を使って起動したスレッドの出力も記録します。
+    """
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self._buffer = contextvars.ContextVar("job_output", default=None)
+
+    @contextmanager
+    def capture(self, buffer=None):
+        """
+        with 文の中の画面出力をバッファに記録します。
+        """
+        buffer = io.StringIO() if buffer is None else buffer
+        token = self._buffer.set(buffer)
+        try:
+            yield buffer
+        finally:
+            self._buffer.reset(token)
+
+    def write(self, text):
+        buffer = self._buffer.get()
+        if buffer is None:
+            buffer = self.fallback
+        buffer.write(text)
+        return len(text)
+
+    def flush(self):
+        self.fallback.flush()
+
+
+class Job:
+    """
+    1件のジョブの内容・状態・結果を保持するクラスです。
+    """
+
+    def __init__(self, command, args, cwd):
+        self.id = uuid.uuid4().hex[:12]
+        self.command = command
+        self.args = args
+        self.cwd = cwd
+        self.status = "queued"
+        self.exit_code = None
+        self.error = None
+        self.output = ""
+        self.submitted_at = time.time()
+        self.seconds = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        """
+        応答用の辞書に変換します。
+        """
+        return {
+            "id": self.id,
+            "command": self.command,
+            "status": self.status,
+            "exit_code": self.exit_code,
+            "error": self.error,
+            "output": self.output,
+            "seconds": self.seconds,
+        }
+
+
+class WorkerService:
+    """
+    ジョブを待ち行列で受け付け、workers の数のスレッドで同時に実行するクラスです。
+
+    使用例:
+        service = WorkerService(workers=2, queue_size=16)
+        service.start()
+        job = service.submit("progress", {}, "/path/to/project")
+        job.done.wait()
+        service.stop()
+    """
+
+    def __init__(
+        self,
+        workers=DEFAULT_WORKERS,
+        queue_size=DEFAULT_QUEUE_SIZE,
+        runners=None,
+        root=None,
+    ):
+        """
+        Args:
+            workers (int): 同時に実行するジョブの数
+            queue_size (int): 待ち行列に入れられるジョブの最大数
+            runners (dict | None): ジョブの種類と実行する関数
+                （省略時は JOB_RUNNERS）
+            root (str | None): ジョブの cwd に指定できるディレクトリ
+                （その中のディレクトリも指定できます。省略時は現在の場所）
+        """
+        self.workers = workers
+        self.runners = JOB_RUNNERS if runners is None else runners
+        self.root = os.path.realpath(root or os.getcwd())
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._output = None
+
+    def start(self):
+        """
+        ジョブを実行するスレッドを起動します。
+        """
+        if isinstance(sys.stdout, ContextOutput):
+            self._output = sys.stdout
+        else:
+            self._output = sys.stdout = ContextOutput(sys.stdout)
+        for number in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"worker-{number + 1}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """
+        実行中のジョブの完了を待ってからスレッドを停止します。
+        """
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if sys.stdout is self._output:
+            sys.stdout = self._output.fallback
+
+    def submit(self, command, args=None, cwd=None):
+        """
+        ジョブを待ち行列に登録します。
+
+        Args:
+            command (str): ジョブの種類（"progress" または "contracts"）
+            args (dict | None): ジョブの引数
+            cwd (str | None): 相対パスの基準ディレクトリ（省略時は root）
+
+        Returns:
+            Job: 登録したジョブ
+
+        Raises:
+            ValueError: ジョブの種類や基準ディレクトリが正しくない場合
+            queue.Full: 待ち行列がいっぱいの場合
+        """
+        if command not in self.runners:
+            raise ValueError(f"不明なジョブの種類です: {command}")
+        cwd = os.path.realpath(cwd or self.root)
+        if os.path.commonpath([self.root, cwd]) != self.root:
+            raise ValueError(
+                f"許可されたディレクトリ ({self.root}) の外は指定できません: "
+                f"{cwd}"
+            )
+        if not os.path.isdir(cwd):
+            raise ValueError(f"ディレクトリが見つかりません: {cwd}")
+
+        job = Job(command, dict(args or {}), cwd)
+        with self._lock:
+            self._queue.put_nowait(job)
+            self._jobs[job.id] = job
+            self._prune_finished()
+        return job
+
+    def _prune_finished(self):
+        """
+        保持している完了済みジョブが上限を超えたら古いものから削除します。
+        """
+        finished = [j for j in self._jobs.values() if j.done.is_set()]
+        for job in finished[: max(0, len(finished) - FINISHED_JOBS_LIMIT)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id):
+        """
+        ジョブを返します（見つからない場合は None）。
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self):
+        """
+        待ち行列と実行中のジョブの件数を返します。
+        """
+        with self._lock:
+            running = sum(j.status == "running" for j in self._jobs.values())
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            "running": running,
+        }
+
+    def _work(self):
+        """
+        待ち行列からジョブを取り出して実行し続けます。
+
+        ジョブごとに新しい contextvars のコンテキストで実行するため、
+        前のジョブの画面出力の行き先などは引き継ぎません。
+        """
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            contextvars.Context().run(self._run, job)
+
+    def _run(self, job):
+        """
+        1件のジョブを実行し、画面出力・ログと結果を記録します。
+
+        処理時間の計測はジョブごとの PerfRecorder に記録します。
+        ジョブ内の utils.handle_error による終了 (SystemExit) も
+        失敗として記録し、常駐プロセス自体は止めません。
+        """
+        job.status = "running"
+        start = time.perf_counter()
+        with (
+            self._output.capture() as buffer,
+            utils.capture_logs(buffer),
+            perf.use_recorder(perf.PerfRecorder()),
+        ):
+            try:
+                self.runners[job.command](job.args, job.cwd)
+                job.exit_code = 0
+            except SystemExit as e:
+                job.exit_code = e.code if isinstance(e.code, int) else 1
+            except Exception as e:
+                job.exit_code = 1
+                job.error = f"{type(e).__name__}: {e}"
+                logging.error(traceback.format_exc())
+        job.output = buffer.getvalue()
+        job.seconds = round(time.perf_counter() - start, 6)
+        job.status = "succeeded" if job.exit_code == 0 else "failed"
+        job.done.set()
+
+
+class JobRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    ジョブの登録・状態確認の HTTP リクエストを処理するクラスです。
+    """
+
+    def do_GET(self):
+        if self._reject_untrusted():
+            return
+        path = urlparse(self.path).path
+        service = self.server.service
+        if path == "/status":
+            self._send_json(200, service.status())
+            return
+        if path.startswith("/jobs/"):
+            job = service.get(path[len("/jobs/") :])
+            if job is not None:
+                self._send_json(200, job.to_dict())
+                return
+        self._send_json(404, {"error": "見つかりません"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if self._reject_untrusted(require_json=True):
+            return
+        if url.path != "/jobs":
+            self._send_json(404, {"error": "見つかりません"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            job = self.server.service.submit(
+                request.get("command"), request.get("args"), request.get("cwd")
+            )
+        except (ValueError, AttributeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except queue.Full:
+            self._send_json(503, {"error": "待ち行列がいっぱいです"})
+            return
+
+        if parse_qs(url.query).get("wait") == ["1"]:
+            job.done.wait()
+        self._send_json(200 if job.done.is_set() else 202, job.to_dict())
+
+    def _reject_untrusted(self, require_json=False):
+        """
+        受け付けないリクエストにエラーを返します。
+
+        Returns:
+            bool: エラーを返した場合は True
+        """
+        # ブラウザは別のサイトから送信する場合に Origin ヘッダーを付けます
+        if self.headers.get("Origin") is not None:
+            self._send_json(403, {"error": "ブラウザからは利用できません"})
+            return True
+        expected = f"Bearer {self.server.token}".encode("utf-8")
+        received = self.headers.get("Authorization", "").encode("utf-8")
+        if not hmac.compare_digest(received, expected):
+            self._send_json(401, {"error": "トークンが正しくありません"})
+            return True
+        content_type = self.headers.get("Content-Type", "")
+        if require_json and (
+            content_type.split(";")[0].strip().lower() != "application/json"
+        ):
+            self._send_json(
+                415, {"error": "本文は application/json で送信してください"}
+            )
+            return True
+        return False
+
+    def _send_json(self, code, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # アクセスログは DEBUG レベルで出力します（通常は表示しません）
+        logging.debug("%s - " + format, self.address_string(), *args)
+
+
+class WorkerServer(http.server.ThreadingHTTPServer):
+    """
+    WorkerService にジョブを渡す HTTP サーバーです。
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, service, token):
+        """
+        Args:
+            address (tuple): (ホスト名, ポート番号)
+            service (WorkerService): ジョブを実行するサービス
+            token (str): クライアントが Authorization ヘッダーで送るトークン
+        """
+        super().__init__(address, JobRequestHandler)
+        self.service = service
+        self.token = token
+
+
+def serve(
+    host=DEFAULT_HOST,
+    port=DEFAULT_PORT,
+    workers=DEFAULT_WORKERS,
+    queue_size=DEFAULT_QUEUE_SIZE,
+    root=None,
+    token_path=DEFAULT_TOKEN_PATH,
+):
+    """
+    常駐プロセスを起動し、Ctrl+C で止めるまでジョブを受け付けます。
+
+    Args:
+        root (str | None): ジョブの cwd に指定できるディレクトリ
+            （省略時は現在の場所）
+        token_path (str): トークンを保存するファイル
+    """
+    # 重いライブラリは起動時に一度だけ読み込んでおきます
+    import generate_contracts  # noqa: F401
+    import progress_tracker  # noqa: F401
+
+    service = WorkerService(workers=workers, queue_size=queue_size, root=root)
+    server = WorkerServer((host, port), service, create_token(token_path))
+    service.start()
+    utils.configure_logging()
+    logging.info(
+        f"常駐プロセスを起動しました: http://{host}:{server.server_port} "
+        f"(workers={workers}, queue_size={queue_size}, root={service.root})"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("常駐プロセスを停止します。")
+    finally:
+        server.server_close()
+        service.stop()
+
+
+def _request(method, url, token, payload=None, timeout=None):
+    """
+    常駐プロセスに HTTP リクエストを送り、JSON の応答を返します。
+
+    エラーの応答（400, 503 など）も、本文の JSON をそのまま返します。
+    """
+    data = None
+    headers = {"Authorization": f"Bearer {token}"}
+    if payload is not None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers["Content-Type"] = "application/json"
+    request = urllib.request.Request(
+        url, data=data, headers=headers, method=method
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        with e:
+            return json.load(e)
+
+
+def submit_job(
+    command,
+    args=None,
+    cwd=None,
+    host=DEFAULT_HOST,
+    port=DEFAULT_PORT,
+    wait=True,
+    timeout=None,
+    token=None,
+    token_path=DEFAULT_TOKEN_PATH,
+):
+    """
+    常駐プロセスにジョブを登録します。
+
+    Args:
+        command (str): ジョブの種類（"progress" または "contracts"）
+        args (dict | None): ジョブの引数
+        cwd (str | None): 相対パスの基準ディレクトリ（省略時は現在の場所）
+        wait (bool): True の場合はジョブの完了まで待ちます
+        token (str | None): 常駐プロセスのトークン
+            （省略時は token_path のファイルから読み込みます）
+        token_path (str): トークンが保存されたファイル
+
+    Returns:
+        dict: ジョブの状態と結果（受け付けられなかった場合は "error" を含む）
+
+    Raises:
+        urllib.error.URLError: 常駐プロセスに接続できない場合
+        OSError: トークンのファイルを読み込めない場合
+    """
+    url = f"http://{host}:{port}/jobs" + ("?wait=1" if wait else "")
+    payload = {
+        "command": command,
+        "args": args or {},
+        "cwd": os.path.abspath(cwd or os.getcwd()),
+    }
+    return _request(
+        "POST", url, token or read_token(token_path), payload, timeout
+    )
+
+
+def get_job(
+    job_id,
+    host=DEFAULT_HOST,
+    port=DEFAULT_PORT,
+    timeout=None,
+    token=None,
+    token_path=DEFAULT_TOKEN_PATH,
+):
+    """
+    常駐プロセスからジョブの状態と結果を取得します。
+    """
+    return _request(
+        "GET",
+        f"http://{host}:{port}/jobs/{job_id}",
+        token or read_token(token_path),
+        None,
+        timeout,
+    )